@@ -0,0 +1,12 @@
+import sys
+from pathlib import Path
+
+try:
+    import access_guard  # noqa: F401
+except ImportError:
+    # running from a checkout without the package installed
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from benchmarks.run import main
+
+main()
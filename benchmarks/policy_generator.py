@@ -0,0 +1,110 @@
+"""
+Synthetic policy sets for the benchmarks.
+
+Roles are arranged in role_depth levels: every role below the top level inherits from one role
+of the next level up, and users are assigned roles_per_user roles of the bottom level, so a user's
+effective roles span the whole depth. Resources follow /apps/<app>/<collection>/<id>; a share of
+the rules use key_match3 patterns ({id} parameters or /* wildcards) and a share are deny rules.
+"""
+import random
+from dataclasses import dataclass
+from typing import List, Tuple
+
+ACTIONS = ("read", "write", "delete")
+COLLECTIONS = ("docs", "reports", "users", "settings")
+
+Policy = Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class PolicySetSpec:
+    users: int = 1_000
+    roles: int = 100
+    role_depth: int = 3
+    roles_per_user: int = 2
+    rules_per_role: int = 10
+    apps: int = 50
+    ids_per_collection: int = 100
+    wildcard_ratio: float = 0.3
+    deny_ratio: float = 0.05
+    seed: int = 42
+
+    def scaled(self, factor: float) -> "PolicySetSpec":
+        return PolicySetSpec(
+            users=max(1, int(self.users * factor)),
+            roles=max(self.role_depth, int(self.roles * factor)),
+            role_depth=self.role_depth,
+            roles_per_user=self.roles_per_user,
+            rules_per_role=self.rules_per_role,
+            apps=max(1, int(self.apps * factor)),
+            ids_per_collection=self.ids_per_collection,
+            wildcard_ratio=self.wildcard_ratio,
+            deny_ratio=self.deny_ratio,
+            seed=self.seed,
+        )
+
+
+def user_name(index: int) -> str:
+    return f"user-{index}"
+
+
+def role_levels(spec: PolicySetSpec) -> List[List[str]]:
+    roles = [f"role-{index}" for index in range(spec.roles)]
+    depth = max(1, spec.role_depth)
+    return [roles[level::depth] for level in range(depth)]
+
+
+def generate_policies(spec: PolicySetSpec) -> List[Policy]:
+    """
+    The g and p rules of the policy set, as (ptype, ...) tuples.
+    """
+    rand = random.Random(spec.seed)
+    levels = role_levels(spec)
+    policies: List[Policy] = []
+
+    # level 0 is the bottom (assigned to users), each level inherits from the one above
+    for level, roles in enumerate(levels[:-1]):
+        parents = levels[level + 1]
+        for role in roles:
+            policies.append(("g", role, rand.choice(parents)))
+    for index in range(spec.users):
+        for role in rand.sample(levels[0], min(spec.roles_per_user, len(levels[0]))):
+            policies.append(("g", user_name(index), role))
+
+    for roles in levels:
+        for role in roles:
+            for _ in range(spec.rules_per_role):
+                effect = "deny" if rand.random() < spec.deny_ratio else "allow"
+                action = "*" if rand.random() < 0.1 else rand.choice(ACTIONS)
+                policies.append(("p", role, _resource_pattern(rand, spec), action, effect))
+    return policies
+
+
+def generate_checks(spec: PolicySetSpec, count: int, seed: int = 7) -> List[Tuple[str, str, str]]:
+    """
+    (user, resource, action) requests over the same resource space as the policies.
+    """
+    rand = random.Random(seed)
+    return [
+        (user_name(rand.randrange(spec.users)), _resource(rand, spec), rand.choice(ACTIONS))
+        for _ in range(count)
+    ]
+
+
+def _resource(rand: random.Random, spec: PolicySetSpec) -> str:
+    return (
+        f"/apps/{rand.randrange(spec.apps)}/{rand.choice(COLLECTIONS)}/"
+        f"{rand.randrange(spec.ids_per_collection)}"
+    )
+
+
+def _resource_pattern(rand: random.Random, spec: PolicySetSpec) -> str:
+    if rand.random() >= spec.wildcard_ratio:
+        return _resource(rand, spec)
+    app = rand.randrange(spec.apps)
+    kind = rand.random()
+    if kind < 0.4:
+        return f"/apps/{app}/{rand.choice(COLLECTIONS)}/{{id}}"
+    if kind < 0.8:
+        return f"/apps/{app}/*"
+    return f"/apps/{{app}}/{rand.choice(COLLECTIONS)}/*"
@@ -0,0 +1,236 @@
+"""
+Benchmark policy loading and enforcement as the policy set grows.
+
+    python -m benchmarks --scales 0.1 1 10 --loaders code db api > bench_output.txt
+
+For every scale and loader it reports the time to build an enforcer and to refresh it, the peak
+memory allocated while building it (tracemalloc), and the p50/p99 latency of single checks,
+batched checks (per batch of --batch-size) and checks issued from --threads threads.
+"""
+import argparse
+import logging
+import statistics
+import threading
+import time
+import tracemalloc
+from contextlib import ExitStack
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from access_guard.authz.factory import get_permissions_enforcer
+from access_guard.authz.loaders.policy_api_loader import PolicyApiLoader
+from access_guard.authz.loaders.policy_code_loader import PolicyCodeLoader
+from access_guard.authz.loaders.policy_db_loader import PolicyDbLoader
+from access_guard.authz.models.entities import User
+
+from benchmarks.policy_generator import PolicySetSpec, generate_checks, generate_policies
+from benchmarks.stand_ins import (
+    SQLitePolicyQueryProvider,
+    StaticPolicyProvider,
+    policy_api_server,
+    sqlite_database,
+)
+
+LOADERS = ("code", "db", "api")
+
+
+@dataclass
+class BenchmarkSettings:
+    use_compiled_engine: bool = True
+    decision_cache_size: int = 0
+
+
+@dataclass
+class BenchmarkResult:
+    loader: str
+    policies: int
+    load_s: float
+    refresh_s: float
+    peak_mb: float
+    single_us: Tuple[float, float]
+    batch_us: Tuple[float, float]
+    threaded_us: Tuple[float, float]
+    threaded_checks_per_s: float
+
+
+def percentiles(samples: Sequence[float]) -> Tuple[float, float]:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0, 0.0
+    return statistics.median(ordered), ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+
+def measure_load(build: Callable[[], object]) -> Tuple[object, float, float]:
+    """
+    Build an enforcer twice: once timed, once traced for its peak allocation (tracing slows it down).
+    """
+    started = time.perf_counter()
+    enforcer = build()
+    load_s = time.perf_counter() - started
+
+    tracemalloc.start()
+    build()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return enforcer, load_s, peak / 2 ** 20
+
+
+def measure_single(enforcer, checks) -> Tuple[float, float]:
+    samples = []
+    for subject, resource, action in checks:
+        user = User(id=subject)
+        started = time.perf_counter()
+        enforcer.has_permission(user, resource, action)
+        samples.append((time.perf_counter() - started) * 1e6)
+    return percentiles(samples)
+
+
+def measure_batch(enforcer, checks, batch_size: int) -> Tuple[float, float]:
+    by_user: Dict[str, List[Tuple[str, str]]] = {}
+    for subject, resource, action in checks:
+        by_user.setdefault(subject, []).append((resource, action))
+
+    samples = []
+    for subject, items in by_user.items():
+        user = User(id=subject)
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            started = time.perf_counter()
+            enforcer.has_permissions_batch(user, batch)
+            samples.append((time.perf_counter() - started) * 1e6)
+    return percentiles(samples)
+
+
+def measure_threaded(enforcer, checks, threads: int) -> Tuple[Tuple[float, float], float]:
+    shards = [checks[index::threads] for index in range(threads)]
+    samples: List[List[float]] = [[] for _ in shards]
+    barrier = threading.Barrier(threads + 1)
+
+    def run(shard, out):
+        barrier.wait()
+        for subject, resource, action in shard:
+            started = time.perf_counter()
+            enforcer.has_permission(User(id=subject), resource, action)
+            out.append((time.perf_counter() - started) * 1e6)
+
+    workers = [threading.Thread(target=run, args=(shard, out)) for shard, out in zip(shards, samples)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    return percentiles([sample for out in samples for sample in out]), len(checks) / elapsed
+
+
+def run_benchmark(
+        loader_name: str,
+        spec: PolicySetSpec,
+        settings: BenchmarkSettings,
+        checks: int,
+        batch_size: int,
+        threads: int
+) -> BenchmarkResult:
+    policies = generate_policies(spec)
+    requests = generate_checks(spec, checks)
+
+    with ExitStack() as stack:
+        if loader_name == "code":
+            make_loader = lambda: PolicyCodeLoader(StaticPolicyProvider(policies))
+        elif loader_name == "db":
+            engine = stack.enter_context(sqlite_database(policies))
+            make_loader = lambda: PolicyDbLoader(SQLitePolicyQueryProvider(), engine)
+        elif loader_name == "api":
+            url = stack.enter_context(policy_api_server(policies))
+            make_loader = lambda: PolicyApiLoader(url)
+        else:
+            raise ValueError(f"Unknown loader: {loader_name}")
+
+        def build():
+            return get_permissions_enforcer(settings, policy_loaders=[make_loader()], new_instance=True)
+
+        enforcer, load_s, peak_mb = measure_load(build)
+
+        started = time.perf_counter()
+        enforcer.refresh_policies()
+        refresh_s = time.perf_counter() - started
+
+    single = measure_single(enforcer, requests)
+    batch = measure_batch(enforcer, requests, batch_size)
+    threaded, throughput = measure_threaded(enforcer, requests, threads)
+    return BenchmarkResult(
+        loader=loader_name,
+        policies=len(policies),
+        load_s=load_s,
+        refresh_s=refresh_s,
+        peak_mb=peak_mb,
+        single_us=single,
+        batch_us=batch,
+        threaded_us=threaded,
+        threaded_checks_per_s=throughput,
+    )
+
+
+def format_results(results: List[BenchmarkResult], batch_size: int, threads: int) -> str:
+    header = (
+        f"{'loader':<6} {'policies':>9} {'load s':>8} {'refresh s':>9} {'peak MB':>8} "
+        f"{'single p50/p99 us':>18} {f'batch({batch_size}) p50/p99 us':>22} "
+        f"{f'{threads} threads p50/p99 us':>22} {'checks/s':>10}"
+    )
+    lines = [header, "-" * len(header)]
+    for result in results:
+        lines.append(
+            f"{result.loader:<6} {result.policies:>9} {result.load_s:>8.3f} {result.refresh_s:>9.3f} "
+            f"{result.peak_mb:>8.1f} {_pair(result.single_us):>18} {_pair(result.batch_us):>22} "
+            f"{_pair(result.threaded_us):>22} {result.threaded_checks_per_s:>10.0f}"
+        )
+    return "\n".join(lines)
+
+
+def _pair(values: Tuple[float, float]) -> str:
+    return f"{values[0]:.1f}/{values[1]:.1f}"
+
+
+def main(argv=None) -> None:
+    defaults = PolicySetSpec()
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--scales", type=float, nargs="+", default=[0.1, 1.0], help="multipliers of the base spec")
+    parser.add_argument("--loaders", nargs="+", choices=LOADERS, default=list(LOADERS))
+    parser.add_argument("--users", type=int, default=defaults.users)
+    parser.add_argument("--roles", type=int, default=defaults.roles)
+    parser.add_argument("--role-depth", type=int, default=defaults.role_depth)
+    parser.add_argument("--roles-per-user", type=int, default=defaults.roles_per_user)
+    parser.add_argument("--rules-per-role", type=int, default=defaults.rules_per_role)
+    parser.add_argument("--wildcard-ratio", type=float, default=defaults.wildcard_ratio)
+    parser.add_argument("--deny-ratio", type=float, default=defaults.deny_ratio)
+    parser.add_argument("--checks", type=int, default=10_000)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--casbin", action="store_true", help="enforce with casbin instead of the compiled engine")
+    parser.add_argument("--decision-cache-size", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    logging.getLogger("casbin").setLevel(logging.WARNING)
+    base = PolicySetSpec(
+        users=args.users,
+        roles=args.roles,
+        role_depth=args.role_depth,
+        roles_per_user=args.roles_per_user,
+        rules_per_role=args.rules_per_role,
+        wildcard_ratio=args.wildcard_ratio,
+        deny_ratio=args.deny_ratio,
+    )
+    settings = BenchmarkSettings(
+        use_compiled_engine=not args.casbin,
+        decision_cache_size=args.decision_cache_size,
+    )
+
+    for scale in args.scales:
+        spec = base.scaled(scale)
+        print(f"\nscale {scale}: {spec}")
+        results = [
+            run_benchmark(loader, spec, settings, args.checks, args.batch_size, args.threads)
+            for loader in args.loaders
+        ]
+        print(format_results(results, args.batch_size, args.threads), flush=True)
@@ -0,0 +1,123 @@
+"""
+Local stand-ins for the policy sources: an in-memory provider, a SQLite database and an
+in-process HTTP server answering like the access management API.
+"""
+import gzip
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, List
+
+from sqlalchemy import create_engine, text
+
+from access_guard.authz.loaders.casbin_policy_provider import CasbinPolicyProvider
+from access_guard.authz.loaders.poicy_query_provider import PolicyQueryProvider
+from access_guard.authz.loaders.policy_api_loader import POLICIES_ENDPOINT
+
+from benchmarks.policy_generator import Policy
+
+POLICY_COLUMNS = "ptype, subject, object, action, effect"
+
+
+class StaticPolicyProvider(CasbinPolicyProvider):
+    def __init__(self, policies: List[Policy]):
+        self.policies = policies
+
+    def get_policies(self, filter: dict = None):
+        return self.policies
+
+
+class SQLitePolicyQueryProvider(PolicyQueryProvider):
+    def get_all_policies_query(self) -> tuple[str, dict]:
+        return f"SELECT {POLICY_COLUMNS} FROM policies ORDER BY id", {}
+
+    def get_filtered_policies_query(self, filter: dict) -> tuple[str, dict]:
+        return self.get_all_policies_query()
+
+    def get_user_policies_query(self, user_id: str) -> tuple[str, dict]:
+        return f"SELECT {POLICY_COLUMNS} FROM policies WHERE subject = :subject ORDER BY id", {"subject": user_id}
+
+    def get_role_policies_query(self, role_id: str) -> tuple[str, dict]:
+        return self.get_user_policies_query(role_id)
+
+
+@contextmanager
+def sqlite_database(policies: List[Policy]) -> Iterator:
+    """
+    A SQLAlchemy engine on a temporary SQLite file holding the policies.
+    """
+    directory = tempfile.mkdtemp(prefix="access-guard-bench-")
+    path = os.path.join(directory, "policies.db")
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as connection:
+        connection.execute(text(
+            f"CREATE TABLE policies (id INTEGER PRIMARY KEY, {POLICY_COLUMNS})"
+        ))
+        connection.execute(text("CREATE INDEX policies_subject ON policies (subject)"))
+        connection.execute(
+            text(f"INSERT INTO policies ({POLICY_COLUMNS}) VALUES (:ptype, :subject, :object, :action, :effect)"),
+            [_policy_row(policy) for policy in policies],
+        )
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+        os.unlink(path)
+        os.rmdir(directory)
+
+
+@contextmanager
+def policy_api_server(policies: List[Policy]) -> Iterator[str]:
+    """
+    Serve the policies on POLICIES_ENDPOINT from a local thread and yield the base URL. The body is
+    gzipped for clients accepting it, like a production API behind a compressing proxy.
+    """
+    body = json.dumps({
+        "version": 1,
+        "resource_prefix": "",
+        "policies": [_policy_row(policy) for policy in policies],
+    }).encode()
+    compressed = gzip.compress(body)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if self.path.split("?")[0] != POLICIES_ENDPOINT:
+                self.send_error(404)
+                return
+            gzipped = "gzip" in self.headers.get("Accept-Encoding", "")
+            payload = compressed if gzipped else body
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            if gzipped:
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _policy_row(policy: Policy) -> dict:
+    ptype, subject, obj, *rest = policy
+    return {
+        "ptype": ptype,
+        "subject": subject,
+        "object": obj,
+        "action": rest[0] if rest else None,
+        "effect": rest[1] if len(rest) > 1 else None,
+    }
@@ -1 +1 @@
-from access_guard.authz.factory import get_permissions_enforcer
+from access_guard.authz.factory import get_async_permissions_enforcer, get_permissions_enforcer
@@ -0,0 +1,286 @@
+import asyncio
+import logging
+import time
+from typing import ClassVar, List, Optional, Tuple, Union
+
+from casbin import Model
+
+from access_guard.authz.exceptions import InvalidPolicySnapshotError, PolicyLoaderTimeoutError
+from access_guard.authz.loaders.async_policy_loader_abc import AsyncPolicyLoaderABC
+from access_guard.authz.loaders.policy_ingest import ingest_policies
+from access_guard.authz.loaders.policy_loader_abc import PolicyLoaderABC
+from access_guard.authz.models.enums import PolicyChange
+from access_guard.authz.models.load_policy_result import LoadPolicyResult
+from access_guard.authz.models.permissions_enforcer_params import PermissionsEnforcerParams
+from access_guard.authz.models.policy_snapshot import PolicySnapshot
+from access_guard.authz.permissions_enforcer import PermissionsEnforcer
+from access_guard.authz.policy_refresher import AsyncBackgroundPolicyRefresher
+
+logger = logging.getLogger(__name__)
+
+AnyPolicyLoader = Union[PolicyLoaderABC, AsyncPolicyLoaderABC]
+
+
+class AsyncPermissionsEnforcer(PermissionsEnforcer):
+    """
+    PermissionsEnforcer whose policy loading never blocks the event loop.
+
+    Async loaders fetch concurrently on the loop and sync loaders run in worker threads, each
+    into its own staging model. The results are merged in loader order into a fresh model that
+    replaces the current one only once it is complete, so has_permission (which stays
+    synchronous) always answers from a consistent snapshot without awaiting anything.
+    """
+    _instance: ClassVar[Optional["AsyncPermissionsEnforcer"]] = None
+
+    def __init__(
+            self,
+            params: PermissionsEnforcerParams,
+            policy_loaders: List[AnyPolicyLoader]
+    ):
+        if params and params.lazy_user_slices:
+            # slices are loaded synchronously on first check, which would block the event loop
+            raise ValueError("lazy_user_slices is not supported by AsyncPermissionsEnforcer")
+        # policies are loaded by the awaitable refresh_policies, never from the constructor
+        super().__init__(params, policy_loaders, skip_initial_policy_load=True)
+        self._reconcile_task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # serializes writers (refresher, watcher, manual calls), like _refresh_lock does for threads
+        self._refresh_lock_async = asyncio.Lock()
+
+    @classmethod
+    async def create(
+            cls,
+            params: PermissionsEnforcerParams,
+            policy_loaders: List[AnyPolicyLoader],
+            skip_initial_policy_load: bool = False
+    ) -> "AsyncPermissionsEnforcer":
+        enforcer = cls(params, policy_loaders)
+        if skip_initial_policy_load:
+            pass
+        elif enforcer._follows_shared_store():
+            await enforcer._attach_shared_store_async()
+        elif not await enforcer._warm_start_async():
+            await enforcer.refresh_policies()
+        # the refresher is an event loop task, it can only start once we run on the loop
+        enforcer._configure_refresh()
+        return enforcer
+
+    @classmethod
+    async def get_async_instance(
+            cls,
+            params: PermissionsEnforcerParams,
+            policy_loaders: List[AnyPolicyLoader],
+            skip_initial_policy_load: bool = False
+    ) -> "AsyncPermissionsEnforcer":
+        if cls._instance is None:
+            cls._instance = await cls.create(params, policy_loaders, skip_initial_policy_load)
+        return cls._instance
+
+    def _start_configured_refresh(self) -> None:
+        pass
+
+    def _start_watching(self) -> None:
+        # watcher notifications arrive on threads, the refreshes they trigger run on the loop
+        self._loop = asyncio.get_running_loop()
+        super()._start_watching()
+
+    def _apply_policy_change(self, change: PolicyChange) -> None:
+        refresh = self.refresh_policies() if change is PolicyChange.FULL else self.sync_policies()
+        asyncio.run_coroutine_threadsafe(refresh, self._loop).result()
+
+    async def _warm_start_async(self) -> bool:
+        snapshot = await asyncio.to_thread(self._snapshot_from_file)
+        if snapshot is None:
+            return False
+        self._publish(snapshot)
+        self._delta_sync_broken = True
+        self._reconcile_task = asyncio.create_task(self._reconcile_async())
+        return True
+
+    async def _reconcile_async(self) -> None:
+        try:
+            await self.refresh_policies()
+        except Exception as e:
+            logger.warning(f"Reloading policies after warm start failed, serving the snapshot file: {e}")
+
+    def _new_refresher(self, **schedule) -> AsyncBackgroundPolicyRefresher:
+        return AsyncBackgroundPolicyRefresher(self.sync_policies, **schedule)
+
+    def _load_policies(self) -> None:
+        raise TypeError("AsyncPermissionsEnforcer loads policies with 'await refresh_policies()'")
+
+    async def _attach_shared_store_async(self) -> None:
+        """
+        Awaitable counterpart of PermissionsEnforcer._attach_shared_store.
+        """
+        deadline = time.monotonic() + self._params.shared_store_attach_timeout
+        while True:
+            if await self._follow_shared_store_async():
+                return
+            if not self._follows_shared_store():
+                if not await self._warm_start_async():
+                    await self._load_policies_async()
+                return
+            if time.monotonic() >= deadline:
+                logger.warning(
+                    f"No policies published to {self._shared_store.directory} "
+                    f"within {self._params.shared_store_attach_timeout}s, loading them in this process"
+                )
+                await self._load_policies_async()
+                return
+            await asyncio.sleep(min(self._params.shared_store_poll_interval, 0.1))
+
+    async def _follow_shared_store_async(self) -> bool:
+        """
+        Awaitable counterpart of PermissionsEnforcer._follow_shared_store.
+        """
+        try:
+            snapshot = await asyncio.to_thread(self._read_shared_store)
+        except (OSError, InvalidPolicySnapshotError) as e:
+            logger.warning(
+                f"Ignoring published policies {self._shared_store.data_path}, loading them in this process: {e}"
+            )
+            await self._load_policies_async()
+            return True
+        if snapshot is None:
+            return False
+        self._publish(snapshot)
+        return True
+
+    async def refresh_policies(self) -> None:
+        async with self._refresh_lock_async:
+            await self._refresh_policies()
+
+    async def _refresh_policies(self) -> None:
+        with self._measure_refresh("full"):
+            if self._follows_shared_store():
+                await self._follow_shared_store_async()
+                return
+            await self._load_policies_async()
+
+    async def _load_policies_async(self) -> None:
+        """
+        Fetch every loader concurrently, each into its own staging model, bounded by its
+        load_timeout and handled by its failure_policy like MultiAdapter.load_policy; a failed
+        FAIL loader leaves the current policies serving.
+        """
+        policy_filter = self._params.filter if self._params else None
+        with self._full_load():
+            jobs = [(loader, self._new_model()) for loader in self._adapter.loaders]
+            runs = await asyncio.gather(
+                *(self._run_loader(loader, staging, policy_filter) for loader, staging in jobs)
+            )
+            outcomes = [outcome for outcome, _ in runs]
+            sources = self._adapter.collect_sources(jobs, outcomes, [timed_out for _, timed_out in runs])
+
+            # building the model, role links and compiled engine is CPU bound, keep it off the loop
+            snapshot = await asyncio.to_thread(self._build_fetched_snapshot, sources)
+            self._publish(snapshot)
+        await asyncio.to_thread(self._persist_snapshot, snapshot)
+
+    async def sync_policies(self) -> bool:
+        """
+        Awaitable counterpart of PermissionsEnforcer.sync_policies. Delta-capable loaders are
+        queried concurrently in worker threads.
+        """
+        async with self._refresh_lock_async:
+            with self._measure_refresh("delta"):
+                return await self._sync_policies()
+
+    async def _sync_policies(self) -> bool:
+        if self._follows_shared_store():
+            return await self._follow_shared_store_async()
+
+        delta_loaders = [
+            loader for loader in self._policy_loaders
+            if not isinstance(loader, AsyncPolicyLoaderABC) and loader.supports_delta()
+        ]
+        if not delta_loaders or self._delta_sync_broken:
+            await self._refresh_policies()
+            return True
+
+        policy_filter = self._params.filter if self._params else None
+        try:
+            deltas = await asyncio.gather(
+                *(asyncio.to_thread(loader.load_policy_delta, filter=policy_filter) for loader in delta_loaders)
+            )
+        except Exception:
+            self._delta_sync_broken = True
+            raise
+
+        if any(delta.full_reload for delta in deltas):
+            await self._refresh_policies()
+            return True
+        for loader, delta in zip(delta_loaders, deltas):
+            self._adapter.apply_loader_delta(loader, delta.added, delta.removed)
+
+        added = [policy for delta in deltas for policy in delta.added]
+        removed = [policy for delta in deltas for policy in delta.removed]
+        if not added and not removed:
+            return False
+        if self._delta_needs_reload(added, removed):
+            await self._refresh_policies()
+            return True
+
+        snapshot = await asyncio.to_thread(self._build_delta_snapshot, self._snapshot, added, removed)
+        self._publish(snapshot)
+        await asyncio.to_thread(self._persist_snapshot, snapshot)
+        return True
+
+    async def _run_loader(
+            self,
+            loader: AnyPolicyLoader,
+            staging_model: Model,
+            policy_filter: Optional[dict]
+    ) -> Tuple[Tuple[Optional[LoadPolicyResult], float, Optional[Exception]], bool]:
+        """
+        Returns the (result, seconds, error) outcome MultiAdapter.collect_sources expects, and
+        whether the loader timed out. A timed out sync loader cannot be interrupted; it finishes
+        into its discarded staging model.
+        """
+        name = type(loader).__name__
+        timeout = self._adapter.timeout_for(loader)
+        started = time.perf_counter()
+        try:
+            with self._metrics.span("access_guard.load_policy", loader=name):
+                result = await asyncio.wait_for(self._fetch_policies(loader, staging_model, policy_filter), timeout)
+            return (result, time.perf_counter() - started, None), False
+        except asyncio.TimeoutError:
+            return (None, timeout, PolicyLoaderTimeoutError(name, timeout)), True
+        except Exception as e:
+            return (None, time.perf_counter() - started, e), False
+
+    @staticmethod
+    async def _fetch_policies(
+            loader: AnyPolicyLoader,
+            staging_model: Model,
+            policy_filter: Optional[dict]
+    ) -> LoadPolicyResult:
+        if isinstance(loader, AsyncPolicyLoaderABC):
+            result = await loader.fetch_policies(filter=policy_filter)
+            await asyncio.to_thread(ingest_policies, staging_model, result.policies)
+            return result
+        return await asyncio.to_thread(loader.load_policy, staging_model, filter=policy_filter) or LoadPolicyResult()
+
+    def _build_fetched_snapshot(self, sources) -> PolicySnapshot:
+        model = self._new_model()
+        result = self._adapter.merge_sources(model, sources)
+        if self._params and self._params.retain_loaded_policies:
+            self._last_load_result = result
+        resource_prefix = self._snapshot.resource_prefix
+        # todo: right now only applying the first resource_prefix, same as PermissionsEnforcer
+        if result.resource_prefix and not resource_prefix:
+            resource_prefix = result.resource_prefix
+
+        self._optimize(model)
+        return self._build_snapshot(model, resource_prefix)
+
+    async def aclose(self) -> None:
+        self.stop_background_refresh()
+        # waits for a change being applied, which needs the loop
+        await asyncio.to_thread(self._stop_watching)
+        if self._reconcile_task is not None and not self._reconcile_task.done():
+            self._reconcile_task.cancel()
+        for loader in self._policy_loaders:
+            if isinstance(loader, AsyncPolicyLoaderABC):
+                await loader.close()
@@ -0,0 +1,55 @@
+from typing import Optional
+
+from access_guard.authz.cache.lru_cache import LRUCache
+from access_guard.authz.models.cache_stats import CacheStats
+
+
+class DecisionCache:
+    """
+    Bounded cache of enforce decisions keyed on (subject, qualified resource, action).
+
+    With lazy user slices, entries are also keyed on the slice_epoch of the slice they were
+    computed against, so a reloaded slice (e.g. after its TTL) never serves decisions of the
+    expired one.
+
+    Every entry is tagged with the policy generation it was computed against. When the
+    enforcer reloads its policies it moves the cache to the new generation, which drops all
+    entries; a result computed against an older generation that lands after the switch can
+    never be served, and is eventually evicted by the LRU.
+    """
+
+    def __init__(self, max_size: int, ttl: Optional[float] = None):
+        self._cache = LRUCache(max_size, ttl=ttl)
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, subject: str, resource: str, action: str, slice_epoch: int = 0) -> Optional[bool]:
+        return self._cache.get((self._generation, slice_epoch, subject, resource, action))
+
+    def put(
+            self,
+            subject: str,
+            resource: str,
+            action: str,
+            decision: bool,
+            generation: int,
+            slice_epoch: int = 0
+    ) -> None:
+        if generation != self._generation:
+            return
+        self._cache.put((generation, slice_epoch, subject, resource, action), decision)
+
+    def set_generation(self, generation: int) -> None:
+        if generation == self._generation:
+            return
+        self._generation = generation
+        self._cache.clear()
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> CacheStats:
+        return self._cache.stats()
@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from access_guard.authz.models.cache_stats import CacheStats
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with a size cap and an optional per-entry TTL.
+
+    With a weigh function, max_size caps the total weight of the entries instead of their number
+    (the most recent entry is always kept, even when it alone exceeds the cap). on_evict is called
+    with the key and value of every entry dropped for capacity or expiry, outside the lock.
+    """
+
+    def __init__(
+            self,
+            max_size: int,
+            ttl: Optional[float] = None,
+            clock: Callable[[], float] = time.monotonic,
+            weigh: Optional[Callable[[Any], int]] = None,
+            on_evict: Optional[Callable[[Hashable, Any], None]] = None
+    ):
+        if max_size <= 0:
+            raise ValueError("max_size must be a positive integer")
+        if ttl is not None and ttl <= 0:
+            raise ValueError("ttl must be positive when set")
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._weigh = weigh
+        self._on_evict = on_evict
+        self._weight = 0
+        self._entries: "OrderedDict[Hashable, tuple[Any, Optional[float], int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self._misses += 1
+                return default
+
+            value, expires_at, weight = entry
+            if expires_at is None or expires_at > self._clock():
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return value
+
+            del self._entries[key]
+            self._weight -= weight
+            self._expirations += 1
+            self._misses += 1
+
+        if self._on_evict is not None:
+            self._on_evict(key, value)
+        return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        expires_at = self._clock() + self.ttl if self.ttl is not None else None
+        weight = self._weigh(value) if self._weigh is not None else 1
+        evicted = []
+        with self._lock:
+            previous = self._entries.pop(key, _MISSING)
+            if previous is not _MISSING:
+                self._weight -= previous[2]
+            self._entries[key] = (value, expires_at, weight)
+            self._weight += weight
+            while self._weight > self.max_size and len(self._entries) > 1:
+                evicted_key, entry = self._entries.popitem(last=False)
+                self._weight -= entry[2]
+                self._evictions += 1
+                evicted.append((evicted_key, entry[0]))
+
+        if self._on_evict is not None:
+            for evicted_key, evicted_value in evicted:
+                self._on_evict(evicted_key, evicted_value)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.pop(key, _MISSING)
+            if entry is not _MISSING:
+                self._weight -= entry[2]
+        return default if entry is _MISSING else entry[0]
+
+    def items(self) -> list:
+        """
+        The (key, value) pairs currently cached, least recently used first, without touching their recency.
+        """
+        with self._lock:
+            return [(key, entry[0]) for key, entry in self._entries.items()]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._weight = 0
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                expirations=self._expirations,
+                size=self._weight,
+                max_size=self.max_size,
+                ttl=self.ttl,
+            )
@@ -0,0 +1,56 @@
+from typing import Callable, Optional
+
+from access_guard.authz.cache.lru_cache import LRUCache
+from access_guard.authz.cache.single_flight import SingleFlight
+from access_guard.authz.loaders.policy_ingest import count_policies
+from access_guard.authz.models.cache_stats import CacheStats
+from access_guard.authz.models.policy_snapshot import PolicySnapshot
+
+
+def _slice_weight(user_slice: PolicySnapshot) -> int:
+    return count_policies(user_slice.model)
+
+
+class UserSliceCache:
+    """
+    Per-user policy snapshots built on demand, bounded by the total number of rules their models hold.
+
+    Entries are keyed on (generation, subject) like the decision cache, so a slice built against
+    a previous generation is never served once the enforcer publishes a new one. Concurrent misses
+    for the same user share a single build.
+    """
+
+    def __init__(self, max_rules: int, ttl: Optional[float] = None):
+        self._cache = LRUCache(max_rules, ttl=ttl, weigh=_slice_weight)
+        self._builds = SingleFlight()
+        self._generation = 0
+
+    def get_or_build(
+            self,
+            subject: str,
+            base: PolicySnapshot,
+            build: Callable[[str, PolicySnapshot], PolicySnapshot]
+    ) -> PolicySnapshot:
+        key = (base.generation, subject)
+        user_slice = self._cache.get(key)
+        if user_slice is None:
+            user_slice = self._builds.do(key, lambda: self._build(key, subject, base, build))
+        return user_slice
+
+    def _build(self, key, subject: str, base: PolicySnapshot, build) -> PolicySnapshot:
+        user_slice = build(subject, base)
+        if key[0] == self._generation:
+            self._cache.put(key, user_slice)
+        return user_slice
+
+    def set_generation(self, generation: int) -> None:
+        if generation == self._generation:
+            return
+        self._generation = generation
+        self._cache.clear()
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> CacheStats:
+        return self._cache.stats()
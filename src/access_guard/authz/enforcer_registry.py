@@ -0,0 +1,132 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from access_guard.authz.cache.lru_cache import LRUCache
+from access_guard.authz.cache.single_flight import SingleFlight
+from access_guard.authz.loaders.policy_provider_abc import PolicyProvider
+from access_guard.authz.models.cache_stats import CacheStats
+from access_guard.authz.models.permissions_enforcer_params import PermissionsEnforcerParams
+from access_guard.authz.permissions_enforcer import PermissionsEnforcer, resolve_model_path
+
+logger = logging.getLogger(__name__)
+
+# a rough resident size of one loaded rule (model list, compiled index, role closures), in bytes
+DEFAULT_BYTES_PER_RULE = 512
+DEFAULT_MEMORY_BUDGET = 1 << 30
+
+LoaderFactory = Callable[[PermissionsEnforcerParams], List[PolicyProvider]]
+RegistryKey = Tuple[str, str]
+
+
+def registry_key(params: PermissionsEnforcerParams) -> RegistryKey:
+    """
+    The scope an enforcer serves: its resolved model path and its filter, normalized so that equal
+    filters written differently (key order, {} vs None) share one enforcer.
+    """
+    normalized_filter = json.dumps(params.filter or None, sort_keys=True, separators=(",", ":"), default=str)
+    return resolve_model_path(params.rbac_model_path), normalized_filter
+
+
+class EnforcerRegistry:
+    """
+    One PermissionsEnforcer per scope (filter and model path), built on first use.
+
+    Every enforcer gets its own loaders from loaders_for(params), so a process can serve many apps
+    side by side; their model definition is parsed once and shared. Enforcers are kept in an LRU
+    bounded by memory_budget bytes, estimated from their rule counts at build time: building one
+    past the budget stops and drops the least recently used ones. Concurrent first requests for
+    the same scope share one build.
+
+    Per-enforcer files (snapshot_path, shared_store_dir) are suffixed with a digest of the scope.
+    """
+
+    def __init__(
+            self,
+            params: PermissionsEnforcerParams,
+            loaders_for: LoaderFactory,
+            memory_budget: int = DEFAULT_MEMORY_BUDGET,
+            bytes_per_rule: int = DEFAULT_BYTES_PER_RULE
+    ):
+        self._params = params
+        self._loaders_for = loaders_for
+        self._bytes_per_rule = bytes_per_rule
+        self._enforcers = LRUCache(memory_budget, weigh=self._estimate_size, on_evict=self._close)
+        self._builds = SingleFlight()
+
+    def get(self, filter: Optional[Dict[str, Any]] = None, rbac_model_path: Optional[str] = None) -> PermissionsEnforcer:
+        """
+        The enforcer of the scope, built and loaded first if the registry holds none.
+        """
+        params = self._params_for(filter, rbac_model_path)
+        key = registry_key(params)
+        enforcer = self._enforcers.get(key)
+        if enforcer is None:
+            enforcer = self._builds.do(key, lambda: self._build(key, params))
+        return enforcer
+
+    def _params_for(self, filter: Optional[Dict[str, Any]], rbac_model_path: Optional[str]) -> PermissionsEnforcerParams:
+        return self._params.model_copy(update={
+            "filter": filter,
+            "rbac_model_path": rbac_model_path or self._params.rbac_model_path,
+        })
+
+    def _build(self, key: RegistryKey, params: PermissionsEnforcerParams) -> PermissionsEnforcer:
+        # a concurrent build of the key may have finished between our miss and the single-flight
+        enforcer = self._enforcers.get(key)
+        if enforcer is not None:
+            return enforcer
+
+        params = _scope_files(params, key)
+        enforcer = PermissionsEnforcer(params, self._loaders_for(params))
+        self._enforcers.put(key, enforcer)
+        logger.info(f"Built enforcer for filter {key[1]} ({enforcer.policy_count} rules)")
+        return enforcer
+
+    def evict(self, filter: Optional[Dict[str, Any]] = None, rbac_model_path: Optional[str] = None) -> bool:
+        """
+        Stop and drop the enforcer of the scope. Returns whether there was one.
+        """
+        key = registry_key(self._params_for(filter, rbac_model_path))
+        enforcer = self._enforcers.pop(key)
+        if enforcer is None:
+            return False
+        self._close(key, enforcer)
+        return True
+
+    def close(self) -> None:
+        """
+        Stop and drop every enforcer.
+        """
+        for key, enforcer in self._enforcers.items():
+            self._enforcers.pop(key)
+            self._close(key, enforcer)
+
+    def __len__(self) -> int:
+        return len(self._enforcers)
+
+    def stats(self) -> CacheStats:
+        """
+        Lookups and evictions; size is the estimated memory of the held enforcers, in bytes.
+        """
+        return self._enforcers.stats()
+
+    def _estimate_size(self, enforcer: PermissionsEnforcer) -> int:
+        return max(1, enforcer.policy_count) * self._bytes_per_rule
+
+    @staticmethod
+    def _close(key: Hashable, enforcer: PermissionsEnforcer) -> None:
+        logger.info(f"Dropping enforcer for filter {key[1]}")
+        enforcer.close()
+
+
+def _scope_files(params: PermissionsEnforcerParams, key: RegistryKey) -> PermissionsEnforcerParams:
+    digest = hashlib.blake2b("\0".join(key).encode(), digest_size=8).hexdigest()
+    update = {}
+    if params.snapshot_path:
+        update["snapshot_path"] = f"{params.snapshot_path}.{digest}"
+    if params.shared_store_dir:
+        update["shared_store_dir"] = os.path.join(params.shared_store_dir, digest)
+    return params.model_copy(update=update) if update else params
@@ -0,0 +1,371 @@
+import logging
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from casbin import Model
+
+from access_guard.authz.engine.key_match import compile_key_match3
+from access_guard.authz.engine.pattern_set import PatternSet
+from access_guard.authz.engine.resource_trie import WILDCARD_ACTION, ActionEffects, ResourceTrie
+from access_guard.authz.engine.role_index import MAX_HIERARCHY_LEVEL, RoleIndex
+from access_guard.authz.models.decision_explanation import DecisionExplanation
+
+logger = logging.getLogger(__name__)
+
+# The shipped config/rbac_model.conf, as casbin stores it after parsing (whitespace removed)
+_SUPPORTED_MODEL = {
+    ("r", "r"): "sub,obj,act",
+    ("p", "p"): "sub,obj,act,eft",
+    ("g", "g"): "_,_",
+    ("e", "e"): "some(where(p_eft==allow))&&!some(where(p_eft==deny))",
+    ("m", "m"): 'g(r_sub,p_sub)&&key_match3(r_obj,p_obj)&&(r_act==p_act||p_act=="*")',
+}
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class CompiledPolicyEngine:
+    """
+    Enforcement engine specialised for the shipped RBAC model.
+
+    The p rules of every subject are indexed in a ResourceTrie with per-action allow/deny sets,
+    so a decision only visits the trie branches of the requester's effective roles instead of
+    evaluating the matcher against every rule. Decisions are identical to casbin's for that
+    model. An engine is immutable once compiled; a full reload compiles a new one and a delta
+    produces a copy that only rebuilds the subjects it touches.
+    """
+
+    def __init__(
+            self,
+            roles: RoleIndex,
+            rules_by_subject: Dict[str, List[Sequence[str]]],
+            tries: Dict[str, ResourceTrie]
+    ):
+        self._roles = roles
+        self._rules_by_subject = rules_by_subject
+        self._tries = tries
+        self._pattern_set: Optional[PatternSet] = None
+
+    @staticmethod
+    def supports_model(model: Model) -> bool:
+        """
+        Whether the model has exactly the shape of the shipped config/rbac_model.conf.
+        """
+        sections = {(sec, key) for sec in model.keys() for key in model[sec].keys()}
+        if sections != set(_SUPPORTED_MODEL):
+            return False
+
+        for (sec, key), expected in _SUPPORTED_MODEL.items():
+            if _WHITESPACE.sub("", model[sec][key].value) != expected:
+                return False
+        return True
+
+    @classmethod
+    def compile(cls, model: Model) -> Optional["CompiledPolicyEngine"]:
+        """
+        Build an engine from the policies loaded in the model.
+
+        Returns None when the policies cannot be compiled faithfully (malformed rules or
+        patterns casbin itself would fail on); the caller should keep enforcing with casbin.
+        """
+        role_links: Dict[str, List[str]] = defaultdict(list)
+        rules_by_subject: Dict[str, List[Sequence[str]]] = defaultdict(list)
+
+        for rule in model["g"]["g"].policy:
+            if not _is_valid_grouping_rule(rule):
+                return None
+            role_links[rule[0]].append(rule[1])
+
+        for rule in model["p"]["p"].policy:
+            if not _is_valid_policy_rule(rule):
+                return None
+            rules_by_subject[rule[0]].append(rule)
+
+        tries = _build_tries(rules_by_subject, rules_by_subject.keys())
+        if tries is None:
+            return None
+        return cls(RoleIndex.build(dict(role_links)), dict(rules_by_subject), tries)
+
+    def apply_delta(
+            self,
+            added: Iterable[Sequence[str]],
+            removed: Iterable[Sequence[str]]
+    ) -> Optional["CompiledPolicyEngine"]:
+        """
+        Return a new engine with the (ptype, ...) rules added and removed.
+
+        Rule lists and tries are copied only for the subjects the delta touches, and the role
+        index only recomputes the closures the delta can change; everything else is shared with
+        this engine. A removal drops one occurrence of the rule. Returns None when a rule is
+        malformed, like compile.
+        """
+        rules_by_subject = dict(self._rules_by_subject)
+        touched_rules: Set[str] = set()
+        added_links: List[Tuple[str, str]] = []
+        removed_links: List[Tuple[str, str]] = []
+        added_patterns: List[str] = []
+
+        def rules_of(subject: str) -> List[Sequence[str]]:
+            if subject not in touched_rules:
+                touched_rules.add(subject)
+                rules_by_subject[subject] = list(rules_by_subject.get(subject, ()))
+            return rules_by_subject[subject]
+
+        for policy, is_removal in _tag(removed, True) + _tag(added, False):
+            ptype, rule = policy[0], list(policy[1:])
+            if ptype == "g":
+                if not _is_valid_grouping_rule(rule):
+                    return None
+                (removed_links if is_removal else added_links).append((rule[0], rule[1]))
+            elif ptype == "p":
+                if not _is_valid_policy_rule(rule):
+                    return None
+                rules = rules_of(rule[0])
+                if not is_removal:
+                    rules.append(rule)
+                    added_patterns.append(rule[1])
+                elif rule in rules:
+                    rules.remove(rule)
+
+        rebuilt = _build_tries(rules_by_subject, touched_rules)
+        if rebuilt is None:
+            return None
+        tries = dict(self._tries)
+        for subject in touched_rules:
+            tries.pop(subject, None)
+            if rules_by_subject[subject]:
+                tries[subject] = rebuilt[subject]
+            else:
+                del rules_by_subject[subject]
+
+        roles = self._roles
+        if added_links or removed_links:
+            roles = roles.apply_delta(added_links, removed_links)
+        engine = CompiledPolicyEngine(roles, rules_by_subject, tries)
+        pattern_set = self._pattern_set
+        if pattern_set is not None:
+            # the tries compiled these patterns already, they are valid
+            pattern_set.add(added_patterns)
+            engine._pattern_set = pattern_set
+        return engine
+
+    def slice_for(self, subject: str, model: Model) -> Optional["CompiledPolicyEngine"]:
+        """
+        An engine answering for subject alone, from the rules of this engine plus the ones loaded
+        into model for the subject and its roles (a lazy user slice).
+
+        Only the subject's effective roles are indexed. Their tries are shared with this engine,
+        except for the roles model adds p rules to, which are compiled again. Returns None when
+        a rule is malformed, like compile.
+        """
+        slice_links: Dict[str, List[str]] = defaultdict(list)
+        slice_rules: Dict[str, List[Sequence[str]]] = defaultdict(list)
+        for rule in model["g"]["g"].policy:
+            if not _is_valid_grouping_rule(rule):
+                return None
+            slice_links[rule[0]].append(rule[1])
+        for rule in model["p"]["p"].policy:
+            if not _is_valid_policy_rule(rule):
+                return None
+            slice_rules[rule[0]].append(rule)
+
+        # the links within reach of the subject, enough for its closure
+        links: Dict[str, List[str]] = {}
+        seen, frontier = {subject}, [subject]
+        for _ in range(MAX_HIERARCHY_LEVEL):
+            next_frontier = []
+            for name in frontier:
+                roles = [*self._roles.direct_roles(name), *slice_links.get(name, ())]
+                if roles:
+                    links[name] = roles
+                for role in roles:
+                    if role not in seen:
+                        seen.add(role)
+                        next_frontier.append(role)
+            if not next_frontier:
+                break
+            frontier = next_frontier
+        roles = RoleIndex.build(links)
+
+        rules_by_subject: Dict[str, List[Sequence[str]]] = {}
+        tries: Dict[str, ResourceTrie] = {}
+        for role in roles.get(subject):
+            base_rules = self._rules_by_subject.get(role)
+            if role in slice_rules:
+                rules_by_subject[role] = [*(base_rules or ()), *slice_rules[role]]
+            elif base_rules:
+                rules_by_subject[role] = base_rules
+                tries[role] = self._tries[role]
+        rebuilt = _build_tries(rules_by_subject, [role for role in rules_by_subject if role not in tries])
+        if rebuilt is None:
+            return None
+        tries.update(rebuilt)
+        return CompiledPolicyEngine(roles, rules_by_subject, tries)
+
+    def get_direct_roles(self, subject: str) -> Sequence[str]:
+        """
+        The roles the subject is linked to by its own g rules.
+        """
+        return self._roles.direct_roles(subject)
+
+    def get_subject_roles(self, subject: str) -> Tuple[str, ...]:
+        """
+        The subject itself followed by every role it inherits, nearest first.
+        """
+        return self._roles.get(subject)
+
+    def get_subject_rules(self, subject: str) -> List[Sequence[str]]:
+        """
+        The p rules (sub, obj, act, eft) of the subject and of every role it inherits.
+        """
+        rules_by_subject = self._rules_by_subject
+        return [
+            rule
+            for role in self._roles.get(subject)
+            for rule in rules_by_subject.get(role, ())
+        ]
+
+    def count_subject_rules(self, subject: str) -> int:
+        rules_by_subject = self._rules_by_subject
+        return sum(len(rules_by_subject.get(role, ())) for role in self._roles.get(subject))
+
+    @property
+    def pattern_set(self) -> PatternSet:
+        """
+        Every distinct resource pattern of the p rules, compiled on first use. Engines derived
+        with apply_delta extend the same set; patterns of removed rules stay in it, matching
+        no rule, until the next full load.
+        """
+        pattern_set = self._pattern_set
+        if pattern_set is None:
+            pattern_set = self._pattern_set = PatternSet(
+                rule[1] for rules in self._rules_by_subject.values() for rule in rules
+            )
+        return pattern_set
+
+    def get_pattern_effects(self, subject: str) -> Dict[int, ActionEffects]:
+        """
+        The actions allowed and denied to the subject, by pattern_set id, for decide_matches.
+        """
+        ids = self.pattern_set.id_of
+        effects: Dict[int, ActionEffects] = {}
+        for _, obj, action, effect in self.get_subject_rules(subject):
+            pattern_id = ids(obj)
+            pattern_effects = effects.get(pattern_id)
+            if pattern_effects is None:
+                pattern_effects = effects[pattern_id] = ActionEffects()
+            pattern_effects.add(action, effect)
+        return effects
+
+    def get_candidate_tries(self, subject: str) -> List[ResourceTrie]:
+        """
+        The rule indexes of every effective role of the subject that holds at least one p rule.
+        """
+        tries = self._tries
+        return [tries[role] for role in self.get_subject_roles(subject) if role in tries]
+
+    def enforce(self, subject: str, resource: str, action: str) -> bool:
+        return self.decide(self.get_candidate_tries(subject), resource, action)
+
+    def explain(self, subject: str, resource: str, action: str) -> DecisionExplanation:
+        """
+        The rule deciding enforce(subject, resource, action) and the role path leading to it.
+        The candidates are the rules of the subject's effective roles, the ones its tries index;
+        each is matched on its own, so this is much slower than enforce.
+        """
+        rules = self.get_subject_rules(subject)
+        matched = find_deciding_rule(rules, resource, action)
+        if matched is None:
+            return DecisionExplanation(matched_rule=None, candidates_scanned=len(rules))
+        return DecisionExplanation(
+            matched_rule=tuple(matched),
+            candidates_scanned=len(rules),
+            role_path=self._roles.path(subject, matched[0]),
+        )
+
+    @staticmethod
+    def decide_matches(effects: Dict[int, ActionEffects], pattern_ids: Iterable[int], action: str) -> bool:
+        """
+        Decide from the pattern_set ids matching a resource, given get_pattern_effects.
+        """
+        allowed = False
+        for pattern_id in pattern_ids:
+            pattern_effects = effects.get(pattern_id)
+            if pattern_effects is None:
+                continue
+            if pattern_effects.denies(action):
+                return False
+            allowed = allowed or pattern_effects.allows(action)
+        return allowed
+
+    @staticmethod
+    def decide(candidates: List[ResourceTrie], resource: str, action: str) -> bool:
+        segments = resource.split("/")
+        allowed = False
+        for trie in candidates:
+            role_allowed, role_denied = trie.match(resource, segments, action)
+            if role_denied:
+                return False
+            allowed = allowed or role_allowed
+        return allowed
+
+
+def find_deciding_rule(
+        rules: Iterable[Sequence[str]],
+        resource: str,
+        action: str
+) -> Optional[Sequence[str]]:
+    """
+    Among (sub, obj, act, eft) rules of the shipped model, the first deny matching the request,
+    else the first matching allow. Malformed rules are skipped.
+    """
+    matched = None
+    for rule in rules:
+        if len(rule) != 4:
+            continue
+        _, obj, rule_action, effect = rule
+        if effect not in ("allow", "deny") or (matched is not None and effect == "allow"):
+            continue
+        if rule_action != action and rule_action != WILDCARD_ACTION:
+            continue
+        if compile_key_match3(obj).match(resource) is None:
+            continue
+        matched = rule
+        if effect == "deny":
+            break
+    return matched
+
+
+def _tag(policies: Iterable[Sequence[str]], is_removal: bool) -> list:
+    return [(policy, is_removal) for policy in policies]
+
+
+def _is_valid_grouping_rule(rule: Sequence[str]) -> bool:
+    if len(rule) < 2:
+        logger.warning(f"Not compiling policies, malformed grouping rule: {rule}")
+        return False
+    return True
+
+
+def _is_valid_policy_rule(rule: Sequence[str]) -> bool:
+    if len(rule) != 4:
+        logger.warning(f"Not compiling policies, malformed policy rule: {rule}")
+        return False
+    return True
+
+
+def _build_tries(
+        rules_by_subject: Dict[str, List[Sequence[str]]],
+        subjects: Iterable[str]
+) -> Optional[Dict[str, ResourceTrie]]:
+    tries = {}
+    try:
+        for subject in subjects:
+            trie = tries[subject] = ResourceTrie()
+            for _, obj, action, effect in rules_by_subject.get(subject, ()):
+                trie.add(obj, action, effect)
+    except re.error as e:
+        logger.warning(f"Not compiling policies, invalid resource pattern: {e}")
+        return None
+    return tries
@@ -0,0 +1,83 @@
+import re
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+# Same substitutions casbin's key_match2 and key_match3 apply to ":param" and "{param}" placeholders.
+KEY_MATCH2_PARAM_PATTERN = re.compile(r"(.*?):[^\/]+(.*?)")
+KEY_MATCH3_PARAM_PATTERN = re.compile(r"(.*?){[^\/]+?}(.*?)")
+
+_PARAM_SEGMENT = re.compile(r"^\{[^/{}]+\}$")
+_REGEX_METACHARS = frozenset(".^$*+?{}[]\\|()")
+
+# Segment kinds of a parsed key_match3 pattern
+LITERAL = 0
+PARAM = 1
+REST = 2
+
+
+@lru_cache(maxsize=65536)
+def compile_key_match3(pattern: str) -> re.Pattern:
+    """
+    Compile a key_match3 pattern into the exact regular expression casbin builds for it.
+    """
+    regex = pattern.replace("/*", "/.*")
+    regex = KEY_MATCH3_PARAM_PATTERN.sub(r"\g<1>[^\/]+\g<2>", regex, 0)
+    return re.compile("^" + regex + "$")
+
+
+def key_match3(key1: str, key2: str) -> bool:
+    """
+    Drop-in replacement for casbin.util.key_match3 that reuses the compiled pattern.
+    """
+    return compile_key_match3(key2).match(key1) is not None
+
+
+@lru_cache(maxsize=65536)
+def compile_key_match2(pattern: str) -> re.Pattern:
+    """
+    Compile a key_match2 pattern into the exact regular expression casbin builds for it.
+    """
+    regex = pattern.replace("/*", "/.*")
+    regex = KEY_MATCH2_PARAM_PATTERN.sub(r"\g<1>[^\/]+\g<2>", regex, 0)
+    if regex == "*":
+        regex = "(.*)"
+    return re.compile("^" + regex + "$")
+
+
+def key_match2(key1: str, key2: str) -> bool:
+    """
+    Drop-in replacement for casbin.util.key_match2 that reuses the compiled pattern.
+    """
+    return compile_key_match2(key2).match(key1) is not None
+
+
+def is_literal_pattern(pattern: str) -> bool:
+    """
+    Whether key_match3 matches the pattern only against itself (no wildcard, placeholder or regex syntax).
+    """
+    return _REGEX_METACHARS.isdisjoint(pattern)
+
+
+def parse_key_match3(pattern: str) -> Optional[List[Tuple[int, str]]]:
+    """
+    Split a key_match3 pattern into path segments the resource trie can index.
+
+    Returns a list of (kind, value) pairs, where kind is LITERAL (segment compared verbatim),
+    PARAM (a whole "{name}" segment, matching one non-empty segment) or REST (a trailing "/*",
+    matching anything after the slash). Returns None for patterns whose regex semantics do not
+    decompose into segments (regex metacharacters, partial placeholders, inner wildcards);
+    those must be matched with compile_key_match3.
+    """
+    raw_segments = pattern.split("/")
+    last = len(raw_segments) - 1
+    segments = []
+    for i, segment in enumerate(raw_segments):
+        if segment == "*" and i == last and i > 0:
+            segments.append((REST, segment))
+        elif _PARAM_SEGMENT.match(segment):
+            segments.append((PARAM, segment))
+        elif _REGEX_METACHARS.isdisjoint(segment):
+            segments.append((LITERAL, segment))
+        else:
+            return None
+    return segments
@@ -0,0 +1,127 @@
+import re
+from sys import intern
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from access_guard.authz.engine.key_match import LITERAL, PARAM, compile_key_match3, parse_key_match3
+
+
+class _PatternNode:
+    __slots__ = ("children", "param", "rest", "terminal")
+
+    def __init__(self):
+        self.children: Dict[str, "_PatternNode"] = {}
+        self.param: Optional["_PatternNode"] = None
+        self.rest: Tuple[int, ...] = ()
+        self.terminal: Tuple[int, ...] = ()
+
+
+class PatternSet:
+    """
+    The distinct key_match3 patterns of one policy generation, compiled once.
+
+    Patterns get ids (their index in patterns) and are merged into one segment automaton, so
+    the ids of every pattern matching a resource come out of a single walk of its segments,
+    instead of one regex per resource-pattern pair. Patterns that cannot be expressed per
+    segment are matched with their regex. key_match3 serves casbin's matcher from the same
+    compiled patterns.
+
+    add only appends, so readers of a shared set keep seeing the ids they know while a writer
+    adds patterns.
+    """
+
+    def __init__(self, patterns: Iterable[str] = ()):
+        self.patterns: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._root = _PatternNode()
+        self._regex_ids: List[Tuple[re.Pattern, int]] = []
+        # key_match3 regexes compiled so far, built on first use and kept for the generation
+        self._regexes: Dict[str, re.Pattern] = {}
+        self.add(patterns)
+
+    def add(self, patterns: Iterable[str]) -> None:
+        """
+        Give an id to every pattern not in the set yet. Raises re.error on invalid patterns.
+        """
+        for pattern in patterns:
+            if pattern not in self._ids:
+                self._insert(pattern, len(self.patterns))
+                self._ids[pattern] = len(self.patterns)
+                self.patterns.append(pattern)
+
+    def _insert(self, pattern: str, index: int) -> None:
+        segments = parse_key_match3(pattern)
+        if segments is None:
+            self._regex_ids.append((self.regex(pattern), index))
+            return
+
+        node = self._root
+        for kind, value in segments:
+            if kind == LITERAL:
+                child = node.children.get(value)
+                if child is None:
+                    child = node.children[intern(value)] = _PatternNode()
+                node = child
+            elif kind == PARAM:
+                if node.param is None:
+                    node.param = _PatternNode()
+                node = node.param
+            else:
+                node.rest += (index,)
+                return
+        node.terminal += (index,)
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def id_of(self, pattern: str) -> Optional[int]:
+        return self._ids.get(pattern)
+
+    def regex(self, pattern: str) -> re.Pattern:
+        regex = self._regexes.get(pattern)
+        if regex is None:
+            regex = self._regexes[pattern] = compile_key_match3(pattern)
+        return regex
+
+    def key_match3(self, key1: str, key2: str) -> bool:
+        """
+        casbin's key_match3(key1, key2), without building the pattern's regex again.
+        """
+        return self.regex(key2).match(key1) is not None
+
+    def match(self, resource: str) -> List[int]:
+        """
+        The ids of the patterns matching the resource, in no particular order.
+        """
+        matched: List[int] = []
+        self._walk(self._root, resource.split("/"), 0, matched)
+        for regex, index in self._regex_ids:
+            if regex.match(resource):
+                matched.append(index)
+        return matched
+
+    def match_many(self, resources: Iterable[str]) -> List[List[int]]:
+        """
+        match for every resource, in input order; repeated resources are matched once.
+        """
+        seen: Dict[str, List[int]] = {}
+        results = []
+        for resource in resources:
+            matched = seen.get(resource)
+            if matched is None:
+                matched = seen[resource] = self.match(resource)
+            results.append(matched)
+        return results
+
+    def _walk(self, node: _PatternNode, segments: List[str], index: int, matched: List[int]) -> None:
+        while True:
+            if index == len(segments):
+                matched.extend(node.terminal)
+                return
+            matched.extend(node.rest)
+            segment = segments[index]
+            if node.param is not None and segment:
+                self._walk(node.param, segments, index + 1, matched)
+            node = node.children.get(segment)
+            if node is None:
+                return
+            index += 1
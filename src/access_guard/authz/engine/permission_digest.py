@@ -0,0 +1,163 @@
+"""
+Signed digest of one user's effective permissions, evaluated without loading any policy.
+
+Token layout: "ag1.<payload>.<signature>", both parts base64url without padding. The payload
+is zlib-compressed JSON:
+
+    {"v": 1, "sub": subject, "gen": policy generation, "iat": issued at, "exp": expires at or
+     null, "prefix": resource prefix, "roles": [role, ...], "rules": [[pattern, action, effect], ...]}
+
+The signature is the HMAC-SHA256 of "ag1.<payload>" with a key shared by the issuing enforcer and
+the services evaluating the digest. Rules are the key_match3 patterns of the shipped RBAC model,
+already resolved through the user's roles, so a decision is a single trie lookup.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import re
+import time
+import zlib
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+
+from access_guard.authz.engine.resource_trie import ResourceTrie
+from access_guard.authz.exceptions import InvalidPermissionDigestError, PermissionDeniedError
+
+DIGEST_FORMAT_VERSION = 1
+DIGEST_PREFIX = f"ag{DIGEST_FORMAT_VERSION}"
+
+Keys = Union[bytes, Sequence[bytes]]
+
+
+def encode_permission_digest(
+        subject: str,
+        roles: Iterable[str],
+        rules: Iterable[Sequence[str]],
+        key: bytes,
+        resource_prefix: str = "",
+        generation: int = 0,
+        ttl: Optional[float] = None,
+        now: Optional[float] = None
+) -> str:
+    """
+    Sign the digest of a subject's roles and (pattern, action, effect) rules. It expires ttl
+    seconds after now, or never when ttl is None.
+    """
+    issued_at = int(time.time() if now is None else now)
+    payload = {
+        "v": DIGEST_FORMAT_VERSION,
+        "sub": subject,
+        "gen": generation,
+        "iat": issued_at,
+        "exp": None if ttl is None else issued_at + int(ttl),
+        "prefix": resource_prefix,
+        "roles": list(roles),
+        # order kept, duplicates dropped
+        "rules": [list(rule) for rule in dict.fromkeys(tuple(rule) for rule in rules)],
+    }
+    body = zlib.compress(json.dumps(payload, separators=(",", ":")).encode())
+    signed = f"{DIGEST_PREFIX}.{_b64encode(body)}"
+    return f"{signed}.{_b64encode(_sign(key, signed))}"
+
+
+def decode_permission_digest(token: str, keys: Keys, now: Optional[float] = None) -> "PermissionDigest":
+    """
+    Verify a digest against one of keys (several allow rotating them) and return its evaluator.
+    Raises InvalidPermissionDigestError when it is malformed, badly signed or expired.
+    """
+    if isinstance(keys, bytes):
+        keys = (keys,)
+    parts = token.split(".")
+    if len(parts) != 3:
+        raise InvalidPermissionDigestError("Malformed permission digest")
+    if parts[0] != DIGEST_PREFIX:
+        raise InvalidPermissionDigestError(f"Unsupported permission digest version {parts[0]!r}")
+
+    signed = f"{parts[0]}.{parts[1]}"
+    try:
+        signature = _b64decode(parts[2])
+    except ValueError as e:
+        raise InvalidPermissionDigestError("Malformed permission digest signature") from e
+    if not any(hmac.compare_digest(_sign(key, signed), signature) for key in keys):
+        raise InvalidPermissionDigestError("Invalid permission digest signature")
+
+    try:
+        payload = json.loads(zlib.decompress(_b64decode(parts[1])))
+        if payload["v"] != DIGEST_FORMAT_VERSION:
+            raise InvalidPermissionDigestError(f"Unsupported permission digest version {payload['v']!r}")
+        digest = PermissionDigest(
+            subject=payload["sub"],
+            roles=payload["roles"],
+            rules=payload["rules"],
+            resource_prefix=payload["prefix"],
+            generation=payload["gen"],
+            issued_at=payload["iat"],
+            expires_at=payload["exp"],
+        )
+    except InvalidPermissionDigestError:
+        raise
+    except (ValueError, KeyError, TypeError, zlib.error, re.error) as e:
+        raise InvalidPermissionDigestError(f"Malformed permission digest payload: {e}") from e
+
+    if digest.expires_at is not None and (time.time() if now is None else now) >= digest.expires_at:
+        raise InvalidPermissionDigestError(f"Permission digest of {digest.subject} expired")
+    return digest
+
+
+class PermissionDigest:
+    """
+    Decisions for the subject of a digest, identical to the issuing enforcer's at its
+    generation: an item is allowed when one of its actions is allowed by a rule and denied by
+    none.
+    """
+    __slots__ = ("subject", "roles", "rules", "resource_prefix", "generation", "issued_at", "expires_at", "_trie")
+
+    def __init__(
+            self,
+            subject: str,
+            roles: Sequence[str],
+            rules: Sequence[Sequence[str]],
+            resource_prefix: str = "",
+            generation: int = 0,
+            issued_at: int = 0,
+            expires_at: Optional[int] = None
+    ):
+        self.subject = subject
+        self.roles: Tuple[str, ...] = tuple(roles)
+        self.rules: Tuple[Tuple[str, ...], ...] = tuple(tuple(rule) for rule in rules)
+        self.resource_prefix = resource_prefix
+        self.generation = generation
+        self.issued_at = issued_at
+        self.expires_at = expires_at
+        self._trie = ResourceTrie()
+        for pattern, action, effect in self.rules:
+            self._trie.add(pattern, action, effect)
+
+    def has_permission(self, resource: str, actions: Union[str, List[str]]) -> bool:
+        if self.resource_prefix:
+            resource = f"{self.resource_prefix}{resource}"
+        segments = resource.split("/")
+        for action in ([actions] if isinstance(actions, str) else actions):
+            allowed, denied = self._trie.match(resource, segments, action)
+            if allowed and not denied:
+                return True
+        return False
+
+    def has_permissions_batch(self, checks: Iterable[Tuple[str, Union[str, List[str]]]]) -> List[bool]:
+        return [self.has_permission(resource, actions) for resource, actions in checks]
+
+    def require_permission(self, resource: str, actions: Union[str, List[str]]) -> None:
+        if not self.has_permission(resource, actions):
+            raise PermissionDeniedError(self.subject, resource, actions if isinstance(actions, str) else ", ".join(actions))
+
+
+def _sign(key: bytes, signed: str) -> bytes:
+    return hmac.new(key, signed.encode(), hashlib.sha256).digest()
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
@@ -0,0 +1,315 @@
+"""
+Optional compaction of loaded policies before they are compiled.
+
+Only for the shipped RBAC model: a request is allowed when some allow rule of one of the
+requester's roles matches it and no deny rule does, a rule matching when key_match3(resource,
+p.obj) holds and p.act is the action or "*". Under these semantics a rule can be removed without
+changing any decision when another rule of the same subject and effect matches everything it
+matches (it is subsumed), or, for an allow rule, when a deny rule of the same subject does (it can
+never win).
+"""
+import logging
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from casbin import Model
+
+from access_guard.authz.engine.key_match import LITERAL, PARAM, REST, parse_key_match3
+from access_guard.authz.engine.role_index import MAX_HIERARCHY_LEVEL, RoleIndex
+from access_guard.authz.models.optimization_report import OptimizationReport
+
+logger = logging.getLogger(__name__)
+
+ALLOW = "allow"
+DENY = "deny"
+ANY_ACTION = "*"
+
+Segments = Optional[List[Tuple[int, str]]]
+
+
+def optimize_policies(model: Model, flatten_role_aliases: bool = False) -> OptimizationReport:
+    """
+    Compact the p and g rules of a model using the shipped RBAC model, in place:
+
+    - identical rules are kept once;
+    - rules covered by a broader key_match3 pattern (and the same action or "*") of the same
+      subject and effect are dropped, and so are allow rules covered by a deny of their subject;
+      denies are never dropped because of allows;
+    - with flatten_role_aliases, roles without rules and with a single parent role are removed
+      and their members linked to that parent. Decisions are unchanged, but the removed roles
+      no longer appear among the effective roles of their members. Nothing is flattened when
+      the role graph has a cycle or chains longer than casbin follows, where shortening chains
+      could grant roles casbin does not reach.
+
+    Rules of unexpected shape are kept as they are.
+    """
+    started = time.perf_counter()
+    p_assertion = model["p"]["p"]
+    g_assertion = model["g"]["g"]
+    rules_before = len(p_assertion.policy) + len(g_assertion.policy)
+
+    p_rules, p_duplicates = _deduplicate(p_assertion.policy)
+    g_rules, g_duplicates = _deduplicate(g_assertion.policy)
+    p_rules, subsumed, shadowed = _drop_covered_rules(p_rules)
+    flattened: Tuple[str, ...] = ()
+    if flatten_role_aliases:
+        g_rules, flattened = _flatten_role_aliases(g_rules, p_rules)
+
+    p_assertion.policy = p_rules
+    g_assertion.policy = g_rules
+    report = OptimizationReport(
+        rules_before=rules_before,
+        rules_after=len(p_rules) + len(g_rules),
+        duplicates=p_duplicates + g_duplicates,
+        subsumed=subsumed,
+        shadowed=shadowed,
+        flattened_roles=flattened,
+        seconds=time.perf_counter() - started,
+    )
+    logger.info(
+        f"Policy optimizer removed {report.removed} of {rules_before} rules ({report.removed_ratio:.0%}): "
+        f"{report.duplicates} duplicates, {subsumed} subsumed, {shadowed} shadowed by denies, "
+        f"{len(flattened)} role aliases flattened, in {report.seconds:.3f}s"
+    )
+    return report
+
+
+def _deduplicate(rules: Iterable[Sequence[str]]) -> Tuple[List[Sequence[str]], int]:
+    seen: Set[Tuple[str, ...]] = set()
+    kept = []
+    duplicates = 0
+    for rule in rules:
+        key = tuple(rule)
+        if key in seen:
+            duplicates += 1
+        else:
+            seen.add(key)
+            kept.append(rule)
+    return kept, duplicates
+
+
+def _generality(rule: Sequence[str], segments: Segments) -> Tuple[int, int, int, int]:
+    """
+    Sort key placing every rule after the rules that can cover it: a pattern only covers
+    patterns with at least as many segments, ending in "/*" if it does not, and with a
+    placeholder wherever they have one.
+    """
+    any_action = 0 if rule[2] == ANY_ACTION else 1
+    if segments is None:
+        return 2, 0, 0, any_action
+    rest = 0 if segments[-1][0] == REST else 1
+    params = sum(1 for kind, _ in segments if kind == PARAM)
+    return rest, len(segments), -params, any_action
+
+
+def _drop_covered_rules(rules: List[Sequence[str]]) -> Tuple[List[Sequence[str]], int, int]:
+    """
+    Returns the kept rules, in their original order, with the subsumed and shadowed counts.
+    """
+    groups: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+    for index, rule in enumerate(rules):
+        if len(rule) == 4:
+            groups[(rule[0], rule[3])].append(index)
+
+    segments = {index: parse_key_match3(rules[index][1]) for indices in groups.values() for index in indices}
+    dropped: Set[int] = set()
+    subsumed = 0
+    shadowed = 0
+    denies: Dict[str, _KeptPatterns] = {}
+    # denies first, they shadow the allows of their subject
+    for (subject, effect), indices in sorted(groups.items(), key=lambda item: item[0][1] != DENY):
+        kept = _KeptPatterns()
+        shadowing = denies.get(subject) if effect == ALLOW else None
+        indices.sort(key=lambda index: _generality(rules[index], segments[index]))
+        for index in indices:
+            rule = rules[index]
+            if kept.covers(rule[1], segments[index], rule[2]):
+                subsumed += 1
+                dropped.add(index)
+            elif shadowing is not None and shadowing.covers(rule[1], segments[index], rule[2]):
+                shadowed += 1
+                dropped.add(index)
+            else:
+                kept.add(rule[1], segments[index], rule[2])
+        if effect == DENY:
+            denies[subject] = kept
+
+    if not dropped:
+        return rules, 0, 0
+    return [rule for index, rule in enumerate(rules) if index not in dropped], subsumed, shadowed
+
+
+class _KeptPatterns:
+    """
+    The resource patterns and actions kept so far for one subject and effect, indexed to tell
+    whether one of them covers another rule.
+    """
+    __slots__ = ("exact", "literal_rest", "general")
+
+    def __init__(self):
+        # pattern -> actions
+        self.exact: Dict[str, Set[str]] = defaultdict(set)
+        # literal segments before a trailing "/*" -> actions
+        self.literal_rest: Dict[Tuple[str, ...], Set[str]] = defaultdict(set)
+        # other patterns with placeholders
+        self.general: List[Tuple[List[Tuple[int, str]], str]] = []
+
+    def add(self, pattern: str, segments: Segments, action: str) -> None:
+        self.exact[pattern].add(action)
+        if segments is None:
+            return
+        prefix = segments[:-1]
+        if segments[-1][0] == REST and all(kind == LITERAL for kind, _ in prefix):
+            self.literal_rest[tuple(value for _, value in prefix)].add(action)
+        elif any(kind != LITERAL for kind, _ in segments):
+            self.general.append((segments, action))
+
+    def covers(self, pattern: str, segments: Segments, action: str) -> bool:
+        if _covers_action(self.exact.get(pattern), action):
+            return True
+        if segments is None:
+            return False
+
+        if self.literal_rest:
+            prefix: List[str] = []
+            # a "prefix/*" pattern covers patterns with a further segment after the same prefix
+            for kind, value in segments[:-1]:
+                if _covers_action(self.literal_rest.get(tuple(prefix)), action):
+                    return True
+                if kind != LITERAL:
+                    break
+                prefix.append(value)
+            else:
+                if _covers_action(self.literal_rest.get(tuple(prefix)), action):
+                    return True
+
+        return any(
+            (kept_action == ANY_ACTION or kept_action == action) and _covers_segments(kept, segments)
+            for kept, kept_action in self.general
+        )
+
+
+def _covers_action(actions: Optional[Set[str]], action: str) -> bool:
+    return bool(actions) and (ANY_ACTION in actions or action in actions)
+
+
+def _covers_segments(broad: List[Tuple[int, str]], narrow: List[Tuple[int, str]]) -> bool:
+    """
+    Whether every resource matched by the narrow pattern is matched by the broad one.
+    """
+    if broad[-1][0] == REST:
+        compared = len(broad) - 1
+        # "/*" matches "/" followed by anything, so narrow needs a segment past the prefix
+        if len(narrow) <= compared:
+            return False
+    else:
+        compared = len(broad)
+        if len(narrow) != compared:
+            return False
+
+    for (broad_kind, broad_value), (narrow_kind, narrow_value) in zip(broad[:compared], narrow):
+        if broad_kind == LITERAL:
+            if narrow_kind != LITERAL or narrow_value != broad_value:
+                return False
+        elif narrow_kind == REST or (narrow_kind == LITERAL and not narrow_value):
+            # a placeholder matches exactly one non-empty segment
+            return False
+    return True
+
+
+def _flatten_role_aliases(
+        links: List[Sequence[str]],
+        rules: List[Sequence[str]]
+) -> Tuple[List[Sequence[str]], Tuple[str, ...]]:
+    """
+    Remove the roles that have members, no rules and a single parent role, linking their
+    members to that parent instead.
+    """
+    if any(len(link) != 2 for link in links):
+        return links, ()
+
+    subjects_with_rules = {rule[0] for rule in rules if rule}
+    parents: Dict[str, List[str]] = defaultdict(list)
+    members: Dict[str, List[str]] = defaultdict(list)
+    for member, role in links:
+        parents[member].append(role)
+        members[role].append(member)
+    if not _within_hierarchy_limit(parents, members):
+        return links, ()
+    original = {member: list(role_parents) for member, role_parents in parents.items()}
+
+    flattened = []
+    for role in list(members):
+        role_parents = parents.get(role, [])
+        if role in subjects_with_rules or len(role_parents) != 1 or role_parents[0] == role or not members[role]:
+            continue
+        parent = role_parents[0]
+        for member in members[role]:
+            member_parents = parents[member]
+            member_parents.remove(role)
+            if parent not in member_parents and parent != member:
+                member_parents.append(parent)
+                members[parent].append(member)
+        members[parent].remove(role)
+        del parents[role]
+        members[role] = []
+        flattened.append(role)
+
+    if not flattened or not _same_closures(original, parents, set(flattened)):
+        return links, ()
+
+    # keep the original links, in order, followed by the new ones
+    remaining = {(member, role) for member, role_parents in parents.items() for role in role_parents}
+    kept = [link for link in links if (link[0], link[1]) in remaining]
+    existing = {(link[0], link[1]) for link in kept}
+    kept += [[member, role] for member, role in _ordered_links(parents) if (member, role) not in existing]
+    return kept, tuple(flattened)
+
+
+def _within_hierarchy_limit(parents: Dict[str, List[str]], members: Dict[str, List[str]]) -> bool:
+    """
+    Whether the role graph has no cycle and no chain of links casbin stops following, i.e. every
+    inherited role is within reach of the role index.
+    """
+    pending = {name: len(set(role_parents)) for name, role_parents in parents.items() if role_parents}
+    # longest chain of links from each role up to a subject at the bottom
+    depth: Dict[str, int] = {}
+    ready = [name for name in members if name not in pending]
+    ready += [name for name in parents if name not in pending and name not in members]
+    visited = 0
+    while ready:
+        name = ready.pop()
+        visited += 1
+        if depth.get(name, 0) > MAX_HIERARCHY_LEVEL - 1:
+            return False
+        for member in set(members.get(name, ())):
+            depth[member] = max(depth.get(member, 0), depth.get(name, 0) + 1)
+            pending[member] -= 1
+            if not pending[member]:
+                del pending[member]
+                ready.append(member)
+    # names left pending are on or below a cycle
+    return not pending
+
+
+def _same_closures(before: Dict[str, List[str]], after: Dict[str, List[str]], flattened: Set[str]) -> bool:
+    """
+    Whether every remaining subject inherits the same roles, flattened ones aside, within the
+    depth limit of the role index.
+    """
+    closures_before = RoleIndex.build(before)
+    closures_after = RoleIndex.build({member: list(role_parents) for member, role_parents in after.items()})
+    for subject in before:
+        if subject in flattened:
+            continue
+        inherited = set(closures_before.get(subject)) - flattened
+        if inherited != set(closures_after.get(subject)):
+            return False
+    return True
+
+
+def _ordered_links(parents: Dict[str, List[str]]) -> Iterable[Tuple[str, str]]:
+    for member, role_parents in parents.items():
+        for role in role_parents:
+            yield member, role
@@ -0,0 +1,149 @@
+import re
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import String, and_, false, literal, not_, or_, true
+from sqlalchemy.sql import ColumnElement
+
+from access_guard.authz.engine.key_match import compile_key_match3, is_literal_pattern
+from access_guard.authz.engine.resource_trie import WILDCARD_ACTION
+from access_guard.authz.models.enums import ResourceMatch
+
+_LIKE_ESCAPE = "\\"
+
+
+@dataclass(frozen=True)
+class ResourcePattern:
+    """
+    One key_match3 rule pattern, rewritten against resources without the policy resource prefix.
+
+    PATTERN values are regular expressions matched against qualifier + resource; the qualifier
+    is the resource prefix when it could not be stripped from the pattern.
+    """
+    match: ResourceMatch
+    value: str = ""
+    qualifier: str = ""
+
+    def matches(self, resource: str) -> bool:
+        if self.match is ResourceMatch.EXACT:
+            return resource == self.value
+        if self.match is ResourceMatch.PREFIX:
+            return resource.startswith(self.value)
+        if self.match is ResourceMatch.PATTERN:
+            return re.match(self.value, self.qualifier + resource) is not None
+        return True
+
+    def to_sqlalchemy(self, column) -> ColumnElement:
+        if self.match is ResourceMatch.EXACT:
+            return column == self.value
+        if self.match is ResourceMatch.PREFIX:
+            return column.like(_escape_like(self.value) + "%", escape=_LIKE_ESCAPE)
+        if self.match is ResourceMatch.PATTERN:
+            subject = literal(self.qualifier, String) + column if self.qualifier else column
+            return subject.regexp_match(self.value)
+        return true()
+
+
+@dataclass(frozen=True)
+class ResourceFilter:
+    """
+    The resources a user may perform one action on, as allow and deny patterns: a resource is
+    authorized when an allow pattern matches it and no deny pattern does, exactly like
+    has_permission. Resources are given without the policy resource prefix.
+    """
+    action: str
+    allow: Tuple[ResourcePattern, ...] = ()
+    deny: Tuple[ResourcePattern, ...] = ()
+
+    @property
+    def allows_nothing(self) -> bool:
+        return not self.allow or any(pattern.match is ResourceMatch.ANY for pattern in self.deny)
+
+    def matches(self, resource: str) -> bool:
+        return (
+            any(pattern.matches(resource) for pattern in self.allow)
+            and not any(pattern.matches(resource) for pattern in self.deny)
+        )
+
+    def to_sqlalchemy(self, column) -> ColumnElement:
+        """
+        A WHERE clause selecting the authorized rows by their resource column, e.g.
+
+            select(Document).where(resource_filter.to_sqlalchemy(Document.path))
+
+        Literal patterns become equality (IN) tests, "/*" patterns LIKE prefixes and any other
+        pattern a regexp_match, which needs a database with regular expressions (SQLAlchemy
+        provides one on SQLite).
+        """
+        if self.allows_nothing:
+            return false()
+        allowed = _any_of(self.allow, column)
+        if not self.deny:
+            return allowed
+        return and_(allowed, not_(_any_of(self.deny, column)))
+
+
+def build_resource_filter(rules: Iterable[Sequence[str]], action: str, resource_prefix: str = "") -> ResourceFilter:
+    """
+    Build the filter of action from a user's effective (subject, resource, action, effect) p rules.
+    """
+    allow: List[ResourcePattern] = []
+    deny: List[ResourcePattern] = []
+    for _, pattern, rule_action, effect in rules:
+        if rule_action != action and rule_action != WILDCARD_ACTION:
+            continue
+        if effect == "allow":
+            target = allow
+        elif effect == "deny":
+            target = deny
+        else:
+            # indeterminate for the allow/deny effector, never decides
+            continue
+        resource_pattern = _strip_prefix(pattern, resource_prefix or "")
+        if resource_pattern is not None and resource_pattern not in target:
+            target.append(resource_pattern)
+
+    if any(pattern.match is ResourceMatch.ANY for pattern in allow):
+        allow = [ResourcePattern(ResourceMatch.ANY)]
+    return ResourceFilter(action=action, allow=tuple(allow), deny=tuple(deny))
+
+
+def _strip_prefix(pattern: str, prefix: str) -> Optional[ResourcePattern]:
+    """
+    Rewrite a pattern matched against prefix + resource into one matched against resource.
+    Returns None when no resource can match it.
+    """
+    if is_literal_pattern(pattern):
+        if not pattern.startswith(prefix):
+            return None
+        return ResourcePattern(ResourceMatch.EXACT, pattern[len(prefix):])
+
+    if pattern.endswith("/*") and is_literal_pattern(pattern[:-2]):
+        # "/*" matches anything after the slash, including nothing
+        literal_prefix = pattern[:-1]
+        if literal_prefix.startswith(prefix):
+            stripped = literal_prefix[len(prefix):]
+            return ResourcePattern(ResourceMatch.PREFIX, stripped) if stripped else ResourcePattern(ResourceMatch.ANY)
+        if prefix.startswith(literal_prefix):
+            return ResourcePattern(ResourceMatch.ANY)
+        return None
+
+    rest = pattern[len(prefix):]
+    if prefix and (not pattern.startswith(prefix) or not is_literal_pattern(prefix) or rest.startswith("*")):
+        # the prefix is not a plain leading part of the pattern, match the qualified resource instead
+        return ResourcePattern(ResourceMatch.PATTERN, compile_key_match3(pattern).pattern, qualifier=prefix)
+    return ResourcePattern(ResourceMatch.PATTERN, compile_key_match3(rest).pattern)
+
+
+def _any_of(patterns: Tuple[ResourcePattern, ...], column) -> ColumnElement:
+    exact = [pattern.value for pattern in patterns if pattern.match is ResourceMatch.EXACT]
+    clauses = [pattern.to_sqlalchemy(column) for pattern in patterns if pattern.match is not ResourceMatch.EXACT]
+    if len(exact) == 1:
+        clauses.insert(0, column == exact[0])
+    elif exact:
+        clauses.insert(0, column.in_(exact))
+    return or_(*clauses) if len(clauses) > 1 else clauses[0]
+
+
+def _escape_like(value: str) -> str:
+    return value.replace(_LIKE_ESCAPE, _LIKE_ESCAPE * 2).replace("%", _LIKE_ESCAPE + "%").replace("_", _LIKE_ESCAPE + "_")
@@ -0,0 +1,127 @@
+import re
+from sys import intern
+from typing import Dict, List, Optional, Tuple
+
+from access_guard.authz.engine.key_match import LITERAL, PARAM, compile_key_match3, parse_key_match3
+
+WILDCARD_ACTION = "*"
+
+# patterns carry a handful of actions: tuples are a fraction of the size of sets and as fast to search
+_NO_ACTIONS = ()
+
+
+class ActionEffects:
+    """
+    Actions allowed and denied by the rules attached to one pattern.
+    """
+    __slots__ = ("allow", "deny")
+
+    def __init__(self):
+        self.allow = _NO_ACTIONS
+        self.deny = _NO_ACTIONS
+
+    def add(self, action: str, effect: str) -> None:
+        if effect == "allow":
+            if action not in self.allow:
+                self.allow += (action,)
+        elif effect == "deny":
+            if action not in self.deny:
+                self.deny += (action,)
+        # any other effect is indeterminate for the allow/deny effector and never decides
+
+    def allows(self, action: str) -> bool:
+        return action in self.allow or WILDCARD_ACTION in self.allow
+
+    def denies(self, action: str) -> bool:
+        return action in self.deny or WILDCARD_ACTION in self.deny
+
+
+class _TrieNode:
+    __slots__ = ("children", "param", "rest", "terminal")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.param: Optional["_TrieNode"] = None
+        self.rest: Optional[ActionEffects] = None
+        self.terminal: Optional[ActionEffects] = None
+
+
+class ResourceTrie:
+    """
+    Index of key_match3 resource patterns by path segment.
+
+    Literal segments are looked up by hash, "{param}" segments match any single non-empty
+    segment and a trailing "/*" matches whatever follows. Patterns that cannot be expressed
+    per segment are kept aside and matched with their compiled key_match3 regex.
+    """
+
+    def __init__(self):
+        self._root = _TrieNode()
+        self._regex_patterns: Dict[str, Tuple[re.Pattern, ActionEffects]] = {}
+
+    def add(self, pattern: str, action: str, effect: str) -> None:
+        self._effects_for(pattern).add(action, effect)
+
+    def _effects_for(self, pattern: str) -> ActionEffects:
+        segments = parse_key_match3(pattern)
+        if segments is None:
+            entry = self._regex_patterns.get(pattern)
+            if entry is None:
+                entry = (compile_key_match3(pattern), ActionEffects())
+                self._regex_patterns[pattern] = entry
+            return entry[1]
+
+        node = self._root
+        for kind, value in segments:
+            if kind == LITERAL:
+                child = node.children.get(value)
+                if child is None:
+                    child = node.children[intern(value)] = _TrieNode()
+                node = child
+            elif kind == PARAM:
+                if node.param is None:
+                    node.param = _TrieNode()
+                node = node.param
+            else:
+                if node.rest is None:
+                    node.rest = ActionEffects()
+                return node.rest
+
+        if node.terminal is None:
+            node.terminal = ActionEffects()
+        return node.terminal
+
+    def match(self, resource: str, segments: List[str], action: str) -> Tuple[bool, bool]:
+        """
+        Return (allowed, denied) for the action over every pattern matching the resource.
+        """
+        allowed = False
+        denied = False
+        for effects in self.iter_matches(resource, segments):
+            if effects.denies(action):
+                return allowed, True
+            if not allowed and effects.allows(action):
+                allowed = True
+        return allowed, denied
+
+    def iter_matches(self, resource: str, segments: List[str]):
+        yield from self._walk(self._root, segments, 0)
+        for regex, effects in self._regex_patterns.values():
+            if regex.match(resource):
+                yield effects
+
+    def _walk(self, node: _TrieNode, segments: List[str], index: int):
+        if index == len(segments):
+            if node.terminal is not None:
+                yield node.terminal
+            return
+
+        if node.rest is not None:
+            yield node.rest
+
+        child = node.children.get(segments[index])
+        if child is not None:
+            yield from self._walk(child, segments, index + 1)
+
+        if node.param is not None and segments[index]:
+            yield from self._walk(node.param, segments, index + 1)
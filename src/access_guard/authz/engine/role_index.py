@@ -0,0 +1,159 @@
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Sequence, Set, Tuple
+
+# casbin's default role manager stops following role links after this many levels
+MAX_HIERARCHY_LEVEL = 10
+
+
+class RoleIndex:
+    """
+    Materialized subject -> effective roles index of the g rules.
+
+    The closure of every subject holding a role link is computed when the index is built,
+    following links for at most MAX_HIERARCHY_LEVEL levels like casbin's role manager, so a
+    check never walks the role graph. The index is immutable; apply_delta returns a new one that
+    only recomputes the closures of the subjects whose links changed and of the subjects
+    inheriting from them.
+    """
+
+    def __init__(
+            self,
+            links: Dict[str, List[str]],
+            members: Dict[str, Set[str]],
+            closures: Dict[str, Tuple[str, ...]]
+    ):
+        self._links = links
+        self._members = members
+        self._closures = closures
+
+    @classmethod
+    def build(cls, links: Dict[str, List[str]]) -> "RoleIndex":
+        members: Dict[str, Set[str]] = defaultdict(set)
+        for subject, roles in links.items():
+            for role in roles:
+                members[role].add(subject)
+        closures = {subject: _closure(links, subject) for subject in links}
+        return cls(links, dict(members), closures)
+
+    def get(self, subject: str) -> Tuple[str, ...]:
+        """
+        The subject itself followed by every role it inherits, nearest first.
+        """
+        return self._closures.get(subject) or (subject,)
+
+    def direct_roles(self, subject: str) -> Sequence[str]:
+        """
+        The roles the subject is linked to by its own g rules.
+        """
+        return self._links.get(subject, ())
+
+    def path(self, subject: str, role: str) -> Tuple[str, ...]:
+        """
+        The shortest chain of links from the subject to one of its effective roles, both included.
+        """
+        return role_path(lambda name: self._links.get(name, ()), subject, role)
+
+    def apply_delta(
+            self,
+            added: Iterable[Tuple[str, str]],
+            removed: Iterable[Tuple[str, str]]
+    ) -> "RoleIndex":
+        """
+        Return a new index with the (subject, role) links added and removed. A removal drops one
+        occurrence of the link. Unchanged subjects share their lists and closures with this index.
+        """
+        links = dict(self._links)
+        members = dict(self._members)
+        touched: Set[str] = set()
+        copied_members: Set[str] = set()
+
+        def links_of(subject: str) -> List[str]:
+            if subject not in touched:
+                touched.add(subject)
+                links[subject] = list(links.get(subject, ()))
+            return links[subject]
+
+        def members_of(role: str) -> Set[str]:
+            if role not in copied_members:
+                copied_members.add(role)
+                members[role] = set(members.get(role, ()))
+            return members[role]
+
+        for subject, role in removed:
+            subject_links = links_of(subject)
+            if role in subject_links:
+                subject_links.remove(role)
+                if role not in subject_links:
+                    members_of(role).discard(subject)
+        for subject, role in added:
+            links_of(subject).append(role)
+            members_of(role).add(subject)
+
+        for subject in touched:
+            if not links[subject]:
+                del links[subject]
+        for role in copied_members:
+            if not members[role]:
+                del members[role]
+
+        # a closure can only change if it reaches a touched subject, i.e. for its inheritors
+        affected = set(touched)
+        frontier = list(touched)
+        while frontier:
+            inheritors = [member for role in frontier for member in members.get(role, ()) if member not in affected]
+            affected.update(inheritors)
+            frontier = inheritors
+
+        closures = dict(self._closures)
+        for subject in affected:
+            if subject in links:
+                closures[subject] = _closure(links, subject)
+            else:
+                closures.pop(subject, None)
+        return RoleIndex(links, members, closures)
+
+
+def _closure(links: Dict[str, List[str]], subject: str) -> Tuple[str, ...]:
+    closure = [subject]
+    seen: Set[str] = {subject}
+    frontier = [subject]
+    for _ in range(MAX_HIERARCHY_LEVEL - 1):
+        next_frontier = []
+        for name in frontier:
+            for role in links.get(name, ()):
+                if role not in seen:
+                    seen.add(role)
+                    closure.append(role)
+                    next_frontier.append(role)
+        if not next_frontier:
+            break
+        frontier = next_frontier
+    return tuple(closure)
+
+
+def role_path(roles_of: Callable[[str], Sequence[str]], subject: str, role: str) -> Tuple[str, ...]:
+    """
+    The shortest chain subject, ..., role following the direct roles given by roles_of, within
+    MAX_HIERARCHY_LEVEL levels; empty when the subject does not inherit the role.
+    """
+    parents = {subject: None}
+    frontier = [subject]
+    for _ in range(MAX_HIERARCHY_LEVEL - 1):
+        if role in parents:
+            break
+        next_frontier = []
+        for name in frontier:
+            for parent in roles_of(name):
+                if parent not in parents:
+                    parents[parent] = name
+                    next_frontier.append(parent)
+        if not next_frontier:
+            break
+        frontier = next_frontier
+    if role not in parents:
+        return ()
+
+    path = [role]
+    while parents[path[-1]] is not None:
+        path.append(parents[path[-1]])
+    return tuple(reversed(path))
@@ -1,3 +1,6 @@
+from typing import List, Tuple
+
+
 class PermissionDeniedError(Exception):
     """
     Exception raised when a user doesn't have the required permissions.
@@ -16,4 +19,60 @@ class PermissionDeniedError(Exception):
         self.resource = resource
         self.actions = actions
         self.message = f"User '{user}' does not have permission to perform '{actions}' on '{resource}'"
-        super().__init__(self.message) 
\ No newline at end of file
+        super().__init__(self.message)
+
+
+class BatchPermissionDeniedError(PermissionDeniedError):
+    """
+    Exception raised when one or more items of a batch permission check are denied.
+    """
+
+    def __init__(self, user: str, denied: List[Tuple[str, str]]):
+        """
+        Initialize the exception.
+
+        Args:
+            user: The user identifier
+            denied: (resource, actions) pairs for every denied item, in request order
+        """
+        self.denied = denied
+        super().__init__(
+            user,
+            ", ".join(resource for resource, _ in denied),
+            "; ".join(actions for _, actions in denied)
+        )
+        details = "; ".join(f"'{actions}' on '{resource}'" for resource, actions in denied)
+        self.message = f"User '{user}' does not have permission for {len(denied)} item(s): {details}"
+        self.args = (self.message,)
+
+
+class PolicyLoaderTimeoutError(TimeoutError):
+    """
+    Exception raised when a policy loader does not finish within its timeout.
+    """
+
+    def __init__(self, loader: str, timeout: float):
+        """
+        Initialize the exception.
+
+        Args:
+            loader: The loader name
+            timeout: The timeout that was exceeded, in seconds
+        """
+        self.loader = loader
+        self.timeout = timeout
+        self.message = f"Policy loader '{loader}' did not finish within {timeout}s"
+        super().__init__(self.message)
+
+
+class InvalidPolicySnapshotError(ValueError):
+    """
+    Exception raised when a policy snapshot is truncated, corrupt or of an unsupported version.
+    """
+
+
+class InvalidPermissionDigestError(ValueError):
+    """
+    Exception raised when a permission digest is malformed, of an unsupported version, signed
+    with an unknown key or expired.
+    """
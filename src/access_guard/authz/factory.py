@@ -1,8 +1,16 @@
 from typing import Callable, List, Tuple, Optional
 
+from access_guard.authz.async_permissions_enforcer import AnyPolicyLoader, AsyncPermissionsEnforcer
+from access_guard.authz.enforcer_registry import (
+    DEFAULT_BYTES_PER_RULE,
+    DEFAULT_MEMORY_BUDGET,
+    EnforcerRegistry,
+    LoaderFactory,
+)
 from access_guard.authz.loaders.policy_loader_abc import PolicyLoaderABC
 from access_guard.authz.loaders.policy_provider_abc import PolicyProvider
 from access_guard.authz.permissions_enforcer import PermissionsEnforcer
+from access_guard.authz.models.enums import LoaderFailurePolicy
 from access_guard.authz.models.permissions_enforcer_params import PermissionsEnforcerParams
 from access_guard.authz.loaders.poicy_query_provider import PolicyQueryProvider
 
@@ -15,6 +23,34 @@ def _build_params(settings, rbac_model_path: Optional[str] = None) -> Permission
         # policy_api_client=getattr(settings, "policy_api_client", None),
         # policy_api_secret=getattr(settings, "policy_api_secret", None),
         filter=getattr(settings, "filter", None),  # fully agnostic filter dict
+        loader_timeout=getattr(settings, "loader_timeout", None),
+        loader_failure_policy=getattr(settings, "loader_failure_policy", LoaderFailurePolicy.FAIL),
+        loader_max_workers=getattr(settings, "loader_max_workers", None),
+        retain_loaded_policies=getattr(settings, "retain_loaded_policies", False),
+        snapshot_path=getattr(settings, "snapshot_path", None),
+        snapshot_max_age=getattr(settings, "snapshot_max_age", None),
+        shared_store_dir=getattr(settings, "shared_store_dir", None),
+        shared_store_poll_interval=getattr(settings, "shared_store_poll_interval", 1.0),
+        shared_store_attach_timeout=getattr(settings, "shared_store_attach_timeout", 30.0),
+        lazy_user_slices=getattr(settings, "lazy_user_slices", False),
+        user_slice_max_rules=getattr(settings, "user_slice_max_rules", 1_000_000),
+        user_slice_ttl=getattr(settings, "user_slice_ttl", 300.0),
+        metrics=getattr(settings, "metrics", None),
+        optimize_policies=getattr(settings, "optimize_policies", False),
+        flatten_role_aliases=getattr(settings, "flatten_role_aliases", False),
+        use_compiled_engine=getattr(settings, "use_compiled_engine", True),
+        decision_cache_size=getattr(settings, "decision_cache_size", 0),
+        decision_cache_ttl=getattr(settings, "decision_cache_ttl", None),
+        slow_decision_threshold=getattr(settings, "slow_decision_threshold", None),
+        slow_decision_sample_rate=getattr(settings, "slow_decision_sample_rate", 1.0),
+        slow_decision_buffer_size=getattr(settings, "slow_decision_buffer_size", 256),
+        refresh_interval=getattr(settings, "refresh_interval", None),
+        refresh_jitter=getattr(settings, "refresh_jitter", 0.1),
+        refresh_failure_backoff=getattr(settings, "refresh_failure_backoff", 5.0),
+        refresh_max_backoff=getattr(settings, "refresh_max_backoff", 300.0),
+        watcher=getattr(settings, "watcher", None),
+        watcher_debounce=getattr(settings, "watcher_debounce", 0.05),
+        watcher_max_delay=getattr(settings, "watcher_max_delay", 1.0),
     )
 
 
@@ -65,3 +101,68 @@ def get_permissions_enforcer(
         policy_loaders,
         skip_initial_policy_load=skip_initial_policy_load
     )
+
+
+async def get_async_permissions_enforcer(
+        settings=None,
+        rbac_model_path: Optional[str] = None,
+        policy_loaders: Optional[List[AnyPolicyLoader]] = [],
+        new_instance: bool = False,
+        skip_initial_policy_load: bool = False
+) -> AsyncPermissionsEnforcer:
+    """
+        Async counterpart of get_permissions_enforcer.
+
+        Accepts async loaders (AsyncPolicyApiLoader, AsyncPolicyDbLoader) as well as regular ones,
+        which are run in worker threads. Policies are fetched concurrently and loaded without
+        blocking the event loop; refresh them later with 'await enforcer.refresh_policies()'.
+
+        Returns:
+            AsyncPermissionsEnforcer: A fully initialized or reusable enforcer instance.
+        """
+    params = _build_params(settings, rbac_model_path)
+
+    if new_instance:
+        return await AsyncPermissionsEnforcer.create(
+            params,
+            policy_loaders,
+            skip_initial_policy_load=skip_initial_policy_load
+        )
+
+    return await AsyncPermissionsEnforcer.get_async_instance(
+        params,
+        policy_loaders,
+        skip_initial_policy_load=skip_initial_policy_load
+    )
+
+
+def get_enforcer_registry(
+        settings=None,
+        loaders_for: LoaderFactory = None,
+        rbac_model_path: Optional[str] = None,
+        memory_budget: int = DEFAULT_MEMORY_BUDGET,
+        bytes_per_rule: int = DEFAULT_BYTES_PER_RULE
+) -> EnforcerRegistry:
+    """
+        Build a registry serving one PermissionsEnforcer per filter/model path.
+
+        Args:
+            settings: Configuration shared by every enforcer of the registry; its filter is ignored,
+                      each registry.get(filter) call names its own.
+            loaders_for: Called with the params of a new enforcer (params.filter is its scope),
+                         returns the loaders it should load from.
+            memory_budget: Estimated bytes the held enforcers may take before the least recently
+                           used ones are dropped.
+            bytes_per_rule: Estimated resident size of one loaded rule.
+
+        Returns:
+            EnforcerRegistry: An empty registry; enforcers are built on first use.
+        """
+    if loaders_for is None:
+        raise ValueError("loaders_for is required")
+    return EnforcerRegistry(
+        _build_params(settings, rbac_model_path),
+        loaders_for,
+        memory_budget=memory_budget,
+        bytes_per_rule=bytes_per_rule
+    )
@@ -0,0 +1,55 @@
+import logging
+from typing import Optional
+
+import httpx
+
+from access_guard.authz.loaders.async_policy_loader_abc import AsyncPolicyLoaderABC
+from access_guard.authz.loaders.policy_api_loader import (
+    POLICIES_ENDPOINT,
+    build_request_headers,
+    iter_policy_entries,
+)
+from access_guard.authz.loaders.policy_table import PolicyTable
+from access_guard.authz.models.load_policy_result import LoadPolicyResult
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncPolicyApiLoader(AsyncPolicyLoaderABC):
+    def __init__(self, api_url: str, client: Optional[httpx.AsyncClient] = None, timeout: float = 30.0):
+        """
+        Initialize the loader with API details.
+        :param api_url: Base URL of the access management API (e.g., https://iam.example.com)
+        :param client: Optional shared httpx.AsyncClient; the loader creates and owns one otherwise
+        :param timeout: Request timeout in seconds for the client created by the loader
+        """
+        self.api_url = api_url.rstrip("/")
+        self._client = client
+        self._owns_client = client is None
+        self._timeout = timeout
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self._timeout)
+        return self._client
+
+    async def fetch_policies(self, filter: dict = None) -> LoadPolicyResult:
+        url = f"{self.api_url}{POLICIES_ENDPOINT}"
+        try:
+            response = await self._get_client().get(url, headers=build_request_headers())
+            response.raise_for_status()
+            data = response.json()
+            policies = PolicyTable(iter_policy_entries(data, url))
+            return LoadPolicyResult.from_loaded(
+                resource_prefix=data.get("resource_prefix", ""),
+                policies=policies,
+                policy_count=len(policies)
+            )
+        except Exception as e:
+            logger.error(f"Failed to fetch policies from {url}: {e}")
+            raise
+
+    async def close(self) -> None:
+        if self._owns_client and self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,52 @@
+import logging
+from typing import TYPE_CHECKING, Optional, Union
+
+from sqlalchemy import text
+
+from access_guard.authz.loaders.async_policy_loader_abc import AsyncPolicyLoaderABC
+from access_guard.authz.loaders.poicy_query_provider import PolicyQueryProvider
+from access_guard.authz.loaders.policy_db_loader import iter_policy_rows, policy_query_for
+from access_guard.authz.loaders.policy_table import PolicyTable
+from access_guard.authz.models.entities import Role, User
+from access_guard.authz.models.load_policy_result import LoadPolicyResult
+
+if TYPE_CHECKING:
+    # importing sqlalchemy.ext.asyncio requires greenlet (sqlalchemy[asyncio])
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncPolicyDbLoader(AsyncPolicyLoaderABC):
+    def __init__(self, query_provider: PolicyQueryProvider, engine: "AsyncEngine"):
+        self.engine = engine
+        self.query_provider = query_provider
+
+    async def fetch_policies(self, filter: dict = None,
+                             entity: Optional[Union[User, Role]] = None) -> LoadPolicyResult:
+        if entity:
+            if isinstance(entity, User):
+                logger.debug(f"Loading policies for User: {entity.id}")
+                query, params = self.query_provider.get_user_policies_query(entity.id)
+            elif isinstance(entity, Role):
+                logger.debug(f"Loading policies for Role: {entity.role_name}")
+                query, params = self.query_provider.get_role_policies_query(entity.id)
+            else:
+                logger.warning(f"Unsupported subject type: {entity.__class__.__name__}")
+                return LoadPolicyResult()
+        else:
+            query, params = policy_query_for(self.query_provider, filter)
+
+        try:
+            async with self.engine.connect() as connection:
+                result = await connection.execute(text(query), params)
+                policies = PolicyTable(iter_policy_rows(result))
+        except Exception as e:
+            logger.error(f"Error loading policies: {e}")
+            raise
+
+        return LoadPolicyResult.from_loaded(
+            resource_prefix=None,
+            policies=policies,
+            policy_count=len(policies)
+        )
@@ -0,0 +1,42 @@
+from abc import ABC, abstractmethod
+
+from typing import Optional
+
+from casbin.model import Model
+
+from access_guard.authz.loaders.policy_ingest import ingest_policies
+from access_guard.authz.metrics.recorder import NOOP_METRICS, MetricsRecorder
+from access_guard.authz.models.enums import LoaderFailurePolicy
+from access_guard.authz.models.load_policy_result import LoadPolicyResult
+
+
+class AsyncPolicyLoaderABC(ABC):
+    """
+    Policy loader whose I/O runs on the event loop.
+
+    Implementations only fetch policies; loading them into a model is shared, so an enforcer
+    can fetch from several loaders concurrently and still apply the results in loader order.
+    """
+    # per-loader overrides of the enforcer's loader_timeout / loader_failure_policy
+    load_timeout: Optional[float] = None
+    failure_policy: Optional[LoaderFailurePolicy] = None
+    # set by the enforcer owning the loader
+    metrics: MetricsRecorder = NOOP_METRICS
+
+    def set_metrics(self, metrics: MetricsRecorder) -> None:
+        self.metrics = metrics
+
+    @abstractmethod
+    async def fetch_policies(self, filter: dict = None) -> LoadPolicyResult:
+        pass
+
+    async def load_policy(self, model: Model, filter: dict = None) -> LoadPolicyResult:
+        result = await self.fetch_policies(filter=filter)
+        ingest_policies(model, result.policies)
+        return result
+
+    def supports_delta(self) -> bool:
+        return False
+
+    async def close(self) -> None:
+        pass
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Iterable, Tuple, Union
 
 from access_guard.authz.loaders.policy_provider_abc import PolicyProvider
 from access_guard.authz.models.casbin_policy import CasbinPolicy
@@ -7,6 +7,10 @@ from access_guard.authz.models.casbin_policy import CasbinPolicy
 
 class CasbinPolicyProvider(PolicyProvider):
     @abstractmethod
-    def get_policies(self) -> List[CasbinPolicy]:
+    def get_policies(self, filter: dict = None) -> Iterable[Union[CasbinPolicy, Tuple[str, ...]]]:
+        """
+        Return or yield policies, either as CasbinPolicy objects or as plain
+        (ptype, subject, object, action, effect) tuples, which skip model validation.
+        """
         pass
 
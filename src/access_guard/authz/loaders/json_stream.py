@@ -0,0 +1,128 @@
+"""
+Incremental readers for policy payloads, so a large response is parsed while it downloads and
+never held as a whole, neither as text nor as decoded objects.
+"""
+import json
+from typing import Any, Dict, Iterable, Iterator
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+# what may follow a complete value inside an object or array
+_VALUE_END = _WHITESPACE + ",]}"
+# compact the buffer once this many characters were consumed
+_COMPACT_AT = 1 << 16
+
+
+class _Buffer:
+    __slots__ = ("chunks", "text", "pos", "exhausted")
+
+    def __init__(self, chunks: Iterable[str]):
+        self.chunks = iter(chunks)
+        self.text = ""
+        self.pos = 0
+        self.exhausted = False
+
+    def fill(self) -> bool:
+        """
+        Append the next chunk. Returns False when the stream is exhausted.
+        """
+        if self.pos >= _COMPACT_AT:
+            self.text = self.text[self.pos:]
+            self.pos = 0
+        for chunk in self.chunks:
+            if chunk:
+                self.text += chunk
+                return True
+        self.exhausted = True
+        return False
+
+    def peek(self) -> str:
+        """
+        The next non-whitespace character, consumed up to it; empty at the end of the stream.
+        """
+        while True:
+            text, pos = self.text, self.pos
+            while pos < len(text) and text[pos] in _WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < len(text):
+                return text[pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Invalid JSON policy document: expected {char!r}, found {found!r}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """
+        Decode the next JSON value. A number cut by the end of the buffer still decodes ("12" of
+        "12.5"), so a value is only trusted once the character following it was read.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.text, self.pos)
+                if self.exhausted or (end < len(self.text) and self.text[end] in _VALUE_END):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.exhausted:
+                    raise
+            if not self.fill() and self.pos >= len(self.text):
+                raise ValueError("Invalid JSON policy document: unexpected end of data")
+
+
+def iter_json_array_field(chunks: Iterable[str], field: str, metadata: Dict[str, Any]) -> Iterator[Any]:
+    """
+    Yield the items of the array under field of a top-level JSON object read from text chunks,
+    one at a time. The object's other members are stored in metadata as they are read, so the
+    ones following the array are only there once the iterator is exhausted. Raises ValueError
+    when the object has no such array.
+    """
+    buffer = _Buffer(chunks)
+    buffer.expect("{")
+    found = False
+    if buffer.peek() == "}":
+        buffer.pos += 1
+    else:
+        while True:
+            key = buffer.value()
+            buffer.expect(":")
+            if key == field and buffer.peek() == "[":
+                found = True
+                buffer.pos += 1
+                if buffer.peek() == "]":
+                    buffer.pos += 1
+                else:
+                    while True:
+                        yield buffer.value()
+                        separator = buffer.peek()
+                        buffer.pos += 1
+                        if separator == "]":
+                            break
+                        if separator != ",":
+                            raise ValueError(f"Invalid JSON policy document: expected ',' or ']' in {field}")
+            else:
+                metadata[key] = buffer.value()
+
+            separator = buffer.peek()
+            buffer.pos += 1
+            if separator == "}":
+                break
+            if separator != ",":
+                raise ValueError("Invalid JSON policy document: expected ',' or '}'")
+
+    if not found:
+        raise ValueError(f"Invalid JSON policy document: no {field} array")
+
+
+def iter_ndjson(lines: Iterable[bytes]) -> Iterator[Any]:
+    """
+    Decode newline-delimited JSON, skipping blank lines.
+    """
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
@@ -1,15 +1,208 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
 from casbin import Model
 
+from access_guard.authz.exceptions import PolicyLoaderTimeoutError
+from access_guard.authz.loaders.policy_ingest import (
+    apply_policy_delta,
+    count_policies,
+    empty_model_like,
+    merge_policies,
+)
 from access_guard.authz.loaders.policy_loader_abc import PolicyLoaderABC
+from access_guard.authz.loaders.policy_table import PolicyTable
+from access_guard.authz.metrics.recorder import LOADER_POLICIES, LOADER_SECONDS, NOOP_METRICS, MetricsRecorder
+from access_guard.authz.models.enums import LoaderFailurePolicy, LoaderStatus
+from access_guard.authz.models.load_policy_result import LoadPolicyResult
+from access_guard.authz.models.loader_timing import LoaderTiming
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _LoadedSource:
+    result: LoadPolicyResult
+    model: Model
 
 
 class MultiAdapter(PolicyLoaderABC):
-    def __init__(self, loaders: list[PolicyLoaderABC]):
+    """
+    Loads several loaders as one.
+
+    Loaders fetch concurrently, each into its own staging model, and their rules are merged
+    into the target model in loader order, so the result does not depend on which finishes
+    first. Each loader gets its own timeout and failure policy (PolicyLoaderABC.load_timeout
+    and failure_policy, falling back to the adapter's defaults).
+    """
+
+    def __init__(
+            self,
+            loaders: list[PolicyLoaderABC],
+            timeout: Optional[float] = None,
+            failure_policy: LoaderFailurePolicy = LoaderFailurePolicy.FAIL,
+            max_workers: Optional[int] = None
+    ):
+        super().__init__()
         self.loaders = loaders
+        self.timeout = timeout
+        self.failure_policy = failure_policy
+        self.max_workers = max_workers
+        self.last_timings: List[LoaderTiming] = []
+        # last successful load of every KEEP_PREVIOUS loader, by position in self.loaders
+        self._previous: Dict[int, _LoadedSource] = {}
+
+    def load_policy(self, model: Model, filter: dict = None) -> LoadPolicyResult:
+        """
+        Load every loader into model. Raises the loader's error (PolicyLoaderTimeoutError on a
+        timeout) when a FAIL loader fails; model is left untouched in that case.
+        """
+        return self.merge_sources(model, self._load_sources(model, filter))
 
-    def load_policy(self, model: Model, filter: dict = None):
+    def merge_sources(self, model: Model, sources: List[Optional[_LoadedSource]]) -> LoadPolicyResult:
+        """
+        Merge the loaded sources (see collect_sources) into model, in loader order.
+        """
+        resource_prefix = None
+        policies = PolicyTable()
+        policy_count = 0
+        for source in sources:
+            if source is None:
+                continue
+            merge_policies(source.model, model)
+            result = source.result
+            # todo: right now only applying the first resource_prefix, same as PermissionsEnforcer
+            if result.resource_prefix and not resource_prefix:
+                resource_prefix = result.resource_prefix
+            policies.extend(result.policies)
+            policy_count += _count(source)
+
+        return LoadPolicyResult.from_loaded(
+            resource_prefix=resource_prefix,
+            policies=policies,
+            policy_count=policy_count
+        )
+
+    def set_metrics(self, metrics: MetricsRecorder) -> None:
+        super().set_metrics(metrics)
         for loader in self.loaders:
-            loader.load_policy(model, filter=filter)
+            if hasattr(loader, "set_metrics"):
+                loader.set_metrics(metrics)
+
+    def apply_loader_delta(self, loader: PolicyLoaderABC, added, removed) -> None:
+        """
+        Keep the rules remembered for a KEEP_PREVIOUS loader in step with a delta sync.
+        """
+        for index, candidate in enumerate(self.loaders):
+            source = self._previous.get(index)
+            if candidate is loader and source is not None:
+                model = empty_model_like(source.model)
+                apply_policy_delta(source.model, model, added, removed)
+                self._previous[index] = _LoadedSource(source.result, model)
+
+    def _load_sources(self, model: Model, filter: Optional[dict]) -> List[Optional[_LoadedSource]]:
+        jobs = [(loader, empty_model_like(model)) for loader in self.loaders]
+        if len(jobs) == 1 and self.timeout_for(self.loaders[0]) is None:
+            # nothing to overlap and nothing to bound: stay on the calling thread
+            outcomes = [_run_loader(loader, staging, filter) for loader, staging in jobs]
+            return self.collect_sources(jobs, outcomes, [False])
+
+        executor = ThreadPoolExecutor(
+            max_workers=self.max_workers or len(jobs) or 1,
+            thread_name_prefix="policy-loader"
+        )
+        try:
+            started = time.monotonic()
+            futures = [executor.submit(_run_loader, loader, staging, filter) for loader, staging in jobs]
+            outcomes, timed_out = [], []
+            for (loader, _), future in zip(jobs, futures):
+                timeout = self.timeout_for(loader)
+                remaining = None if timeout is None else max(0.0, started + timeout - time.monotonic())
+                wait([future], timeout=remaining)
+                timed_out.append(not future.done())
+                outcomes.append(
+                    (None, timeout, PolicyLoaderTimeoutError(_loader_name(loader), timeout))
+                    if not future.done() else future.result()
+                )
+                if outcomes[-1][2] is not None and self.failure_policy_for(loader) is LoaderFailurePolicy.FAIL:
+                    # no point waiting for the others
+                    break
+        finally:
+            # a timed out loader cannot be interrupted; it finishes into a discarded staging model
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return self.collect_sources(jobs, outcomes, timed_out)
+
+    def collect_sources(self, jobs, outcomes, timed_out) -> List[Optional[_LoadedSource]]:
+        """
+        Apply the failure policies to the (result, seconds, error) outcomes of the (loader,
+        staging model) jobs, one per loader in order, and record their timings. Raises the error
+        of a failed FAIL loader. Also used by the async enforcer, which runs the loaders itself.
+        """
+        sources, timings = [], []
+        for index, ((loader, staging), (result, seconds, error), was_timed_out) in enumerate(
+                zip(jobs, outcomes, timed_out)):
+            name = _loader_name(loader)
+            if error is None:
+                source = _LoadedSource(result or LoadPolicyResult(), staging)
+                sources.append(source)
+                if self.failure_policy_for(loader) is LoaderFailurePolicy.KEEP_PREVIOUS:
+                    self._previous[index] = source
+                timings.append(LoaderTiming(name, seconds, LoaderStatus.LOADED, _count(source)))
+                continue
+
+            if isinstance(loader, PolicyLoaderABC):
+                # deltas must not build on a load its policies are missing from
+                loader.reset_delta()
+            failure_policy = self.failure_policy_for(loader)
+            timing = dict(seconds=seconds, timed_out=was_timed_out, error=str(error))
+            if failure_policy is LoaderFailurePolicy.FAIL:
+                timings.append(LoaderTiming(name, status=LoaderStatus.FAILED, **timing))
+                self._record(timings)
+                self.last_timings = timings
+                logger.error(f"Policy loader {name} failed: {error}")
+                raise error
+
+            previous = self._previous.get(index) if failure_policy is LoaderFailurePolicy.KEEP_PREVIOUS else None
+            if previous is not None:
+                logger.warning(f"Policy loader {name} failed, keeping its previously loaded policies: {error}")
+                timings.append(LoaderTiming(name, status=LoaderStatus.KEPT_PREVIOUS,
+                                            policy_count=_count(previous), **timing))
+            else:
+                logger.warning(f"Policy loader {name} failed, loading without its policies: {error}")
+                timings.append(LoaderTiming(name, status=LoaderStatus.SKIPPED, **timing))
+            sources.append(previous)
+
+        self._record(timings)
+        self.last_timings = timings
+        logger.debug("Policy loader timings: " + ", ".join(
+            f"{timing.loader} {timing.seconds:.3f}s ({timing.status.value})" for timing in timings))
+        return sources
+
+    def loaded_all(self) -> bool:
+        """
+        Whether every loader contributed freshly loaded policies to the last load, i.e. none
+        was SKIPPED or KEPT_PREVIOUS.
+        """
+        return all(timing.status is LoaderStatus.LOADED for timing in self.last_timings)
+
+    def _record(self, timings: List[LoaderTiming]) -> None:
+        if not self.metrics.enabled:
+            return
+        for timing in timings:
+            self.metrics.observe(LOADER_SECONDS, timing.seconds, loader=timing.loader, status=timing.status.value)
+            if timing.status is not LoaderStatus.FAILED:
+                self.metrics.set(LOADER_POLICIES, timing.policy_count, loader=timing.loader)
+
+    def timeout_for(self, loader) -> Optional[float]:
+        timeout = getattr(loader, "load_timeout", None)
+        return self.timeout if timeout is None else timeout
+
+    def failure_policy_for(self, loader) -> LoaderFailurePolicy:
+        return getattr(loader, "failure_policy", None) or self.failure_policy
 
     def save_policy(self, model: Model):
         raise NotImplementedError("MultiAdapter does not support saving policies.")
@@ -21,4 +214,26 @@ class MultiAdapter(PolicyLoaderABC):
         raise NotImplementedError()
 
     def remove_filtered_policy(self, sec, ptype, field_index, *field_values):
-        raise NotImplementedError()
\ No newline at end of file
+        raise NotImplementedError()
+
+
+def _run_loader(
+        loader: PolicyLoaderABC,
+        model: Model,
+        filter: Optional[dict]
+) -> Tuple[Optional[LoadPolicyResult], float, Optional[Exception]]:
+    started = time.perf_counter()
+    try:
+        with getattr(loader, "metrics", NOOP_METRICS).span("access_guard.load_policy", loader=_loader_name(loader)):
+            result = loader.load_policy(model, filter=filter)
+        return result, time.perf_counter() - started, None
+    except Exception as e:
+        return None, time.perf_counter() - started, e
+
+
+def _loader_name(loader) -> str:
+    return type(loader).__name__
+
+
+def _count(source: _LoadedSource) -> int:
+    return count_policies(source.model)
@@ -19,3 +19,23 @@ class PolicyQueryProvider(PolicyProvider):
     @abstractmethod
     def get_role_policies_query(self, role_id: str) -> tuple[str, dict]:
         pass
+
+    def supports_policy_changes(self) -> bool:
+        """
+        Override together with get_policy_watermark_query and get_policy_changes_query
+        to enable delta sync in PolicyDbLoader.
+        """
+        return False
+
+    def get_policy_watermark_query(self, filter: dict = None) -> tuple[str, dict]:
+        """
+        Query returning a single scalar: the current change watermark (e.g. max version or timestamp).
+        """
+        raise NotImplementedError()
+
+    def get_policy_changes_query(self, filter: dict, since) -> tuple[str, dict]:
+        """
+        Query returning the policy changes after the 'since' watermark, oldest first, with columns
+        ptype, subject, object, action, effect, operation ('add' or 'remove') and version.
+        """
+        raise NotImplementedError()
@@ -1,24 +1,161 @@
 import logging
+import time
+from urllib.parse import urljoin
 
 import requests
-from casbin import persist
+from requests.adapters import HTTPAdapter
+from typing import Iterator, List, Optional, Tuple
+from urllib3.util.retry import Retry
+
 from casbin.model import Model
 
+from access_guard.authz.loaders.json_stream import iter_json_array_field, iter_ndjson
+from access_guard.authz.loaders.policy_ingest import ingest_policies
 from access_guard.authz.models.load_policy_result import LoadPolicyResult
+from access_guard.authz.models.policy_delta import PolicyDelta
 from access_guard.authz.loaders.policy_loader_abc import PolicyLoaderABC
 
 logger = logging.getLogger(__name__)
 
+POLICIES_ENDPOINT = "/iam/policies"
+POLICY_CHANGES_ENDPOINT = "/iam/policies/changes"
+
+# statuses meaning the server has no changes feed at all, as opposed to 410 (version expired)
+_CHANGES_UNSUPPORTED_STATUSES = (404, 405, 501)
+
+DEFAULT_TIMEOUT = (5.0, 60.0)  # connect, read; seconds
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+DEFAULT_POOL_MAXSIZE = 4
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/jsonl", "application/json-seq")
+# bytes read from the socket per parsing step
+STREAM_CHUNK_SIZE = 1 << 16
+
+
+def build_request_headers() -> dict:
+    ### TODO: should be replaced by bearer token, this should be added by API Gateway
+    return {
+        # "Authorization": f"Bearer {self.api_token}",
+        "Accept": "application/json",
+        #cue:
+        # "app_id": "9e43b935-d443-4505-aaea-4d02dc7ba667",
+        # "user_id": "a2c49b9a-d36b-499d-adce-bb1196b353d2",
+        #meldai:
+        "app_id": "4cf8e948-0ce4-4f99-a43f-592dabd7fb82",
+        "user_id": "25096e51-c006-41f3-8824-7f0a3a3870fb",
+        "scope": "APP"
+    }
+
+
+def build_session(
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE
+) -> requests.Session:
+    """
+    A session keeping connections to the API alive, retrying failed connections and 429/5xx
+    answers of GET requests with exponential backoff (honoring Retry-After).
+    """
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET"}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _streaming_headers() -> dict:
+    headers = build_request_headers()
+    headers["Accept"] = "application/x-ndjson, application/json;q=0.9"
+    headers["Accept-Encoding"] = "gzip, deflate"
+    return headers
+
+
+def iter_response_entries(response: requests.Response, metadata: dict, url: str) -> Iterator[Tuple[str, ...]]:
+    """
+    Parse the policies of a streamed (and transparently decompressed) response as they arrive.
+    Its other members, or the NDJSON lines without a ptype, are stored in metadata.
+    """
+    content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+    if content_type in NDJSON_CONTENT_TYPES:
+        for entry in iter_ndjson(response.iter_lines(chunk_size=STREAM_CHUNK_SIZE)):
+            if "ptype" in entry:
+                yield parse_policy_entry(entry)
+            else:
+                metadata.update(entry)
+        return
+
+    if response.encoding is None:
+        response.encoding = "utf-8"
+    chunks = response.iter_content(chunk_size=STREAM_CHUNK_SIZE, decode_unicode=True)
+    try:
+        yield from map(parse_policy_entry, iter_json_array_field(chunks, "policies", metadata))
+    except ValueError as e:
+        raise ValueError(f"Invalid policies response from {url}: {e}") from e
+
+
+def parse_policy_entries(data: dict, url: str) -> List[Tuple[str, ...]]:
+    """
+    Convert the entries of a policies response into casbin policy tuples.
+    """
+    return list(iter_policy_entries(data, url))
+
+
+def iter_policy_entries(data: dict, url: str) -> Iterator[Tuple[str, ...]]:
+    if "policies" not in data or not isinstance(data["policies"], list):
+        raise ValueError(f"Invalid policies response from {url}")
+
+    return map(parse_policy_entry, data["policies"])
+
+
+def parse_policy_entry(entry: dict) -> Tuple[str, ...]:
+    parts = [entry["ptype"], entry["subject"], entry["object"]]
+    if entry.get("action") is not None:
+        parts.append(entry["action"])
+    if entry.get("effect") is not None:
+        parts.append(entry["effect"])
+    return tuple(parts)
+
 
 class PolicyApiLoader(PolicyLoaderABC):
-    def __init__(self, api_url: str):
+    def __init__(
+            self,
+            api_url: str,
+            session: Optional[requests.Session] = None,
+            timeout: Tuple[float, float] = DEFAULT_TIMEOUT,
+            max_retries: int = DEFAULT_MAX_RETRIES,
+            backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+            pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+            page_size: Optional[int] = None
+    ):
         """
         Initialize the adapter with API details.
         :param api_url: Base URL of the access management API (e.g., https://iam.example.com)
-        :param api_token: System-to-system token for authorization
+        :param session: Optional shared requests.Session; the loader creates and owns a pooled one otherwise
+        :param timeout: (connect, read) timeouts in seconds; read bounds every wait for data, not the whole download
+        :param max_retries: Retries of a request failing to connect or answering 429/5xx, with exponential backoff
+        :param backoff_factor: First retry delay in seconds, doubled per retry
+        :param pool_maxsize: Keep-alive connections kept open to the API
+        :param page_size: Rules per page, sent as ?limit=; the server's pagination applies when omitted
         """
         super().__init__()
         self.api_url = api_url.rstrip("/")
+        self.timeout = timeout
+        self.page_size = page_size
+        self._owns_session = session is None
+        self._session = session or build_session(max_retries, backoff_factor, pool_maxsize)
+        # sync state: policy version and ETag of the last load, used for conditional and delta requests
+        self._version = None
+        self._etag: Optional[str] = None
+        self._changes_supported = True
+        self._prefetched: Optional[requests.Response] = None
 
     def is_filtered(self) -> bool:
         return self._is_filtered
@@ -27,54 +164,148 @@ class PolicyApiLoader(PolicyLoaderABC):
         self._is_filtered = is_filtered
 
     def load_policy(self, model: Model, filter: dict = None) -> LoadPolicyResult:
-
+        """
+        Stream the policies into the model page by page, parsing each response while it downloads.
+        Responses may be a JSON object with a "policies" array, or NDJSON with one policy per line
+        (lines without a ptype carry the version and resource_prefix). Pages are followed through
+        a Link rel="next" header or a "next" member.
+        """
         self.set_filtered(True)
-
-        ### TODO: should be replaced by bearer token, this should be added by API Gateway
-        headers = {
-            # "Authorization": f"Bearer {self.api_token}",
-            "Accept": "application/json",
-            #cue:
-            # "app_id": "9e43b935-d443-4505-aaea-4d02dc7ba667",
-            # "user_id": "a2c49b9a-d36b-499d-adce-bb1196b353d2",
-            #meldai:
-            "app_id": "4cf8e948-0ce4-4f99-a43f-592dabd7fb82",
-            "user_id": "25096e51-c006-41f3-8824-7f0a3a3870fb",
-            "scope": "APP"
-        }
+        url = f"{self.api_url}{POLICIES_ENDPOINT}"
 
         try:
-            url = f"{self.api_url}/iam/policies"
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            data = response.json()
-            if "policies" not in data or not isinstance(data["policies"], list):
-                raise ValueError(f"Invalid policies response from {url}")
+            loaded_policies = self.new_retained()
+            metadata = {}
+            count = 0
+            etag = None
+            params = self._first_page_params()
+            response, self._prefetched = self._prefetched, None
+            while True:
+                started = time.perf_counter()
+                if response is None:
+                    # body already requested by the conditional request of load_policy_delta otherwise
+                    response = self._get(url, headers=_streaming_headers(), params=params, stream=True)
+                    response.raise_for_status()
+                fetched = time.perf_counter()
+                self.record_phase("fetch", fetched - started)
 
-            loaded_policies = []
+                with response:
+                    page = {}
+                    count += ingest_policies(model, iter_response_entries(response, page, url), retained=loaded_policies)
+                    etag = etag or response.headers.get("ETag")
+                    next_url = response.links.get("next", {}).get("url") or page.pop("next", None)
+                self.record_phase("parse", time.perf_counter() - fetched)
+                for key, value in page.items():
+                    metadata.setdefault(key, value)
 
-            for entry in data["policies"]:
-                parts = [entry["ptype"], entry["subject"], entry["object"]]
-                if entry.get("action") is not None:
-                    parts.append(entry["action"])
-                if entry.get("effect") is not None:
-                    parts.append(entry["effect"])
+                if not next_url:
+                    break
+                url, params, response = urljoin(url, next_url), None, None
 
-                policy_tuple = tuple(parts)
-                loaded_policies.append(policy_tuple)
+            logger.debug(f"Loaded {count} policy rules from {self.api_url}")
+            self._version = metadata.get("version")
+            self._etag = etag
 
-                policy_line = ", ".join(parts)
-                logger.debug(f"Loading policy rule: {policy_line}")
-                persist.load_policy_line(policy_line, model)
-
-            return LoadPolicyResult(
-                resource_prefix=data.get("resource_prefix", ""),
-                policies=loaded_policies
+            return LoadPolicyResult.from_loaded(
+                resource_prefix=metadata.get("resource_prefix", ""),
+                policies=loaded_policies if loaded_policies is not None else [],
+                policy_count=count
             )
 
         except Exception as e:
             logger.error(f"Failed to fetch policies from {url}: {e}")
             raise
 
+    def _first_page_params(self) -> Optional[dict]:
+        return {"limit": self.page_size} if self.page_size else None
+
+    def _get(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("headers", build_request_headers())
+        return self._session.get(url, timeout=self.timeout, **kwargs)
+
+    def close(self) -> None:
+        if self._prefetched is not None:
+            self._prefetched.close()
+            self._prefetched = None
+        if self._owns_session:
+            self._session.close()
+
+    def supports_delta(self) -> bool:
+        return True
+
+    def load_policy_delta(self, filter: dict = None) -> PolicyDelta:
+        """
+        Ask the changes endpoint for the rules changed since the last loaded version. Servers
+        without a changes feed are polled with a conditional request on the ETag instead; a
+        changed policy set then requires a full reload, which reuses the downloaded body.
+        """
+        if self._version is not None and self._changes_supported:
+            delta = self._fetch_changes()
+            if delta is not None:
+                return delta
+
+        if self._etag is not None:
+            return self._fetch_if_changed()
+
+        return PolicyDelta(full_reload=True)
+
+    def reset_delta(self) -> None:
+        self._version = None
+        self._etag = None
+        if self._prefetched is not None:
+            self._prefetched.close()
+            self._prefetched = None
+
+    def _fetch_changes(self) -> Optional[PolicyDelta]:
+        url = f"{self.api_url}{POLICY_CHANGES_ENDPOINT}"
+        headers = build_request_headers()
+        if self._etag is not None:
+            headers["If-None-Match"] = self._etag
+
+        try:
+            response = self._get(url, headers=headers, params={"since": self._version})
+            if response.status_code == 304:
+                return PolicyDelta()
+            if response.status_code in _CHANGES_UNSUPPORTED_STATUSES:
+                logger.info(f"No policy changes feed at {url}, falling back to conditional requests")
+                self._changes_supported = False
+                return None
+            if response.status_code == 410:
+                return PolicyDelta(full_reload=True)
+            response.raise_for_status()
+            data = response.json()
+        except Exception as e:
+            logger.error(f"Failed to fetch policy changes from {url}: {e}")
+            raise
+
+        if data.get("full_reload"):
+            return PolicyDelta(full_reload=True)
+
+        changes = [(True, parse_policy_entry(entry)) for entry in data.get("removed", [])]
+        changes += [(False, parse_policy_entry(entry)) for entry in data.get("added", [])]
+        self._version = data.get("version", self._version)
+        self._etag = response.headers.get("ETag", self._etag)
+        return PolicyDelta.from_changes(changes)
+
+    def _fetch_if_changed(self) -> PolicyDelta:
+        url = f"{self.api_url}{POLICIES_ENDPOINT}"
+        headers = _streaming_headers()
+        headers["If-None-Match"] = self._etag
+
+        try:
+            # the same first page load_policy requests, its body is reused as that page
+            response = self._get(url, headers=headers, params=self._first_page_params(), stream=True)
+            if response.status_code == 304:
+                response.close()
+                return PolicyDelta()
+            response.raise_for_status()
+        except Exception as e:
+            logger.error(f"Failed to fetch policies from {url}: {e}")
+            raise
 
+        # the full reload streams this response instead of requesting it again
+        if self._prefetched is not None:
+            self._prefetched.close()
+        self._prefetched = response
 
+        return PolicyDelta(full_reload=True)
@@ -1,11 +1,12 @@
 import logging
 from typing import List
 
-from casbin import persist
 from casbin.model import Model
 
 from access_guard.authz.loaders.casbin_policy_provider import CasbinPolicyProvider
+from access_guard.authz.loaders.policy_ingest import ingest_policies
 from access_guard.authz.loaders.policy_loader_abc import PolicyLoaderABC
+from access_guard.authz.models.casbin_policy import CasbinPolicy
 from access_guard.authz.models.load_policy_result import LoadPolicyResult
 
 logger = logging.getLogger(__name__)
@@ -16,19 +17,20 @@ class PolicyCodeLoader(PolicyLoaderABC):
         self.policy_provider = policy_provider
 
     def load_policy(self, model: Model, entity=None, filter=None):
-        casbin_policies = self.policy_provider.get_policies(filter)
-        policy_tuples = []
-        for p in casbin_policies:
-            tup, line = p.to_tuple_and_string()
-            persist.load_policy_line(line, model)
-            logger.debug(f"Loading policy rule: {line}")
-            policy_tuples.append(tup)
-
-        return LoadPolicyResult(
+        policy_tuples = self.new_retained()
+        count = ingest_policies(model, self._iter_policies(filter), retained=policy_tuples)
+        logger.debug(f"Loaded {count} policy rules from {self.policy_provider.__class__.__name__}")
+
+        return LoadPolicyResult.from_loaded(
             resource_prefix="",  # todo: see if needed here
-            policies=policy_tuples
+            policies=policy_tuples if policy_tuples is not None else [],
+            policy_count=count
         )
 
+    def _iter_policies(self, filter=None):
+        for policy in self.policy_provider.get_policies(filter):
+            yield policy.to_tuple() if isinstance(policy, CasbinPolicy) else tuple(policy)
+
     def save_policy(self, model: Model) -> bool:
         """Save policy to database."""
         # This is now handled by the IAM service
@@ -1,25 +1,75 @@
 import logging
-from typing import List, Optional, Union, Tuple
+import time
+from typing import Iterator, List, Optional, Union, Tuple
 
-from casbin import persist
 from casbin.model import Model
 from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
 
 from access_guard.authz.models.entities import Role, User
 from access_guard.authz.models.load_policy_result import LoadPolicyResult
+from access_guard.authz.models.policy_delta import PolicyDelta
 from access_guard.authz.loaders.poicy_query_provider import PolicyQueryProvider
+from access_guard.authz.loaders.policy_ingest import ingest_policies
 from access_guard.authz.loaders.policy_loader_abc import PolicyLoaderABC
+from access_guard.authz.loaders.policy_table import PolicyTable
 
 logger = logging.getLogger(__name__)
 
+POLICY_COLUMNS = ("ptype", "subject", "object", "action", "effect")
+
+# rows fetched per round trip from the server-side cursor
+DEFAULT_YIELD_PER = 10_000
+
+
+def policy_row_to_tuple(row) -> Optional[Tuple[str, ...]]:
+    """
+    Convert a (ptype, subject, object, action, effect) row into a casbin policy tuple.
+    Returns None for unknown policy types.
+    """
+    if row.ptype == "p":  # Only add effect for permission policies
+        effect = row.effect if row.effect else "allow"  # Default to "allow" if missing
+        return row.ptype, str(row.subject), str(row.object), str(row.action), str(effect)
+    elif row.ptype == "g":
+        return row.ptype, str(row.subject), str(row.object)
+    logger.warning(f"Unknown policy type: {row.ptype}")
+    return None
+
+
+def iter_policy_rows(result) -> Iterator[Tuple[str, ...]]:
+    """
+    Stream a query result as casbin policy tuples, resolving column positions once
+    instead of looking up columns by name on every row.
+    """
+    keys = list(result.keys())
+    ptype_idx, subject_idx, object_idx, action_idx, effect_idx = (keys.index(c) for c in POLICY_COLUMNS)
+    for row in result:
+        ptype = row[ptype_idx]
+        if ptype == "p":
+            effect = row[effect_idx] or "allow"  # Default to "allow" if missing
+            yield ptype, str(row[subject_idx]), str(row[object_idx]), str(row[action_idx]), str(effect)
+        elif ptype == "g":
+            yield ptype, str(row[subject_idx]), str(row[object_idx])
+        else:
+            logger.warning(f"Unknown policy type: {ptype}")
+
+
+def policy_query_for(query_provider: PolicyQueryProvider, filter: dict = None) -> Tuple[str, dict]:
+    if filter:
+        return query_provider.get_filtered_policies_query(filter)
+    logger.debug("Loading all policies...")
+    return query_provider.get_all_policies_query()
+
 
 class PolicyDbLoader(PolicyLoaderABC):
-    def __init__(self, query_provider: PolicyQueryProvider, engine):
+    def __init__(self, query_provider: PolicyQueryProvider, engine, yield_per: int = DEFAULT_YIELD_PER):
         super().__init__()
         self.engine = engine
+        self.yield_per = yield_per
         self.Session = sessionmaker(bind=engine)
         self.query_provider = query_provider
+        self._watermark = None
+        self._has_watermark = False
 
     def set_filtered(self, is_filtered: bool = True):
         self._is_filtered = is_filtered
@@ -41,47 +91,94 @@ class PolicyDbLoader(PolicyLoaderABC):
             else:
                 logger.warning(f"Unsupported subject type: {entity.__class__.__name__}")
                 return
-        elif filter:
-            query, params = self.query_provider.get_filtered_policies_query(filter)
         else:
-            logger.debug("Loading all policies...")
-            query, params = self.query_provider.get_all_policies_query()
+            query, params = policy_query_for(self.query_provider, filter)
+
+        # read before loading: changes made during the load are replayed by the next delta
+        watermark = self._fetch_watermark(filter) if entity is None and self.supports_delta() else None
 
-        policies = self._run_load_policy(query, params, model)
+        policies = self.new_retained()
+        count = self._run_load_policy(query, params, model, policies)
+        if entity is None and self.supports_delta():
+            # only a completed load moves the watermark, a failed one leaves deltas at the last good load
+            self._watermark = watermark
+            self._has_watermark = True
 
-        return LoadPolicyResult(
+        return LoadPolicyResult.from_loaded(
             resource_prefix=None, # todo: see if needed here
-            policies=policies
+            policies=policies if policies is not None else [],
+            policy_count=count
         )
 
-    def _run_load_policy(self, query: str, params: dict, model: Model) -> List[Tuple[str, ...]]:
+    def _run_load_policy(self, query: str, params: dict, model: Model,
+                         retained: Optional[PolicyTable] = None) -> int:
         """
-        Private method to execute the query and load policies into the Casbin model.
+        Private method to execute the query and stream its rows into the Casbin model
+        through a server-side cursor, yield_per rows at a time.
         """
-        loaded_policies = []
         session = self.Session()
         try:
-            result = session.execute(text(query), params)
-            for row in result:
-                if row.ptype == "p":  # Only add effect for permission policies
-                    effect = row.effect if row.effect else "allow"  # Default to "allow" if missing
-                    line = f"{row.ptype}, {row.subject}, {row.object}, {row.action}, {effect}"
-                elif row.ptype == "g":
-                    line = f"{row.ptype}, {row.subject}, {row.object}"
-                else:
-                    logger.warning(f"Unknown policy type: {row.ptype}")
-                    continue
-                logger.debug(f"Loading policy rule: {line}")
-                row_tuple = tuple(str(item) for item in row if item is not None)
-                loaded_policies.append(row_tuple)
-                persist.load_policy_line(line, model)
+            started = time.perf_counter()
+            statement = text(query).execution_options(stream_results=True, yield_per=self.yield_per)
+            result = session.execute(statement, params)
+            executed = time.perf_counter()
+            self.record_phase("fetch", executed - started)
+            # rows keep arriving from the cursor while they are ingested, so parse includes the transfer
+            count = ingest_policies(model, iter_policy_rows(result), retained=retained)
+            self.record_phase("parse", time.perf_counter() - executed)
+            logger.debug(f"Loaded {count} policy rules")
+            return count
         except Exception as e:
             logger.error(f"Error loading policies: {e}")
             logger.exception(e)
+            # a partial result would replace the last good policies, let the enforcer keep them
+            raise
         finally:
             session.close()
 
-        return loaded_policies
+    def supports_entity_load(self) -> bool:
+        return True
+
+    def supports_delta(self) -> bool:
+        return self.query_provider.supports_policy_changes()
+
+    def load_policy_delta(self, filter: dict = None) -> PolicyDelta:
+        if not self.supports_delta() or not self._has_watermark:
+            return PolicyDelta(full_reload=True)
+
+        query, params = self.query_provider.get_policy_changes_query(filter, self._watermark)
+        changes = []
+        watermark = self._watermark
+        session = self.Session()
+        try:
+            for row in session.execute(text(query), params):
+                policy = policy_row_to_tuple(row)
+                if policy is None:
+                    continue
+                changes.append((row.operation == "remove", policy))
+                if row.version is not None and (watermark is None or row.version > watermark):
+                    watermark = row.version
+        except Exception as e:
+            logger.error(f"Error loading policy changes: {e}")
+            raise
+        finally:
+            session.close()
+
+        self._watermark = watermark
+        delta = PolicyDelta.from_changes(changes)
+        logger.debug(f"Loaded policy delta: +{len(delta.added)} -{len(delta.removed)}, watermark {watermark}")
+        return delta
+
+    def reset_delta(self) -> None:
+        self._has_watermark = False
+
+    def _fetch_watermark(self, filter: dict = None):
+        query, params = self.query_provider.get_policy_watermark_query(filter)
+        session = self.Session()
+        try:
+            return session.execute(text(query), params).scalar()
+        finally:
+            session.close()
 
     def save_policy(self, model: Model) -> bool:
         """Save policy to database."""
@@ -0,0 +1,130 @@
+"""
+Bulk policy ingestion shared by all loaders.
+
+Loaders produce policies as plain (ptype, field, ...) tuples, possibly from a generator, and
+ingest_policies appends them straight to the model's assertion lists. This skips the
+"p, sub, obj, act" string round trip through casbin's persist.load_policy_line, keeping its
+semantics: fields are stripped of surrounding whitespace (CHAR columns, padded API values). They
+are also interned on the way in: subjects, resources and actions repeat across many rules, and
+every row read from a database or a JSON body would otherwise hold its own copy.
+"""
+import copy
+from collections import Counter
+from sys import intern
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+
+from casbin import Model
+
+from access_guard.authz.loaders.policy_table import PolicyTable
+
+Policy = Sequence[str]
+
+
+def ingest_policies(
+        model: Model,
+        policies: Iterable[Policy],
+        retained: Optional[Union[List[Tuple[str, ...]], PolicyTable]] = None
+) -> int:
+    """
+    Append policies to the model and return how many were ingested.
+
+    Policies whose ptype is not defined by the model are skipped, as load_policy_line does.
+    When a retained list (or PolicyTable) is given, every ingested policy tuple is also appended to it.
+    """
+    appenders = {}
+    count = 0
+    for policy in policies:
+        ptype = policy[0].strip()
+        append = appenders.get(ptype)
+        if append is None:
+            append = appenders[ptype] = _policy_appender(model, ptype)
+        if append is _skip:
+            continue
+        rule = [intern(field.strip()) if type(field) is str else field for field in policy[1:]]
+        append(rule)
+        if retained is not None:
+            retained.append((ptype, *rule))
+        count += 1
+    return count
+
+
+def strip_policy(policy: Policy) -> Tuple[str, ...]:
+    """
+    The policy with its fields stripped of surrounding whitespace, as ingest_policies stores them.
+    """
+    return tuple(field.strip() if type(field) is str else field for field in policy)
+
+
+def _skip(rule):
+    pass
+
+
+def _policy_appender(model: Model, ptype: str):
+    sec = ptype[:1]
+    if sec not in model.keys() or ptype not in model[sec].keys():
+        return _skip
+    return model[sec][ptype].policy.append
+
+
+def empty_model_like(model: Model) -> Model:
+    """
+    Return a model with the same definition as model and no policies, without reading the
+    model config again.
+    """
+    staging = Model()
+    for sec in model.keys():
+        staging[sec] = {}
+        for key, assertion in model[sec].items():
+            assertion = copy.copy(assertion)
+            assertion.policy = []
+            assertion.policy_map = {}
+            staging[sec][key] = assertion
+    return staging
+
+
+def count_policies(model: Model) -> int:
+    return sum(
+        len(assertion.policy) for sec in ("p", "g") if sec in model.keys() for assertion in model[sec].values()
+    )
+
+
+def merge_policies(source: Model, target: Model) -> None:
+    """
+    Append all policies of source to target, in order. Rule lists are shared, not copied.
+    """
+    for sec in ("p", "g"):
+        if sec not in source.keys():
+            continue
+        for ptype, assertion in source[sec].items():
+            target[sec][ptype].policy.extend(assertion.policy)
+
+
+def apply_policy_delta(
+        source: Model,
+        target: Model,
+        added: Iterable[Policy],
+        removed: Iterable[Policy]
+) -> None:
+    """
+    Copy the policies of source into target, dropping one occurrence per removed rule and
+    appending the added ones. Rule lists are shared, only the containers are copied.
+    """
+    removals = Counter((policy[0], tuple(policy[1:])) for policy in removed)
+    removed_ptypes = {ptype for ptype, _ in removals}
+    for sec in ("p", "g"):
+        if sec not in source.keys():
+            continue
+        for ptype, assertion in source[sec].items():
+            if ptype not in removed_ptypes:
+                target[sec][ptype].policy = list(assertion.policy)
+                continue
+            kept = []
+            for rule in assertion.policy:
+                key = (ptype, tuple(rule))
+                if removals[key] > 0:
+                    removals[key] -= 1
+                else:
+                    kept.append(rule)
+            target[sec][ptype].policy = kept
+
+    ingest_policies(target, added)
@@ -1,13 +1,27 @@
 
 from abc import ABC, abstractmethod
+from typing import Optional
 
 from casbin.model import Model
 from casbin.persist import Adapter
 
+from access_guard.authz.loaders.policy_table import PolicyTable
+from access_guard.authz.metrics.recorder import LOADER_PHASE_SECONDS, NOOP_METRICS, MetricsRecorder
+from access_guard.authz.models.enums import LoaderFailurePolicy
 from access_guard.authz.models.load_policy_result import LoadPolicyResult
+from access_guard.authz.models.policy_delta import PolicyDelta
 
 
 class PolicyLoaderABC(Adapter, ABC):
+    # per-loader overrides of the enforcer's loader_timeout / loader_failure_policy
+    load_timeout: Optional[float] = None
+    failure_policy: Optional[LoaderFailurePolicy] = None
+    # set by the enforcer owning the loader, see set_metrics
+    metrics: MetricsRecorder = NOOP_METRICS
+    # whether load_policy also returns the loaded rules in LoadPolicyResult.policies;
+    # enforcers turn it off unless retain_loaded_policies is set
+    retain_policies: bool = True
+
     def __init__(self):
         self._is_filtered = False
 
@@ -17,6 +31,44 @@ class PolicyLoaderABC(Adapter, ABC):
     def set_filtered(self, is_filtered: bool = True):
         self._is_filtered = is_filtered
 
+    def set_metrics(self, metrics: MetricsRecorder) -> None:
+        self.metrics = metrics
+
+    def new_retained(self) -> Optional[PolicyTable]:
+        """
+        The container load_policy collects LoadPolicyResult.policies in, None when not retaining.
+        """
+        return PolicyTable() if self.retain_policies else None
+
+    def record_phase(self, phase: str, seconds: float) -> None:
+        """
+        Record how long the fetch (network, query) or parse (ingestion into the model) phase of a load took.
+        """
+        self.metrics.observe(LOADER_PHASE_SECONDS, seconds, loader=type(self).__name__, phase=phase)
+
     @abstractmethod
     def load_policy(self, model: Model, filter: dict = None) -> LoadPolicyResult:
         pass
+
+    def supports_entity_load(self) -> bool:
+        """
+        Whether load_policy accepts entity=User/Role to load only the policies of that user or role,
+        as used by the lazy per-user slices of PermissionsEnforcer.
+        """
+        return False
+
+    def supports_delta(self) -> bool:
+        return False
+
+    def load_policy_delta(self, filter: dict = None) -> PolicyDelta:
+        """
+        Return the rules added and removed since the last load_policy/load_policy_delta call.
+        Loaders that cannot tell request a full reload.
+        """
+        return PolicyDelta(full_reload=True)
+
+    def reset_delta(self) -> None:
+        """
+        Forget the position of the last load, so the next load_policy_delta requests a full
+        reload. Called when a load of the loader failed and its policies were left out.
+        """
@@ -0,0 +1,76 @@
+from array import array
+from sys import intern
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple, Union, overload
+
+
+class PolicyTable(Sequence[Tuple[str, ...]]):
+    """
+    Append-only list of policy tuples stored compactly.
+
+    Every distinct string is kept once (and interned), and the policies are stored as integer
+    IDs in one array with the end offset of every policy in another, i.e. a few bytes per field
+    instead of a tuple of string references per policy. Reading a policy builds its tuple from
+    the shared strings, so policies read from the same table share their strings.
+    """
+    __slots__ = ("_strings", "_ids", "_values", "_ends")
+
+    def __init__(self, policies: Iterable[Sequence[str]] = ()):
+        self._strings: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._values = array("I")
+        self._ends = array("I")
+        self.extend(policies)
+
+    def append(self, policy: Sequence[str]) -> None:
+        ids, strings, values = self._ids, self._strings, self._values
+        for field in policy:
+            value_id = ids.get(field)
+            if value_id is None:
+                value_id = ids[field] = len(strings)
+                strings.append(intern(field) if type(field) is str else field)
+            values.append(value_id)
+        self._ends.append(len(values))
+
+    def extend(self, policies: Iterable[Sequence[str]]) -> None:
+        append = self.append
+        for policy in policies:
+            append(policy)
+
+    def __len__(self) -> int:
+        return len(self._ends)
+
+    @overload
+    def __getitem__(self, index: int) -> Tuple[str, ...]: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Tuple[str, ...]]: ...
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("policy index out of range")
+        start = self._ends[index - 1] if index else 0
+        strings = self._strings
+        return tuple(strings[value_id] for value_id in self._values[start:self._ends[index]])
+
+    def __iter__(self) -> Iterator[Tuple[str, ...]]:
+        strings, values = self._strings, self._values
+        start = 0
+        for end in self._ends:
+            yield tuple([strings[value_id] for value_id in values[start:end]])
+            start = end
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (PolicyTable, list, tuple)):
+            return len(self) == len(other) and all(a == tuple(b) for a, b in zip(self, other))
+        return NotImplemented
+
+    @property
+    def string_count(self) -> int:
+        return len(self._strings)
+
+    def __repr__(self) -> str:
+        return f"PolicyTable({len(self)} policies, {len(self._strings)} strings)"
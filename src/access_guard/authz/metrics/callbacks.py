@@ -0,0 +1,77 @@
+from typing import Any, Callable, ContextManager, Dict, Optional
+
+from access_guard.authz.metrics.recorder import METRIC_DESCRIPTIONS, MetricsRecorder
+
+MetricCallback = Callable[[str, float, Dict[str, str]], None]
+
+
+class CallbackMetricsRecorder(MetricsRecorder):
+    """
+    Forwards every measurement to callbacks called with (name, value, labels).
+    Callbacks left out are not called.
+    """
+    enabled = True
+
+    def __init__(
+            self,
+            on_increment: Optional[MetricCallback] = None,
+            on_observe: Optional[MetricCallback] = None,
+            on_set: Optional[MetricCallback] = None
+    ):
+        self._on_increment = on_increment
+        self._on_observe = on_observe
+        self._on_set = on_set
+
+    def increment(self, name: str, amount: float = 1.0, **labels: str) -> None:
+        if self._on_increment is not None:
+            self._on_increment(name, amount, labels)
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        if self._on_observe is not None:
+            self._on_observe(name, value, labels)
+
+    def set(self, name: str, value: float, **labels: str) -> None:
+        if self._on_set is not None:
+            self._on_set(name, value, labels)
+
+
+class OpenTelemetryMetricsRecorder(MetricsRecorder):
+    """
+    Records into an OpenTelemetry Meter, and traces loads and refreshes with a Tracer if given.
+
+        from opentelemetry import metrics, trace
+        recorder = OpenTelemetryMetricsRecorder(metrics.get_meter("access_guard"), trace.get_tracer("access_guard"))
+
+    Only the meter/tracer API is used, opentelemetry is not a dependency of access_guard.
+    Gauges need an API with synchronous gauges (create_gauge); they are skipped otherwise.
+    """
+    enabled = True
+
+    def __init__(self, meter: Any, tracer: Any = None):
+        self._meter = meter
+        self._tracer = tracer
+        self._instruments: Dict[str, Any] = {}
+
+    def _instrument(self, name: str, factory: str) -> Any:
+        instrument = self._instruments.get(name)
+        if instrument is None:
+            create = getattr(self._meter, factory, None)
+            instrument = create(name, description=METRIC_DESCRIPTIONS.get(name, "")) if create else False
+            self._instruments[name] = instrument
+        return instrument
+
+    def increment(self, name: str, amount: float = 1.0, **labels: str) -> None:
+        self._instrument(name, "create_counter").add(amount, labels)
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        self._instrument(name, "create_histogram").record(value, labels)
+
+    def set(self, name: str, value: float, **labels: str) -> None:
+        gauge = self._instrument(name, "create_gauge")
+        if gauge:
+            gauge.set(value, labels)
+
+    def span(self, name: str, **attributes: str) -> ContextManager:
+        if self._tracer is None:
+            return super().span(name, **attributes)
+        return self._tracer.start_as_current_span(name, attributes=attributes)
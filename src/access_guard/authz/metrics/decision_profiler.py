@@ -0,0 +1,50 @@
+import random
+import threading
+from collections import deque
+from typing import Deque, List, Optional
+
+from access_guard.authz.models.slow_decision import SlowDecision
+
+
+class DecisionProfiler:
+    """
+    Opt-in sampling of enforce calls: a sample_rate fraction of them is timed and those taking
+    threshold seconds or more are kept, with what decided them, in a ring buffer of the last
+    capacity slow decisions. Unsampled calls cost one random draw (none at a rate of 1.0).
+    """
+
+    def __init__(self, threshold: float, sample_rate: float = 1.0, capacity: int = 256):
+        if not 0.0 < sample_rate <= 1.0:
+            raise ValueError(f"sample_rate must be in (0, 1], got {sample_rate}")
+        if capacity < 1:
+            raise ValueError(f"capacity must be at least 1, got {capacity}")
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.capacity = capacity
+        self._decisions: Deque[SlowDecision] = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._sample_all = sample_rate >= 1.0
+        self._random = random.random
+
+    def sampled(self) -> bool:
+        return self._sample_all or self._random() < self.sample_rate
+
+    def is_slow(self, seconds: float) -> bool:
+        return seconds >= self.threshold
+
+    def record(self, decision: SlowDecision) -> None:
+        with self._lock:
+            self._decisions.append(decision)
+
+    def slow_decisions(self, limit: Optional[int] = None) -> List[SlowDecision]:
+        """
+        The slow decisions kept, newest first.
+        """
+        with self._lock:
+            decisions = list(self._decisions)
+        decisions.reverse()
+        return decisions if limit is None else decisions[:limit]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._decisions.clear()
@@ -0,0 +1,59 @@
+from contextlib import nullcontext
+from typing import ContextManager
+
+# counters
+DECISIONS_TOTAL = "access_guard_decisions_total"  # result=allow|deny
+REFRESH_FAILURES_TOTAL = "access_guard_refresh_failures_total"  # kind=full|delta
+POLICY_CHANGES_TOTAL = "access_guard_policy_changes_total"  # change=full|delta, notifications received
+SLOW_DECISIONS_TOTAL = "access_guard_slow_decisions_total"  # sampled checks over slow_decision_threshold
+# histograms, in seconds
+DECISION_SECONDS = "access_guard_decision_seconds"
+BATCH_DECISION_SECONDS = "access_guard_batch_decision_seconds"
+LOADER_SECONDS = "access_guard_loader_seconds"  # loader, status
+LOADER_PHASE_SECONDS = "access_guard_loader_phase_seconds"  # loader, phase=fetch|parse
+REFRESH_SECONDS = "access_guard_refresh_seconds"  # kind=full|delta
+# gauges
+LOADER_POLICIES = "access_guard_loader_policies"  # loader
+POLICIES = "access_guard_policies"
+
+METRIC_DESCRIPTIONS = {
+    DECISIONS_TOTAL: "Permission checks by result",
+    REFRESH_FAILURES_TOTAL: "Failed policy refreshes",
+    POLICY_CHANGES_TOTAL: "Policy change notifications received from the watcher",
+    SLOW_DECISIONS_TOTAL: "Sampled checks slower than the slow decision threshold",
+    DECISION_SECONDS: "Duration of has_permission calls",
+    BATCH_DECISION_SECONDS: "Duration of batch permission checks",
+    LOADER_SECONDS: "Duration of a policy loader load",
+    LOADER_PHASE_SECONDS: "Duration of fetching and parsing policies, per loader",
+    REFRESH_SECONDS: "Duration of policy refreshes",
+    LOADER_POLICIES: "Rules returned by the last load of a loader",
+    POLICIES: "Rules in the current policy snapshot",
+}
+
+
+class MetricsRecorder:
+    """
+    Receives the enforcer's and loaders' metrics. This base class records nothing.
+
+    Callers skip timing altogether when enabled is False, so the default recorder costs a
+    single attribute check per permission check. Label values are passed as keyword arguments.
+    """
+    enabled = False
+
+    def increment(self, name: str, amount: float = 1.0, **labels: str) -> None:
+        pass
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        pass
+
+    def set(self, name: str, value: float, **labels: str) -> None:
+        pass
+
+    def span(self, name: str, **attributes: str) -> ContextManager:
+        """
+        Trace a policy load or refresh. Never used on the per-check path.
+        """
+        return nullcontext()
+
+
+NOOP_METRICS = MetricsRecorder()
@@ -0,0 +1,12 @@
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+
+@dataclass(frozen=True)
+class DecisionExplanation:
+    """
+    Why a check was decided: the deny that matched, else the first matching allow.
+    """
+    matched_rule: Optional[Tuple[str, ...]]  # None when no rule matched (denied by default)
+    candidates_scanned: int  # rules the matcher was evaluated against
+    role_path: Tuple[str, ...] = ()  # subject, ..., owner of the matched rule
@@ -7,6 +7,7 @@ class Role:
     scope: Optional[str] = None
     app_id: Optional[int] = None
     org_id: Optional[int] = None
+    id: Optional[str] = None
 
 @dataclass
 class User:
@@ -11,3 +11,37 @@ class PermissionsAdapterType(Enum):
     Enum for different types of permission adapters.
     """
     CASBIN = "casbin"
+
+
+class LoaderFailurePolicy(Enum):
+    """
+    What a multi-loader load does when one loader fails or times out.
+    """
+    FAIL = "fail"  # abort the load, the previous policies keep serving
+    SKIP = "skip"  # load without that loader's rules
+    KEEP_PREVIOUS = "keep_previous"  # reuse that loader's rules from its last successful load
+
+
+class LoaderStatus(Enum):
+    LOADED = "loaded"
+    SKIPPED = "skipped"
+    KEPT_PREVIOUS = "kept_previous"
+    FAILED = "failed"
+
+
+class ResourceMatch(Enum):
+    """
+    How a resource pattern of a ResourceFilter matches a resource.
+    """
+    EXACT = "exact"  # equal to the value
+    PREFIX = "prefix"  # starts with the value (a key_match3 "/*" pattern)
+    PATTERN = "pattern"  # matches the value, a regular expression
+    ANY = "any"  # every resource
+
+
+class PolicyChange(Enum):
+    """
+    What a policy change notification asks the enforcers to do.
+    """
+    DELTA = "delta"  # sync_policies: apply the rules changed since the last load
+    FULL = "full"  # refresh_policies: reload everything
@@ -1,4 +1,4 @@
-from typing import Optional, List, Tuple
+from typing import Optional, List, Sequence, Tuple
 
 from pydantic import BaseModel
 
@@ -6,3 +6,21 @@ from pydantic import BaseModel
 class LoadPolicyResult(BaseModel):
     resource_prefix: Optional[str] = None
     policies: List[Tuple[str, ...]] = []  # default empty list, always a list of tuples
+    policy_count: int = 0  # number of rules loaded into the model
+
+    @classmethod
+    def from_loaded(
+            cls,
+            policies: Sequence[Tuple[str, ...]],
+            policy_count: int,
+            resource_prefix: Optional[str] = None
+    ) -> "LoadPolicyResult":
+        """
+        Build a result for policies a loader already ingested, skipping per-rule validation.
+        policies may be a PolicyTable, kept as is.
+        """
+        return cls.model_construct(
+            resource_prefix=resource_prefix,
+            policies=policies,
+            policy_count=policy_count
+        )
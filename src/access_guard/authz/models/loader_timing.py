@@ -0,0 +1,14 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from access_guard.authz.models.enums import LoaderStatus
+
+
+@dataclass(frozen=True)
+class LoaderTiming:
+    loader: str
+    seconds: float
+    status: LoaderStatus
+    policy_count: int = 0
+    timed_out: bool = False
+    error: Optional[str] = None
@@ -0,0 +1,24 @@
+from dataclasses import dataclass
+from typing import Tuple
+
+
+@dataclass(frozen=True)
+class OptimizationReport:
+    """
+    What the policy optimizer removed from a load; rule counts include p and g rules.
+    """
+    rules_before: int
+    rules_after: int
+    duplicates: int = 0  # identical rules
+    subsumed: int = 0  # covered by a broader rule of the same subject and effect
+    shadowed: int = 0  # allow rules covered by a deny of the same subject
+    flattened_roles: Tuple[str, ...] = ()  # rule-less roles with one parent, their members linked to it
+    seconds: float = 0.0
+
+    @property
+    def removed(self) -> int:
+        return self.rules_before - self.rules_after
+
+    @property
+    def removed_ratio(self) -> float:
+        return self.removed / self.rules_before if self.rules_before else 0.0
@@ -3,7 +3,9 @@ from typing import Optional, Dict, Any
 
 from pydantic import BaseModel
 
-from access_guard.authz.models.enums import PolicyLoaderType
+from access_guard.authz.metrics.recorder import MetricsRecorder
+from access_guard.authz.models.enums import LoaderFailurePolicy, PolicyLoaderType
+from access_guard.authz.watchers.policy_watcher import PolicyWatcher
 
 
 class PermissionsEnforcerParams(BaseModel):
@@ -18,5 +20,57 @@ class PermissionsEnforcerParams(BaseModel):
     # generic filter to be passed as-is to loaders
     filter: Optional[Dict[str, Any]] = None
 
+    # loaders run concurrently; per-loader load_timeout / failure_policy override these
+    loader_timeout: Optional[float] = None  # seconds, unbounded when omitted
+    loader_failure_policy: LoaderFailurePolicy = LoaderFailurePolicy.FAIL
+    loader_max_workers: Optional[int] = None  # one thread per loader when omitted
+
+    # keep the rules returned by the loaders (LoadPolicyResult.policies) besides the model, see get_last_load_result
+    retain_loaded_policies: bool = False
+
+    # warm start: loaded policies are written here and served from it on the next start
+    snapshot_path: Optional[str] = None
+    snapshot_max_age: Optional[float] = None  # seconds, older snapshots are ignored
+
+    # shared store: one leader process per host loads, the others follow its published policies
+    shared_store_dir: Optional[str] = None
+    shared_store_poll_interval: float = 1.0  # seconds between follower checks
+    shared_store_attach_timeout: float = 30.0  # followers load themselves when nothing is published by then
+
+    # lazy mode: entity-capable loaders are queried per user on first check instead of loaded in full
+    lazy_user_slices: bool = False
+    user_slice_max_rules: int = 1_000_000  # total rules kept across cached slices
+    user_slice_ttl: Optional[float] = 300.0  # seconds, no expiry when None
+
+    # decision/loader/refresh metrics, see access_guard.authz.metrics; nothing is measured when omitted
+    metrics: Optional[MetricsRecorder] = None
+
+    # compaction of fully loaded policies (shipped model only), see engine/policy_optimizer.py
+    optimize_policies: bool = False
+    flatten_role_aliases: bool = False  # also drop rule-less single-parent roles; they leave the effective roles
+
+    # compiled fast path, only used when the model matches the shipped rbac_model.conf
+    use_compiled_engine: bool = True
+
+    # decision cache; disabled when size is 0
+    decision_cache_size: int = 0
+    decision_cache_ttl: Optional[float] = None  # seconds, no expiry when omitted
+
+    # slow-decision profiler, see get_slow_decisions; disabled unless a threshold (seconds) is set
+    slow_decision_threshold: Optional[float] = None
+    slow_decision_sample_rate: float = 1.0  # fraction of checks timed
+    slow_decision_buffer_size: int = 256  # slow decisions kept, the oldest are dropped first
+
+    # background refresh; disabled unless an interval (seconds) is set
+    refresh_interval: Optional[float] = None
+    refresh_jitter: float = 0.1  # fraction of the interval
+    refresh_failure_backoff: float = 5.0  # first retry delay after a failure, doubles per failure
+    refresh_max_backoff: float = 300.0
+
+    # push-based refresh: change notifications received by the watcher trigger sync_policies (or refresh_policies)
+    watcher: Optional[PolicyWatcher] = None
+    watcher_debounce: float = 0.05  # seconds without notifications before a burst is applied
+    watcher_max_delay: float = 1.0  # seconds, a burst is applied at the latest this long after its first notification
+
     class Config:
         arbitrary_types_allowed = True
@@ -0,0 +1,36 @@
+from collections import Counter
+from typing import Iterable, List, Tuple
+
+from pydantic import BaseModel
+
+from access_guard.authz.loaders.policy_ingest import strip_policy
+
+
+class PolicyDelta(BaseModel):
+    added: List[Tuple[str, ...]] = []
+    removed: List[Tuple[str, ...]] = []
+    # set when the loader cannot describe its changes (no watermark yet, watermark expired, ...)
+    full_reload: bool = False
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.full_reload and not self.added and not self.removed
+
+    @classmethod
+    def from_changes(cls, changes: Iterable[Tuple[bool, Tuple[str, ...]]]) -> "PolicyDelta":
+        """
+        Net out chronologically ordered (is_removal, policy) changes, so a rule added and
+        removed within the same window cancels out. Fields are stripped like ingest_policies
+        strips them, so removals match the loaded rules.
+        """
+        net = Counter()
+        for is_removal, policy in changes:
+            net[strip_policy(policy)] += -1 if is_removal else 1
+
+        added, removed = [], []
+        for policy, count in net.items():
+            if count > 0:
+                added.extend([policy] * count)
+            elif count < 0:
+                removed.extend([policy] * -count)
+        return cls(added=added, removed=removed)
@@ -0,0 +1,24 @@
+from dataclasses import dataclass
+from typing import Optional
+
+import casbin
+from casbin import Model
+
+from access_guard.authz.engine.compiled_engine import CompiledPolicyEngine
+
+
+@dataclass(frozen=True)
+class PolicySnapshot:
+    """
+    A fully built, read-only policy state: model plus either the compiled engine or a casbin
+    enforcer with its role links (only built when the engine cannot serve the model).
+
+    The enforcer answers every check from a single snapshot and replaces it as a whole on
+    refresh, so readers never lock and never observe a partially loaded policy.
+    """
+    model: Model
+    enforcer: Optional[casbin.Enforcer] = None
+    engine: Optional[CompiledPolicyEngine] = None
+    resource_prefix: str = ""
+    generation: int = 0
+    slice_epoch: int = 0  # distinguishes successive loads of a lazy user slice, 0 otherwise
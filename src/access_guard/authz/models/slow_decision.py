@@ -0,0 +1,16 @@
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+
+@dataclass(frozen=True)
+class SlowDecision:
+    subject: str
+    resource: str  # as enforced, with the resource prefix
+    action: str
+    allowed: bool
+    seconds: float
+    generation: int
+    recorded_at: float  # time.time()
+    matched_rule: Optional[Tuple[str, ...]] = None
+    candidates_scanned: int = 0
+    role_path: Tuple[str, ...] = ()
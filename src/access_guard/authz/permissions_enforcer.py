@@ -1,21 +1,102 @@
+import itertools
 import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import replace
 from pathlib import Path
-from typing import List, Union, Optional, ClassVar
+from typing import ClassVar, Dict, Iterable, List, Optional, Sequence, Tuple, Union
 
 import casbin
-from access_guard.authz.exceptions import PermissionDeniedError
+from access_guard.authz.cache.decision_cache import DecisionCache
+from access_guard.authz.cache.user_slice_cache import UserSliceCache
+from access_guard.authz.engine.compiled_engine import CompiledPolicyEngine, find_deciding_rule
+from access_guard.authz.engine.key_match import key_match2
+from access_guard.authz.engine.pattern_set import PatternSet
+from access_guard.authz.engine.permission_digest import encode_permission_digest
+from access_guard.authz.engine.policy_optimizer import optimize_policies
+from access_guard.authz.engine.resource_filter import ResourceFilter, build_resource_filter
+from access_guard.authz.engine.role_index import MAX_HIERARCHY_LEVEL, role_path
+from access_guard.authz.exceptions import (
+    BatchPermissionDeniedError,
+    InvalidPolicySnapshotError,
+    PermissionDeniedError,
+)
 from access_guard.authz.loaders.multi_adapter import MultiAdapter
+from access_guard.authz.loaders.policy_ingest import apply_policy_delta, count_policies, empty_model_like, merge_policies
+from access_guard.authz.loaders.policy_loader_abc import PolicyLoaderABC
 from access_guard.authz.loaders.policy_provider_abc import PolicyProvider
-from access_guard.authz.models.entities import User
+from access_guard.authz.metrics.decision_profiler import DecisionProfiler
+from access_guard.authz.metrics.recorder import (
+    BATCH_DECISION_SECONDS,
+    DECISION_SECONDS,
+    DECISIONS_TOTAL,
+    NOOP_METRICS,
+    POLICIES,
+    POLICY_CHANGES_TOTAL,
+    REFRESH_FAILURES_TOTAL,
+    REFRESH_SECONDS,
+    SLOW_DECISIONS_TOTAL,
+)
+from access_guard.authz.models.cache_stats import CacheStats
+from access_guard.authz.models.decision_explanation import DecisionExplanation
+from access_guard.authz.models.entities import Role, User
+from access_guard.authz.models.enums import PolicyChange
 from access_guard.authz.models.load_policy_result import LoadPolicyResult
+from access_guard.authz.models.loader_timing import LoaderTiming
+from access_guard.authz.models.optimization_report import OptimizationReport
 from access_guard.authz.models.permissions_enforcer_params import PermissionsEnforcerParams
+from access_guard.authz.models.policy_snapshot import PolicySnapshot
+from access_guard.authz.models.slow_decision import SlowDecision
+from access_guard.authz.policy_refresher import BackgroundPolicyRefresher
+from access_guard.authz.store.shared_policy_store import SharedPolicyStore
+from access_guard.authz.watchers.change_coalescer import ChangeCoalescer
+from access_guard.authz.store.snapshot_file import (
+    PolicySnapshotFile,
+    model_fingerprint,
+    read_policy_snapshot,
+    write_policy_snapshot,
+)
 from casbin import Model
-from casbin.util import key_match2, key_match3
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_MODEL_PATH = Path(__file__).parent / "config" / "rbac_model.conf"
 
+# parsed model definitions by config path, with the mtime they were parsed at
+_model_definitions: Dict[str, Tuple[int, Model]] = {}
+_model_definitions_lock = threading.Lock()
+
+# batches of at least this many checks match each resource once against the engine's PatternSet
+# instead of walking the trie of every role, as long as the user has at most
+# BULK_MATCH_RULES_PER_CHECK rules per check: indexing them by pattern must pay off
+BULK_MATCH_MIN_CHECKS = 8
+BULK_MATCH_RULES_PER_CHECK = 10
+
+
+def resolve_model_path(rbac_model_path: Optional[str] = None) -> str:
+    return os.path.realpath(rbac_model_path or DEFAULT_MODEL_PATH)
+
+
+def new_model(rbac_model_path: Optional[str] = None) -> Model:
+    """
+    A model without policies for the config at rbac_model_path (the shipped RBAC model by default).
+
+    Each config is parsed once and its definition shared by every model built from it, across
+    loads and enforcers; it is parsed again when the file changes.
+    """
+    path = resolve_model_path(rbac_model_path)
+    mtime = os.stat(path).st_mtime_ns
+    with _model_definitions_lock:
+        parsed = _model_definitions.get(path)
+        if parsed is None or parsed[0] != mtime:
+            definition = Model()
+            definition.load_model(path)
+            parsed = _model_definitions[path] = (mtime, definition)
+    return empty_model_like(parsed[1])
+
 
 class PermissionsEnforcer:
     _instance: ClassVar[Optional["PermissionsEnforcer"]] = None
@@ -27,11 +108,24 @@ class PermissionsEnforcer:
             skip_initial_policy_load: bool = False
     ):
         self._params = params
-        self._resource_prefix = ""
         self._skip_initial_policy_load = skip_initial_policy_load
         self._policy_loaders = policy_loaders
-        self._adapter = MultiAdapter(self._policy_loaders)
+        self._metrics = (params.metrics if params else None) or NOOP_METRICS
+        self._adapter = self._build_adapter()
+        self._decision_cache = self._build_decision_cache()
+        self._user_slices = self._build_user_slice_cache()
+        self._slice_epochs = itertools.count(1)
+        self._profiler = self._build_profiler()
+        # serializes writers; readers only ever dereference self._snapshot
+        self._refresh_lock = threading.Lock()
+        self._delta_sync_broken = False
+        self._refresher: Optional[BackgroundPolicyRefresher] = None
+        self._change_coalescer: Optional[ChangeCoalescer] = None
+        self._last_load_result: Optional[LoadPolicyResult] = None
+        self._optimization_report: Optional[OptimizationReport] = None
+        self._shared_store = self._build_shared_store()
         self._initialize_enforcer()
+        self._start_configured_refresh()
 
     @classmethod
     def get_instance(
@@ -47,62 +141,993 @@ class PermissionsEnforcer:
                 skip_initial_policy_load)
         return cls._instance
 
-    def _initialize_enforcer(self):
-        model = Model()
-        model_path = (
-            Path(self._params.rbac_model_path)
-            if self._params and self._params.rbac_model_path
-            else DEFAULT_MODEL_PATH
+    def _build_adapter(self) -> MultiAdapter:
+        params = self._params or PermissionsEnforcerParams()
+        adapter = MultiAdapter(
+            # with lazy user slices, per-entity loaders are only queried per user
+            [loader for loader in self._policy_loaders if loader not in self._entity_loaders()],
+            timeout=params.loader_timeout,
+            failure_policy=params.loader_failure_policy,
+            max_workers=params.loader_max_workers,
+        )
+        for loader in self._policy_loaders:
+            if isinstance(loader, PolicyLoaderABC):
+                # the enforcer only needs the rules in its model
+                loader.retain_policies = params.retain_loaded_policies
+        if self._metrics.enabled:
+            adapter.set_metrics(self._metrics)
+            for loader in self._entity_loaders():
+                if hasattr(loader, "set_metrics"):
+                    loader.set_metrics(self._metrics)
+        return adapter
+
+    def _build_shared_store(self) -> Optional[SharedPolicyStore]:
+        directory = self._params.shared_store_dir if self._params else None
+        if not directory:
+            return None
+        store = SharedPolicyStore(directory)
+        store.try_acquire_leadership()
+        return store
+
+    def _entity_loaders(self) -> List[PolicyProvider]:
+        if not (self._params and self._params.lazy_user_slices):
+            return []
+        return [
+            loader for loader in self._policy_loaders
+            if getattr(loader, "supports_entity_load", None) and loader.supports_entity_load()
+        ]
+
+    def _build_user_slice_cache(self) -> Optional[UserSliceCache]:
+        if not (self._params and self._params.lazy_user_slices):
+            return None
+        if not self._entity_loaders():
+            raise ValueError("lazy_user_slices requires a loader supporting entity loads, such as PolicyDbLoader")
+        return UserSliceCache(self._params.user_slice_max_rules, ttl=self._params.user_slice_ttl)
+
+    def _build_decision_cache(self) -> Optional[DecisionCache]:
+        cache_size = self._params.decision_cache_size if self._params else 0
+        if not cache_size:
+            return None
+        return DecisionCache(cache_size, ttl=self._params.decision_cache_ttl)
+
+    def _build_profiler(self) -> Optional[DecisionProfiler]:
+        threshold = self._params.slow_decision_threshold if self._params else None
+        if threshold is None:
+            return None
+        return DecisionProfiler(
+            threshold,
+            sample_rate=self._params.slow_decision_sample_rate,
+            capacity=self._params.slow_decision_buffer_size,
         )
-        model.load_model(model_path)
-        self._model = model
 
+    def _initialize_enforcer(self):
+        model = self._new_model()
+        self._use_compiled_engine = self._should_use_compiled_engine(model)
+        # empty until the first load; role links are only ever built once per snapshot
+        self._snapshot = self._build_snapshot(model, "")
+
+        if self._skip_initial_policy_load:
+            return
+        if self._follows_shared_store():
+            self._attach_shared_store()
+        elif not self._warm_start():
+            self._load_policies()
+
+    def _new_model(self) -> Model:
+        return new_model(self._params.rbac_model_path if self._params else None)
+
+    def _new_casbin_enforcer(self, model: Model) -> casbin.Enforcer:
         # need filtered flag here for casbin to not load the policies automatically. We will trigger them later
         self._adapter.set_filtered(True)
-        self._enforcer = casbin.Enforcer(self._model, self._adapter)
+        enforcer = casbin.Enforcer(model, self._adapter)
 
-        # Register key_match functions for wildcard resource matching
-        self._enforcer.add_function("key_match2", key_match2)
-        self._enforcer.add_function("key_match3", key_match3)
+        # Register key_match functions for wildcard resource matching. casbin's versions rebuild the
+        # pattern's regex on every call; key_match3 patterns are compiled once per policy load
+        enforcer.add_function("key_match2", key_match2)
+        enforcer.add_function("key_match3", self._pattern_set_for(model).key_match3)
+        return enforcer
 
-        if not self._skip_initial_policy_load:
-            self._load_policies()
+    @staticmethod
+    def _pattern_set_for(model: Model) -> PatternSet:
+        """
+        The distinct p.obj patterns of the model, when its p rules have an obj field.
+        """
+        assertion = model["p"]["p"] if "p" in model.keys() and "p" in model["p"] else None
+        if assertion is None or "p_obj" not in assertion.tokens:
+            return PatternSet()
+        position = assertion.tokens.index("p_obj")
+        try:
+            return PatternSet(rule[position] for rule in assertion.policy if len(rule) > position)
+        except re.error:
+            # casbin fails on such a pattern when it meets it; leave it to compile it then
+            return PatternSet()
 
-        self._enforcer.build_role_links()
+    def _should_use_compiled_engine(self, model: Model) -> bool:
+        if self._params and not self._params.use_compiled_engine:
+            return False
+        if not CompiledPolicyEngine.supports_model(model):
+            logger.debug("Custom RBAC model detected, enforcing with casbin")
+            return False
+        return True
+
+    def _compile_engine(self, model: Model) -> Optional[CompiledPolicyEngine]:
+        return CompiledPolicyEngine.compile(model) if self._use_compiled_engine else None
 
     def _load_policies(self) -> None:
-        # self._adapter.load_policy(self._model, filter=self._params.filter)
+        """
+        Load every loader into a fresh model, build its role links and engine, then publish it.
+        Loaders run concurrently and are merged in order (see MultiAdapter). Nothing is published
+        when a loader fails under the FAIL policy, so the previous snapshot keeps serving.
+        """
+        with self._full_load():
+            model = self._new_model()
+            resource_prefix = self._snapshot.resource_prefix
 
-        for loader in self._policy_loaders:
-            result: LoadPolicyResult = loader.load_policy(self._model, filter=self._params.filter)
+            result: LoadPolicyResult = self._adapter.load_policy(model, filter=self._params.filter)
+            if self._params and self._params.retain_loaded_policies:
+                self._last_load_result = result
             # todo: right now only applying the first resource_prefix.
             #  update _resource_prefix to be list
-            if result.resource_prefix and not self._resource_prefix:
-                self._resource_prefix = result.resource_prefix
+            if result.resource_prefix and not resource_prefix:
+                resource_prefix = result.resource_prefix
 
-        self._enforcer.build_role_links()
+            self._optimize(model)
+            snapshot = self._build_snapshot(model, resource_prefix)
+            self._publish(snapshot)
+        self._persist_snapshot(snapshot)
         # self.log_loaded_policies()
 
+    @contextmanager
+    def _full_load(self):
+        """
+        Wrap a full load and publish. Until one succeeds with every loader, delta syncs fall back
+        to full loads: loaders may have moved their watermark past policies that were never
+        published, and the policies of a SKIPPED or KEPT_PREVIOUS loader only come back with one.
+        """
+        try:
+            yield
+        except Exception:
+            self._delta_sync_broken = True
+            raise
+        self._delta_sync_broken = not self._adapter.loaded_all()
+
+    def _optimize(self, model: Model) -> None:
+        """
+        Compact a fully loaded model when optimize_policies is set (see engine/policy_optimizer.py).
+        """
+        if not self._params or not self._params.optimize_policies:
+            return
+        if not CompiledPolicyEngine.supports_model(model):
+            logger.debug("Custom RBAC model detected, not optimizing policies")
+            return
+        self._optimization_report = optimize_policies(model, self._params.flatten_role_aliases)
+
+    def _delta_needs_reload(self, added: List[Tuple[str, ...]], removed: List[Tuple[str, ...]]) -> bool:
+        """
+        Whether a delta cannot be applied to optimized policies: a removed rule may be the one
+        covering rules the optimizer dropped, and flattened roles no longer exist.
+        """
+        params = self._params
+        if not params or not params.optimize_policies or not CompiledPolicyEngine.supports_model(self._snapshot.model):
+            return False
+        if removed:
+            return True
+        if not params.flatten_role_aliases:
+            return False
+        report = self._optimization_report
+        if report is None:
+            # warm started from optimized policies, the flattened roles are unknown
+            return True
+        flattened = set(report.flattened_roles)
+        return bool(flattened) and any(not flattened.isdisjoint(policy[1:]) for policy in added)
+
+    def _warm_start(self) -> bool:
+        """
+        Serve the policies of the snapshot file right away, if there is a usable one, and reload
+        them from the loaders in a background thread.
+        """
+        snapshot = self._snapshot_from_file()
+        if snapshot is None:
+            return False
+        self._publish(snapshot)
+        # loaders have no watermark yet, the next sync must be a full load
+        self._delta_sync_broken = True
+        threading.Thread(target=self._reconcile, name="policy-reconcile", daemon=True).start()
+        return True
+
+    def _reconcile(self) -> None:
+        try:
+            self.refresh_policies()
+        except Exception as e:
+            logger.warning(f"Reloading policies after warm start failed, serving the snapshot file: {e}")
+
+    def _snapshot_from_file(self) -> Optional[PolicySnapshot]:
+        path = self._params.snapshot_path if self._params else None
+        if not path and self._shared_store is not None:
+            # a new leader warm starts from what the previous one published
+            path = self._shared_store.data_path
+        if not path:
+            return None
+
+        try:
+            snapshot_file = read_policy_snapshot(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, InvalidPolicySnapshotError) as e:
+            logger.warning(f"Ignoring policy snapshot {path}: {e}")
+            return None
+
+        max_age = self._params.snapshot_max_age
+        if max_age is not None and snapshot_file.age > max_age:
+            logger.info(f"Ignoring policy snapshot {path}: older than {max_age}s")
+            return None
+        return self._build_snapshot_from_file(snapshot_file, path)
+
+    def _build_snapshot_from_file(self, snapshot_file: PolicySnapshotFile, path: str) -> Optional[PolicySnapshot]:
+        model = self._new_model()
+        if snapshot_file.model_fingerprint != model_fingerprint(model):
+            logger.info(f"Ignoring policy snapshot {path}: it was taken with another RBAC model")
+            return None
+
+        count = snapshot_file.install(model)
+        logger.info(f"Loading policy snapshot {path} ({count} rules, {snapshot_file.age:.0f}s old)")
+        return self._build_snapshot(model, snapshot_file.resource_prefix)
+
+    def _persist_snapshot(self, snapshot: PolicySnapshot) -> None:
+        """
+        Write freshly loaded policies to the snapshot file and, as leader, to the shared store.
+        """
+        paths = []
+        if self._params and self._params.snapshot_path:
+            paths.append(self._params.snapshot_path)
+        if self._shared_store is not None and self._shared_store.is_leader:
+            paths.append(self._shared_store.data_path)
+        for path in paths:
+            try:
+                write_policy_snapshot(path, snapshot.model, snapshot.resource_prefix)
+            except (OSError, InvalidPolicySnapshotError) as e:
+                logger.warning(f"Could not write policy snapshot {path}: {e}")
+
+    def _follows_shared_store(self) -> bool:
+        """
+        True when this process gets its policies from the shared store leader rather than from
+        the loaders. Takes over as leader when the previous one is gone.
+        """
+        store = self._shared_store
+        if store is None or store.is_leader:
+            return False
+        if not store.try_acquire_leadership():
+            return True
+
+        # the loaders have never run in this process
+        self._delta_sync_broken = True
+        if self._refresher is not None:
+            # switch from polling the store to the configured refresh
+            if self._params.refresh_interval:
+                self._refresher.schedule.interval = self._params.refresh_interval
+                self._refresher.schedule.jitter = self._params.refresh_jitter
+            else:
+                self.stop_background_refresh()
+        return False
+
+    def _attach_shared_store(self) -> None:
+        """
+        Wait for the leader to publish policies, taking over if it goes away meanwhile. Loads from
+        the loaders, without publishing, if nothing shows up within shared_store_attach_timeout.
+        """
+        deadline = time.monotonic() + self._params.shared_store_attach_timeout
+        while True:
+            if self._follow_shared_store():
+                return
+            if not self._follows_shared_store():
+                if not self._warm_start():
+                    self._load_policies()
+                return
+            if time.monotonic() >= deadline:
+                logger.warning(
+                    f"No policies published to {self._shared_store.directory} "
+                    f"within {self._params.shared_store_attach_timeout}s, loading them in this process"
+                )
+                self._load_policies()
+                return
+            time.sleep(min(self._params.shared_store_poll_interval, 0.1))
+
+    def _follow_shared_store(self) -> bool:
+        """
+        Publish the leader's latest policies if they changed. Returns True when they did. Loads
+        them from the loaders instead when the published file cannot be read.
+        """
+        try:
+            snapshot = self._read_shared_store()
+        except (OSError, InvalidPolicySnapshotError) as e:
+            logger.warning(
+                f"Ignoring published policies {self._shared_store.data_path}, loading them in this process: {e}"
+            )
+            self._load_policies()
+            return True
+        if snapshot is None:
+            return False
+        self._publish(snapshot)
+        return True
+
+    def _read_shared_store(self) -> Optional[PolicySnapshot]:
+        """
+        The leader's latest policies, None when they did not change or were taken with another model.
+        """
+        snapshot_file = self._shared_store.read_if_changed()
+        if snapshot_file is None:
+            return None
+        return self._build_snapshot_from_file(snapshot_file, self._shared_store.data_path)
+
+    def _build_snapshot(self, model: Model, resource_prefix: str) -> PolicySnapshot:
+        engine = self._compile_engine(model)
+        enforcer = None
+        if engine is None:
+            enforcer = self._new_casbin_enforcer(model)
+            enforcer.build_role_links()
+        return PolicySnapshot(
+            model=model,
+            enforcer=enforcer,
+            engine=engine,
+            resource_prefix=resource_prefix,
+        )
+
+    def _build_delta_snapshot(
+            self,
+            snapshot: PolicySnapshot,
+            added: List[Tuple[str, ...]],
+            removed: List[Tuple[str, ...]]
+    ) -> PolicySnapshot:
+        model = self._new_model()
+        apply_policy_delta(snapshot.model, model, added, removed)
+
+        engine = snapshot.engine.apply_delta(added, removed) if snapshot.engine is not None else None
+        if engine is None:
+            # custom model: no fetching or parsing, but role links are rebuilt from the new model
+            return self._build_snapshot(model, snapshot.resource_prefix)
+        return PolicySnapshot(model=model, engine=engine, resource_prefix=snapshot.resource_prefix)
+
+    def _publish(self, snapshot: PolicySnapshot) -> None:
+        generation = self._snapshot.generation + 1
+        snapshot = replace(snapshot, generation=generation)
+        if self._decision_cache is not None:
+            self._decision_cache.set_generation(generation)
+        if self._user_slices is not None:
+            self._user_slices.set_generation(generation)
+        self._snapshot = snapshot
+        if self._metrics.enabled:
+            self._metrics.set(POLICIES, count_policies(snapshot.model))
+
+    def _snapshot_for(self, subject: str) -> PolicySnapshot:
+        """
+        The snapshot to check subject against: the current one, or with lazy user slices the
+        subject's slice of it.
+        """
+        snapshot = self._snapshot
+        if self._user_slices is None:
+            return snapshot
+        return self._user_slices.get_or_build(subject, snapshot, self._build_user_slice)
+
+    def _build_user_slice(self, subject: str, base: PolicySnapshot) -> PolicySnapshot:
+        """
+        Load the rules of subject and of its role closure from the entity loaders and build a
+        snapshot answering for subject from them and the rules of the other loaders (base).
+
+        With the compiled engine the slice only holds the loaded rules, and its engine shares
+        the base engine's tries (see CompiledPolicyEngine.slice_for). casbin enforces a single
+        model, so otherwise the slice's model holds the base rules too.
+        """
+        model = empty_model_like(base.model)
+        if base.engine is None:
+            merge_policies(base.model, model)
+        loaders = self._entity_loaders()
+        self._load_entity(loaders, model, User(id=subject))
+
+        if "g" in model.keys() and "g" in model["g"].keys():
+            grouping = model["g"]["g"].policy
+            base_roles = base.engine.get_direct_roles if base.engine is not None else lambda name: ()
+            seen, frontier = {subject}, {subject}
+            for _ in range(MAX_HIERARCHY_LEVEL):
+                roles = {rule[1] for rule in grouping if rule[0] in frontier and rule[1] not in seen}
+                roles.update(role for name in frontier for role in base_roles(name) if role not in seen)
+                if not roles:
+                    break
+                seen |= roles
+                for role in sorted(roles):
+                    self._load_entity(loaders, model, Role(role_name=role, id=role))
+                frontier = roles
+
+        logger.debug(f"Loaded policy slice of {subject}: {count_policies(model)} rules")
+        engine = base.engine.slice_for(subject, model) if base.engine is not None else None
+        if engine is not None:
+            snapshot = PolicySnapshot(model=model, engine=engine, resource_prefix=base.resource_prefix)
+        else:
+            if base.engine is not None:
+                # malformed slice rules: enforce the slice and the base rules with casbin
+                merge_policies(base.model, model)
+            snapshot = self._build_snapshot(model, base.resource_prefix)
+        return replace(
+            snapshot,
+            generation=base.generation,
+            # decisions cached against a previous load of this slice must not be served
+            slice_epoch=next(self._slice_epochs),
+        )
+
+    def _load_entity(self, loaders: List[PolicyProvider], model: Model, entity: Union[User, Role]) -> None:
+        for loader in loaders:
+            loader.load_policy(model, entity=entity, filter=self._params.filter)
+
     def has_permission(self, user: User, resource: str, actions: Union[str, List[str]]) -> bool:
+        metrics = self._metrics
+        if not metrics.enabled:
+            return self._has_permission(user, resource, actions)
+
+        started = time.perf_counter()
+        allowed = self._has_permission(user, resource, actions)
+        metrics.observe(DECISION_SECONDS, time.perf_counter() - started)
+        metrics.increment(DECISIONS_TOTAL, result="allow" if allowed else "deny")
+        return allowed
+
+    def _has_permission(self, user: User, resource: str, actions: Union[str, List[str]]) -> bool:
         if isinstance(actions, str):
             actions = [actions]
 
-        qualified_resource = f"{self._resource_prefix}{resource}" if self._resource_prefix else resource
+        subject = str(user.id)
+        snapshot = self._snapshot_for(subject)
+        qualified_resource = self._qualify(snapshot, resource)
+
+        return any(self._enforce(snapshot, subject, qualified_resource, action) for action in actions)
+
+    def has_permissions_batch(
+            self,
+            user: User,
+            checks: Iterable[Tuple[str, Union[str, List[str]]]]
+    ) -> List[bool]:
+        """
+        Check many (resource, actions) pairs for one user.
+
+        The user's effective roles and the candidate rules are resolved once for the whole batch.
+        Each item follows has_permission semantics: it is allowed when any of its actions is.
+        """
+        metrics = self._metrics
+        if not metrics.enabled:
+            return self._has_permissions_batch(user, checks)
+
+        started = time.perf_counter()
+        results = self._has_permissions_batch(user, checks)
+        self._record_batch(time.perf_counter() - started, results.count(True), len(results))
+        return results
+
+    def _has_permissions_batch(
+            self,
+            user: User,
+            checks: Iterable[Tuple[str, Union[str, List[str]]]]
+    ) -> List[bool]:
+        checks = list(checks)
+        subject = str(user.id)
+        snapshot = self._snapshot_for(subject)
+        evaluate = self._batch_evaluator(snapshot, subject, len(checks))
+        results = []
+        for resource, actions in checks:
+            if isinstance(actions, str):
+                actions = [actions]
+            qualified_resource = self._qualify(snapshot, resource)
+            results.append(any(evaluate(qualified_resource, action) for action in actions))
+        return results
+
+    def filter_authorized(
+            self,
+            user: User,
+            resources: Iterable[str],
+            actions: Union[str, List[str]]
+    ) -> List[str]:
+        """
+        Return the resources, in input order, on which the user may perform any of the actions.
+        """
+        if isinstance(actions, str):
+            actions = [actions]
+
+        metrics = self._metrics
+        if metrics.enabled:
+            started = time.perf_counter()
+        resources = list(resources)
+
+        subject = str(user.id)
+        snapshot = self._snapshot_for(subject)
+        evaluate = self._batch_evaluator(snapshot, subject, len(resources))
+        authorized = [
+            resource for resource in resources
+            if any(evaluate(self._qualify(snapshot, resource), action) for action in actions)
+        ]
+
+        if metrics.enabled:
+            self._record_batch(time.perf_counter() - started, len(authorized), len(resources))
+        return authorized
 
-        return any(self._enforcer.enforce(str(user.id), qualified_resource, action) for action in actions)
+    def _record_batch(self, seconds: float, allowed: int, total: int) -> None:
+        self._metrics.observe(BATCH_DECISION_SECONDS, seconds)
+        if allowed:
+            self._metrics.increment(DECISIONS_TOTAL, allowed, result="allow")
+        if total > allowed:
+            self._metrics.increment(DECISIONS_TOTAL, total - allowed, result="deny")
+
+    @staticmethod
+    def _qualify(snapshot: PolicySnapshot, resource: str) -> str:
+        prefix = snapshot.resource_prefix
+        return f"{prefix}{resource}" if prefix else resource
+
+    def _enforce(self, snapshot: PolicySnapshot, subject: str, resource: str, action: str) -> bool:
+        profiler = self._profiler
+        if profiler is None or not profiler.sampled():
+            return self._enforce_cached(snapshot, subject, resource, action)
+
+        started = time.perf_counter()
+        allowed = self._enforce_cached(snapshot, subject, resource, action)
+        seconds = time.perf_counter() - started
+        if profiler.is_slow(seconds):
+            self._record_slow_decision(snapshot, subject, resource, action, allowed, seconds)
+        return allowed
+
+    def _enforce_cached(self, snapshot: PolicySnapshot, subject: str, resource: str, action: str) -> bool:
+        cache = self._decision_cache
+        if cache is None:
+            return self._evaluate(snapshot, subject, resource, action)
+
+        decision = cache.get(subject, resource, action, snapshot.slice_epoch)
+        if decision is None:
+            decision = self._evaluate(snapshot, subject, resource, action)
+            cache.put(subject, resource, action, decision, snapshot.generation, snapshot.slice_epoch)
+        return decision
+
+    @staticmethod
+    def _evaluate(snapshot: PolicySnapshot, subject: str, resource: str, action: str) -> bool:
+        engine = snapshot.engine
+        if engine is not None:
+            return engine.enforce(subject, resource, action)
+        return snapshot.enforcer.enforce(subject, resource, action)
+
+    def _batch_evaluator(self, snapshot: PolicySnapshot, subject: str, size: int):
+        """
+        Build a (resource, action) -> bool callable bound to one subject and one policy snapshot,
+        for a batch of about size checks.
+        """
+        generation = snapshot.generation
+        slice_epoch = snapshot.slice_epoch
+        engine = snapshot.engine
+        if (
+                engine is not None
+                and size >= BULK_MATCH_MIN_CHECKS
+                and engine.count_subject_rules(subject) <= size * BULK_MATCH_RULES_PER_CHECK
+        ):
+            match = engine.pattern_set.match
+            effects = engine.get_pattern_effects(subject)
+            decide_matches = engine.decide_matches
+            # pattern ids by resource, so the actions of an item share one match
+            matches: Dict[str, List[int]] = {}
+
+            def evaluate(resource: str, action: str) -> bool:
+                pattern_ids = matches.get(resource)
+                if pattern_ids is None:
+                    pattern_ids = matches[resource] = match(resource)
+                return decide_matches(effects, pattern_ids, action)
+        elif engine is not None:
+            candidates = engine.get_candidate_tries(subject)
+
+            def evaluate(resource: str, action: str) -> bool:
+                return engine.decide(candidates, resource, action)
+        else:
+            enforcer = snapshot.enforcer
+
+            def evaluate(resource: str, action: str) -> bool:
+                return enforcer.enforce(subject, resource, action)
+
+        cache = self._decision_cache
+        if cache is None:
+            decide = evaluate
+        else:
+            def decide(resource: str, action: str) -> bool:
+                decision = cache.get(subject, resource, action, slice_epoch)
+                if decision is None:
+                    decision = evaluate(resource, action)
+                    cache.put(subject, resource, action, decision, generation, slice_epoch)
+                return decision
+
+        profiler = self._profiler
+        if profiler is None:
+            return decide
+
+        def decide_profiled(resource: str, action: str) -> bool:
+            if not profiler.sampled():
+                return decide(resource, action)
+            started = time.perf_counter()
+            allowed = decide(resource, action)
+            seconds = time.perf_counter() - started
+            if profiler.is_slow(seconds):
+                self._record_slow_decision(snapshot, subject, resource, action, allowed, seconds)
+            return allowed
+
+        return decide_profiled
+
+    def _record_slow_decision(
+            self,
+            snapshot: PolicySnapshot,
+            subject: str,
+            resource: str,
+            action: str,
+            allowed: bool,
+            seconds: float
+    ) -> None:
+        explanation = self._explain(snapshot, subject, resource, action)
+        self._profiler.record(SlowDecision(
+            subject=subject,
+            resource=resource,
+            action=action,
+            allowed=allowed,
+            seconds=seconds,
+            generation=snapshot.generation,
+            recorded_at=time.time(),
+            matched_rule=explanation.matched_rule,
+            candidates_scanned=explanation.candidates_scanned,
+            role_path=explanation.role_path,
+        ))
+        self._metrics.increment(SLOW_DECISIONS_TOTAL)
+        logger.debug(
+            f"Slow decision ({seconds * 1000:.2f}ms): {subject} {action} {resource} -> "
+            f"{'allow' if allowed else 'deny'} by {explanation.matched_rule}, "
+            f"{explanation.candidates_scanned} candidate rules, role path {' > '.join(explanation.role_path)}"
+        )
+
+    @staticmethod
+    def _explain(snapshot: PolicySnapshot, subject: str, resource: str, action: str) -> DecisionExplanation:
+        if snapshot.engine is not None:
+            return snapshot.engine.explain(subject, resource, action)
+
+        enforcer = snapshot.enforcer
+        if CompiledPolicyEngine.supports_model(snapshot.model):
+            matched = find_deciding_rule(enforcer.get_implicit_permissions_for_user(subject), resource, action)
+        else:
+            # casbin only reports the rule for some effects, e.g. not for allow-and-no-deny
+            _, explain_rule = enforcer.enforce_ex(subject, resource, action)
+            matched = explain_rule or None
+        path: Tuple[str, ...] = ()
+        if matched and "g" in snapshot.model.keys():
+            path = role_path(enforcer.get_role_manager().get_roles, subject, matched[0])
+        return DecisionExplanation(
+            # casbin evaluates the matcher against every p rule
+            matched_rule=tuple(matched) if matched else None,
+            candidates_scanned=len(snapshot.model["p"]["p"].policy),
+            role_path=path,
+        )
+
+    def get_effective_roles(self, user: User) -> List[str]:
+        """
+        Every role the user inherits, directly or through other roles, nearest first.
+        """
+        subject = str(user.id)
+        return self._effective_roles(self._snapshot_for(subject), subject)
+
+    @staticmethod
+    def _effective_roles(snapshot: PolicySnapshot, subject: str) -> List[str]:
+        if snapshot.engine is not None:
+            return list(snapshot.engine.get_subject_roles(subject)[1:])
+        return snapshot.enforcer.get_implicit_roles_for_user(subject)
+
+    def get_effective_permissions(self, user: User) -> List[Tuple[str, ...]]:
+        """
+        The p rules (subject, resource, action, effect) granted or denied to the user directly
+        or through its roles. Deny rules are included: a resource matched by one is denied.
+        """
+        subject = str(user.id)
+        return [tuple(rule) for rule in self._effective_rules(self._snapshot_for(subject), subject)]
+
+    def get_resource_filter(self, user: User, action: str) -> ResourceFilter:
+        """
+        The resources the user may perform action on, as allow/deny patterns that can be pushed
+        into a listing query instead of checking every row:
+
+            resource_filter = enforcer.get_resource_filter(user, "read")
+            select(Document).where(resource_filter.to_sqlalchemy(Document.path))
+
+        Patterns apply to resources as passed to has_permission, without the resource prefix.
+        Only available for the shipped RBAC model, whose matcher is known.
+        """
+        subject = str(user.id)
+        snapshot = self._snapshot_for(subject)
+        if snapshot.engine is None and not CompiledPolicyEngine.supports_model(snapshot.model):
+            raise ValueError("Resource filters require the shipped RBAC model (config/rbac_model.conf)")
+        return build_resource_filter(self._effective_rules(snapshot, subject), action, snapshot.resource_prefix)
+
+    def export_permission_digest(self, user: User, key: bytes, ttl: Optional[float] = 300.0) -> str:
+        """
+        A signed, compact digest of the user's effective roles and rules that other services can
+        evaluate with decode_permission_digest instead of loading the policies:
+
+            token = enforcer.export_permission_digest(user, key)
+            digest = decode_permission_digest(token, key)
+            digest.has_permission("/apps/1/documents/2", "read")
+
+        Decisions are those of the current policies; the digest expires after ttl seconds (never
+        when None). Only available for the shipped RBAC model, whose matcher is known.
+        """
+        subject = str(user.id)
+        snapshot = self._snapshot_for(subject)
+        if snapshot.engine is None and not CompiledPolicyEngine.supports_model(snapshot.model):
+            raise ValueError("Permission digests require the shipped RBAC model (config/rbac_model.conf)")
+        return encode_permission_digest(
+            subject,
+            self._effective_roles(snapshot, subject),
+            (rule[1:] for rule in self._effective_rules(snapshot, subject)),
+            key,
+            resource_prefix=snapshot.resource_prefix,
+            generation=snapshot.generation,
+            ttl=ttl,
+        )
+
+    @staticmethod
+    def _effective_rules(snapshot: PolicySnapshot, subject: str) -> List[Sequence[str]]:
+        if snapshot.engine is not None:
+            return snapshot.engine.get_subject_rules(subject)
+        return snapshot.enforcer.get_implicit_permissions_for_user(subject)
 
     def require_permission(self, user: User, resource: str, actions: Union[str, List[str]]) -> None:
         if not self.has_permission(user, resource, actions):
             actions_str = ", ".join(actions if isinstance(actions, list) else [actions])
             raise PermissionDeniedError(str(user.id), resource, actions_str)
 
+    def require_permissions_batch(
+            self,
+            user: User,
+            checks: Iterable[Tuple[str, Union[str, List[str]]]]
+    ) -> None:
+        """
+        Raise BatchPermissionDeniedError listing every denied item, if any.
+        """
+        checks = list(checks)
+        results = self.has_permissions_batch(user, checks)
+        denied = [
+            (resource, ", ".join(actions if isinstance(actions, list) else [actions]))
+            for (resource, actions), allowed in zip(checks, results)
+            if not allowed
+        ]
+        if denied:
+            raise BatchPermissionDeniedError(str(user.id), denied)
+
     def refresh_policies(self):
-        self._enforcer.clear_policy()
-        self._load_policies()
-        self._enforcer.build_role_links()
+        """
+        Reload all policies off to the side and swap them in atomically.
+        Checks running meanwhile keep using the previous policies; if loading fails they still do.
+        """
+        with self._refresh_lock, self._measure_refresh("full"):
+            if self._follows_shared_store():
+                self._follow_shared_store()
+                return
+            self._load_policies()
+
+    def sync_policies(self) -> bool:
+        """
+        Apply only the rules added and removed since the last load.
+
+        Loaders that support deltas (see PolicyLoaderABC.load_policy_delta) are asked for their
+        changes, which are applied on a copy of the current snapshot; the compiled engine only
+        rebuilds the subjects they touch. Loaders without delta support are considered unchanged
+        and are only reloaded by refresh_policies. Falls back to a full refresh when no loader
+        supports deltas or one of them requests it.
+
+        Returns:
+            bool: True when new policies were published.
+        """
+        with self._refresh_lock, self._measure_refresh("delta"):
+            if self._follows_shared_store():
+                return self._follow_shared_store()
+
+            delta_loaders = [loader for loader in self._adapter.loaders if loader.supports_delta()]
+            if not delta_loaders or self._delta_sync_broken:
+                self._load_policies()
+                return True
+
+            added, removed = [], []
+            try:
+                for loader in delta_loaders:
+                    delta = loader.load_policy_delta(filter=self._params.filter)
+                    if delta.full_reload:
+                        self._load_policies()
+                        return True
+                    added.extend(delta.added)
+                    removed.extend(delta.removed)
+                    self._adapter.apply_loader_delta(loader, delta.added, delta.removed)
+
+                if not added and not removed:
+                    return False
+                if self._delta_needs_reload(added, removed):
+                    self._load_policies()
+                    return True
+                snapshot = self._build_delta_snapshot(self._snapshot, added, removed)
+                self._publish(snapshot)
+                self._persist_snapshot(snapshot)
+                return True
+            except Exception:
+                # loaders may have advanced their watermark past changes that were never applied
+                self._delta_sync_broken = True
+                raise
+
+    @contextmanager
+    def _measure_refresh(self, kind: str):
+        """
+        Time a refresh (kind "full" or "delta") and count its failures.
+        """
+        metrics = self._metrics
+        if not metrics.enabled:
+            yield
+            return
+
+        started = time.perf_counter()
+        try:
+            with metrics.span("access_guard.refresh", kind=kind):
+                yield
+        except Exception:
+            metrics.increment(REFRESH_FAILURES_TOTAL, kind=kind)
+            raise
+        finally:
+            metrics.observe(REFRESH_SECONDS, time.perf_counter() - started, kind=kind)
+
+    def _start_configured_refresh(self) -> None:
+        self._configure_refresh()
+
+    def _configure_refresh(self) -> None:
+        if self._shared_store is not None and not self._shared_store.is_leader:
+            # followers poll the store for the leader's generations
+            self.start_background_refresh(interval=self._params.shared_store_poll_interval, jitter=0)
+        elif self._params and self._params.refresh_interval:
+            self.start_background_refresh()
+        self._start_watching()
+
+    def start_background_refresh(
+            self,
+            interval: Optional[float] = None,
+            jitter: Optional[float] = None,
+            failure_backoff: Optional[float] = None,
+            max_backoff: Optional[float] = None
+    ) -> BackgroundPolicyRefresher:
+        """
+        Start a daemon thread calling sync_policies periodically. Arguments default to the
+        refresh_* params. Failed refreshes are retried with exponential backoff while the last
+        good snapshot keeps serving.
+        """
+        if self._refresher is not None and self._refresher.is_running():
+            return self._refresher
+
+        params = self._params or PermissionsEnforcerParams()
+        interval = interval or params.refresh_interval
+        if not interval:
+            raise ValueError("A refresh interval is required to start background refresh")
+
+        self._refresher = self._new_refresher(
+            interval=interval,
+            jitter=params.refresh_jitter if jitter is None else jitter,
+            failure_backoff=params.refresh_failure_backoff if failure_backoff is None else failure_backoff,
+            max_backoff=params.refresh_max_backoff if max_backoff is None else max_backoff,
+        )
+        self._refresher.start()
+        return self._refresher
+
+    def _new_refresher(self, **schedule) -> BackgroundPolicyRefresher:
+        return BackgroundPolicyRefresher(self.sync_policies, **schedule)
+
+    def stop_background_refresh(self, timeout: Optional[float] = None) -> None:
+        if self._refresher is not None:
+            self._refresher.stop(timeout=timeout)
+            self._refresher = None
+
+    def _start_watching(self) -> None:
+        watcher = self._params.watcher if self._params else None
+        if watcher is None or self._change_coalescer is not None:
+            return
+        self._change_coalescer = ChangeCoalescer(
+            self._apply_policy_change,
+            debounce=self._params.watcher_debounce,
+            max_delay=self._params.watcher_max_delay,
+        )
+        self._change_coalescer.start()
+        watcher.subscribe(self._on_policy_change)
+
+    def _stop_watching(self) -> None:
+        if self._change_coalescer is not None:
+            self._params.watcher.unsubscribe(self._on_policy_change)
+            self._change_coalescer.stop()
+            self._change_coalescer = None
+
+    def _on_policy_change(self, change: PolicyChange) -> None:
+        self._metrics.increment(POLICY_CHANGES_TOTAL, change=change.value)
+        coalescer = self._change_coalescer
+        if coalescer is not None:
+            coalescer.submit(change)
+
+    def _apply_policy_change(self, change: PolicyChange) -> None:
+        if change is PolicyChange.FULL:
+            self.refresh_policies()
+        else:
+            self.sync_policies()
+
+    def notify_policy_change(self, change: PolicyChange = PolicyChange.DELTA) -> None:
+        """
+        Tell every enforcer subscribed to the watcher, this one included, that the policies
+        changed. Call it after writing to the loaders' source; FULL asks for a full reload.
+        """
+        if self._params is None or self._params.watcher is None:
+            raise ValueError("A watcher is required to notify policy changes")
+        self._params.watcher.notify(change)
+
+    def close(self) -> None:
+        """
+        Stop the background refresh and the watcher subscription and give up the shared store
+        leadership. Checks keep working on the current policies.
+        """
+        self.stop_background_refresh()
+        self._stop_watching()
+        if self._shared_store is not None:
+            self._shared_store.release_leadership()
+
+    @property
+    def policy_generation(self) -> int:
+        return self._snapshot.generation
+
+    @property
+    def policy_count(self) -> int:
+        return count_policies(self._snapshot.model)
+
+    def get_last_load_result(self) -> Optional[LoadPolicyResult]:
+        """
+        The merged result of the last full load, None unless retain_loaded_policies is set.
+        """
+        return self._last_load_result
+
+    def get_optimization_report(self) -> Optional[OptimizationReport]:
+        """
+        What the optimizer removed from the last full load, None unless optimize_policies is set.
+        """
+        return self._optimization_report
+
+    def get_loader_timings(self) -> List[LoaderTiming]:
+        """
+        Per-loader duration and outcome of the last full load, in loader order.
+        """
+        return list(self._adapter.last_timings)
+
+    def get_decision_cache_stats(self) -> Optional[CacheStats]:
+        """
+        Hit/miss statistics of the decision cache, or None when the cache is disabled.
+        """
+        if self._decision_cache is None:
+            return None
+        return self._decision_cache.stats()
+
+    def get_user_slice_stats(self) -> Optional[CacheStats]:
+        """
+        Statistics of the lazy user slices (size is in rules), or None when they are disabled.
+        """
+        if self._user_slices is None:
+            return None
+        return self._user_slices.stats()
+
+    def get_slow_decisions(self, limit: Optional[int] = None) -> List[SlowDecision]:
+        """
+        The slowest sampled checks, newest first, empty unless slow_decision_threshold is set.
+        """
+        if self._profiler is None:
+            return []
+        return self._profiler.slow_decisions(limit)
+
+    def clear_slow_decisions(self) -> None:
+        if self._profiler is not None:
+            self._profiler.clear()
+
+    def clear_decision_cache(self) -> None:
+        if self._decision_cache is not None:
+            self._decision_cache.clear()
 
     def log_loaded_policies(self):
-        for sec in self._model.model:
-            for ptype in self._model.model[sec]:
-                for rule in self._model.model[sec][ptype].policy:
+        model = self._snapshot.model
+        for sec in model.model:
+            for ptype in model.model[sec]:
+                for rule in model.model[sec][ptype].policy:
                     logger.debug(f"Loaded policy rule: {ptype}, {', '.join(rule)}")
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshSchedule:
+    """
+    Computes the delay before the next refresh attempt.
+
+    Successful refreshes are spaced by the interval, randomized by +/- jitter (a fraction of
+    the interval) so that workers started together do not refresh in lockstep. After a failure
+    the delay starts at failure_backoff and doubles per consecutive failure up to max_backoff.
+    """
+
+    def __init__(
+            self,
+            interval: float,
+            jitter: float = 0.1,
+            failure_backoff: float = 5.0,
+            max_backoff: float = 300.0,
+            rand: Callable[[], float] = random.random
+    ):
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        if not 0 <= jitter < 1:
+            raise ValueError("jitter must be a fraction between 0 and 1")
+
+        self.interval = interval
+        self.jitter = jitter
+        self.failure_backoff = failure_backoff
+        self.max_backoff = max_backoff
+        self._rand = rand
+        self.consecutive_failures = 0
+        self.last_success_at: Optional[float] = None
+        self.last_failure_at: Optional[float] = None
+        self.last_error: Optional[BaseException] = None
+
+    def next_delay(self) -> float:
+        if self.consecutive_failures:
+            base = min(self.failure_backoff * 2 ** (self.consecutive_failures - 1), self.max_backoff)
+        else:
+            base = self.interval
+        return base * (1 + self.jitter * (2 * self._rand() - 1))
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self.last_success_at = time.time()
+        self.last_error = None
+
+    def record_failure(self, error: BaseException) -> None:
+        self.consecutive_failures += 1
+        self.last_failure_at = time.time()
+        self.last_error = error
+
+
+class BackgroundPolicyRefresher:
+    """
+    Daemon thread that periodically calls a refresh function following a RefreshSchedule.
+    """
+
+    def __init__(self, refresh: Callable[[], None], interval: float, jitter: float = 0.1,
+                 failure_backoff: float = 5.0, max_backoff: float = 300.0):
+        self._refresh = refresh
+        self.schedule = RefreshSchedule(interval, jitter, failure_backoff, max_backoff)
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self.is_running():
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="access-guard-policy-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None:
+            # the refresh function itself may stop the refresher; the loop then exits on return
+            if self._thread is not threading.current_thread():
+                self._thread.join(timeout)
+            self._thread = None
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def trigger(self) -> None:
+        """
+        Refresh as soon as possible instead of waiting for the next scheduled run.
+        """
+        self._wakeup.set()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.schedule.next_delay())
+            self._wakeup.clear()
+            if self._stopping:
+                return
+            try:
+                self._refresh()
+                self.schedule.record_success()
+            except Exception as e:
+                self.schedule.record_failure(e)
+                logger.warning(
+                    f"Policy refresh failed ({self.schedule.consecutive_failures} in a row), "
+                    f"keeping the last loaded policies: {e}"
+                )
+            if self._stopping:
+                return
+
+
+class AsyncBackgroundPolicyRefresher:
+    """
+    Event loop task that periodically awaits a refresh coroutine following a RefreshSchedule.
+    """
+
+    def __init__(self, refresh: Callable[[], Awaitable[None]], interval: float, jitter: float = 0.1,
+                 failure_backoff: float = 5.0, max_backoff: float = 300.0):
+        self._refresh = refresh
+        self.schedule = RefreshSchedule(interval, jitter, failure_backoff, max_backoff)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def start(self) -> None:
+        if self.is_running():
+            return
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="access-guard-policy-refresher")
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        if self._task is not None:
+            # cancelling from inside the refresh would abort it; let the loop exit on return instead
+            self._stopping = True
+            if self._task is not _current_task():
+                self._task.cancel()
+            self._task = None
+
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def trigger(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.schedule.next_delay())
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self._refresh()
+                self.schedule.record_success()
+            except Exception as e:
+                self.schedule.record_failure(e)
+                logger.warning(
+                    f"Policy refresh failed ({self.schedule.consecutive_failures} in a row), "
+                    f"keeping the last loaded policies: {e}"
+                )
+            if self._stopping:
+                return
+
+
+def _current_task() -> Optional[asyncio.Task]:
+    try:
+        return asyncio.current_task()
+    except RuntimeError:  # no running event loop
+        return None
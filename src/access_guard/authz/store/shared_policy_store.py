@@ -0,0 +1,95 @@
+import logging
+import mmap
+import os
+from typing import Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+from casbin import Model
+
+from access_guard.authz.store.snapshot_file import PolicySnapshotFile, decode_policy_snapshot, write_policy_snapshot
+
+logger = logging.getLogger(__name__)
+
+LOCK_FILE_NAME = "leader.lock"
+DATA_FILE_NAME = "policies.snap"
+
+
+class SharedPolicyStore:
+    """
+    Policy snapshot shared by the worker processes of one host through a local directory.
+
+    The process holding the exclusive flock on the lock file is the leader: it loads policies
+    from the loaders and publishes every generation as a snapshot file (see snapshot_file.py),
+    atomically replaced. The other processes are followers: they never call the loaders and
+    attach to the latest published file read-only through mmap. The OS releases the lock when
+    the leader exits, so a follower can take over.
+
+    Stores must be created after the workers are forked: a flock held by an open file is
+    inherited by every child of the process that opened it.
+    """
+
+    def __init__(self, directory: str):
+        if fcntl is None:
+            raise RuntimeError("SharedPolicyStore requires fcntl (POSIX)")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.data_path = os.path.join(directory, DATA_FILE_NAME)
+        self._lock_path = os.path.join(directory, LOCK_FILE_NAME)
+        self._lock_fd: Optional[int] = None
+        self._is_leader = False
+        self._attached: Optional[Tuple[int, int, int]] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._is_leader
+
+    def try_acquire_leadership(self) -> bool:
+        """
+        Become the leader if no other process is. Never blocks.
+        """
+        if self._is_leader:
+            return True
+        if self._lock_fd is None:
+            self._lock_fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        self._is_leader = True
+        logger.info(f"Process {os.getpid()} is the policy store leader for {self.directory}")
+        return True
+
+    def release_leadership(self) -> None:
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+        self._is_leader = False
+
+    def publish(self, model: Model, resource_prefix: str = "") -> None:
+        if not self._is_leader:
+            raise RuntimeError("Only the policy store leader can publish policies")
+        write_policy_snapshot(self.data_path, model, resource_prefix)
+
+    def read_if_changed(self) -> Optional[PolicySnapshotFile]:
+        """
+        Decode the published snapshot if it changed since the last call, else return None
+        (also when nothing has been published yet). Raises InvalidPolicySnapshotError when the
+        file cannot be decoded; it is not read again until the leader replaces it.
+        """
+        try:
+            file = open(self.data_path, "rb")
+        except FileNotFoundError:
+            return None
+
+        with file:
+            stat = os.fstat(file.fileno())
+            identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if identity == self._attached or stat.st_size == 0:
+                return None
+            self._attached = identity
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return decode_policy_snapshot(mapped)
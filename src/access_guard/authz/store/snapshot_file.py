@@ -0,0 +1,211 @@
+"""
+Versioned binary encoding of a loaded policy set, used to warm start enforcers.
+
+Layout (little endian):
+
+    header      magic "AGPS", format version (H), flags (H), model fingerprint (16s),
+                created_at (d), resource prefix string id (I), string count (I),
+                ptype section count (I), crc32 of everything after the header (I)
+    strings     string count + 1 end offsets (I), then the UTF-8 bytes of all strings
+    sections    per ptype: ptype string id (I), arity (I), rule count (I),
+                then rule count * arity string ids (I)
+
+Every string is stored once, rules only hold ids, so the file is compact and can be decoded
+straight from an mmap without reading it into memory first.
+"""
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from casbin import Model
+
+from access_guard.authz.exceptions import InvalidPolicySnapshotError
+
+SNAPSHOT_MAGIC = b"AGPS"
+SNAPSHOT_FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<4sHH16sdIIII")
+_SECTION = struct.Struct("<III")
+_POLICY_SECTIONS = ("p", "g")
+
+
+@dataclass(frozen=True)
+class PolicySnapshotFile:
+    model_fingerprint: bytes
+    created_at: float
+    resource_prefix: str = ""
+    # ptype -> rules, in load order
+    policies: Dict[str, List[List[str]]] = field(default_factory=dict)
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.created_at
+
+    def install(self, model: Model) -> int:
+        """
+        Set the policies of model to the snapshot's and return how many were installed.
+        Ptypes the model does not define are skipped.
+        """
+        count = 0
+        for ptype, rules in self.policies.items():
+            sec = ptype[:1]
+            if sec in model.keys() and ptype in model[sec].keys():
+                model[sec][ptype].policy = rules
+                count += len(rules)
+        return count
+
+
+def model_fingerprint(model: Model) -> bytes:
+    """
+    Digest of the model definition; a snapshot is only valid for the model it was taken with.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for sec in sorted(model.keys()):
+        for key in sorted(model[sec].keys()):
+            digest.update(f"{sec}.{key}={model[sec][key].value}\n".encode())
+    return digest.digest()
+
+
+def encode_policy_snapshot(model: Model, resource_prefix: str = "", created_at: Optional[float] = None) -> bytes:
+    strings: Dict[str, int] = {}
+
+    def string_id(value: str) -> int:
+        index = strings.get(value)
+        if index is None:
+            index = strings[value] = len(strings)
+        return index
+
+    prefix_id = string_id(resource_prefix or "")
+    sections = []
+    for sec in _POLICY_SECTIONS:
+        if sec not in model.keys():
+            continue
+        for ptype, assertion in model[sec].items():
+            rules = assertion.policy
+            if not rules:
+                continue
+            arity = len(rules[0])
+            if any(len(rule) != arity for rule in rules):
+                raise InvalidPolicySnapshotError(f"Rules of '{ptype}' have different sizes")
+            ids = [string_id(value) for rule in rules for value in rule]
+            sections.append(_SECTION.pack(string_id(ptype), arity, len(rules)))
+            sections.append(struct.pack(f"<{len(ids)}I", *ids))
+
+    encoded = [value.encode("utf-8") for value in strings]
+    offsets, end = [], 0
+    for value in encoded:
+        end += len(value)
+        offsets.append(end)
+    body = b"".join([
+        struct.pack(f"<{len(offsets)}I", *offsets),
+        *encoded,
+        *sections,
+    ])
+    header = _HEADER.pack(
+        SNAPSHOT_MAGIC,
+        SNAPSHOT_FORMAT_VERSION,
+        0,
+        model_fingerprint(model),
+        time.time() if created_at is None else created_at,
+        prefix_id,
+        len(strings),
+        len(sections) // 2,
+        zlib.crc32(body),
+    )
+    return header + body
+
+
+def decode_policy_snapshot(buffer) -> PolicySnapshotFile:
+    """
+    Decode a snapshot from any buffer (bytes, mmap, memoryview). Raises InvalidPolicySnapshotError
+    when the buffer is truncated, corrupt or written by another format version.
+    """
+    with memoryview(buffer) as view:
+        # views must be released before an mmap buffer can be closed
+        return _decode(view)
+
+
+def _decode(view: memoryview) -> PolicySnapshotFile:
+    if len(view) < _HEADER.size:
+        raise InvalidPolicySnapshotError("Snapshot is truncated")
+    magic, version, _, fingerprint, created_at, prefix_id, string_count, section_count, crc = \
+        _HEADER.unpack_from(view)
+    if magic != SNAPSHOT_MAGIC:
+        raise InvalidPolicySnapshotError("Not a policy snapshot")
+    if version != SNAPSHOT_FORMAT_VERSION:
+        raise InvalidPolicySnapshotError(f"Unsupported snapshot format version {version}")
+    with view[_HEADER.size:] as body:
+        if zlib.crc32(body) != crc:
+            raise InvalidPolicySnapshotError("Snapshot checksum mismatch")
+        return _decode_body(body, fingerprint, created_at, prefix_id, string_count, section_count)
+
+
+def _decode_body(body: memoryview, fingerprint: bytes, created_at: float, prefix_id: int,
+                 string_count: int, section_count: int) -> PolicySnapshotFile:
+    try:
+        offsets = struct.unpack_from(f"<{string_count}I", body)
+        position = 4 * string_count
+        blob = bytes(body[position:position + (offsets[-1] if offsets else 0)])
+        position += len(blob)
+        strings, start = [], 0
+        for end in offsets:
+            strings.append(sys.intern(blob[start:end].decode("utf-8")))
+            start = end
+
+        policies = {}
+        for _ in range(section_count):
+            ptype_id, arity, rule_count = _SECTION.unpack_from(body, position)
+            position += _SECTION.size
+            ids = struct.unpack_from(f"<{arity * rule_count}I", body, position)
+            position += 4 * len(ids)
+            values = [strings[index] for index in ids]
+            policies[strings[ptype_id]] = [values[i:i + arity] for i in range(0, len(values), arity)]
+        resource_prefix = strings[prefix_id]
+    except (struct.error, IndexError, UnicodeDecodeError) as e:
+        raise InvalidPolicySnapshotError(f"Malformed snapshot: {e}") from e
+
+    return PolicySnapshotFile(
+        model_fingerprint=fingerprint,
+        created_at=created_at,
+        resource_prefix=resource_prefix,
+        policies=policies,
+    )
+
+
+def write_policy_snapshot(path: str, model: Model, resource_prefix: str = "") -> int:
+    """
+    Atomically replace the snapshot at path (write to a temporary file, then rename) and
+    return its size. Readers never see a partially written file.
+    """
+    data = encode_policy_snapshot(model, resource_prefix)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".policy-snapshot-")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(data)
+
+
+def read_policy_snapshot(path: str) -> PolicySnapshotFile:
+    """
+    Memory-map and decode the snapshot at path. Raises OSError when it cannot be read and
+    InvalidPolicySnapshotError when it is not a valid snapshot.
+    """
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            raise InvalidPolicySnapshotError("Snapshot is empty")
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return decode_policy_snapshot(mapped)
@@ -0,0 +1,88 @@
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+from access_guard.authz.models.enums import PolicyChange
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeCoalescer:
+    """
+    Turns bursts of change notifications into one reload.
+
+    Pending changes are applied once none arrived for debounce seconds, and at the latest
+    max_delay seconds after the first of the burst, so a steady stream still gets applied.
+    A FULL change in the burst wins over DELTA ones. Changes arriving while apply runs are
+    applied again once it returns; apply is never called concurrently.
+    """
+
+    def __init__(self, apply: Callable[[PolicyChange], None], debounce: float = 0.05, max_delay: float = 1.0):
+        self._apply = apply
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self._condition = threading.Condition()
+        self._pending: Optional[PolicyChange] = None
+        self._first_at = 0.0
+        self._last_at = 0.0
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self.received = 0
+        self.applied = 0
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="access-guard-policy-changes", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is not None:
+            if self._thread is not threading.current_thread():
+                self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, change: PolicyChange) -> None:
+        with self._condition:
+            now = time.monotonic()
+            if self._pending is None:
+                self._pending = change
+                self._first_at = now
+            elif change is PolicyChange.FULL:
+                self._pending = change
+            self._last_at = now
+            self.received += 1
+            self._condition.notify()
+
+    def _next(self) -> Optional[PolicyChange]:
+        """
+        Wait for a burst to settle and take it; None when stopping.
+        """
+        with self._condition:
+            while not self._stopping:
+                if self._pending is None:
+                    self._condition.wait()
+                    continue
+                now = time.monotonic()
+                due = min(self._last_at + self.debounce, self._first_at + self.max_delay)
+                if now >= due:
+                    change, self._pending = self._pending, None
+                    return change
+                self._condition.wait(due - now)
+            return None
+
+    def _run(self) -> None:
+        while True:
+            change = self._next()
+            if change is None:
+                return
+            try:
+                self._apply(change)
+                self.applied += 1
+            except Exception as e:
+                logger.warning(f"Applying a {change.value} policy change failed, keeping the last loaded policies: {e}")
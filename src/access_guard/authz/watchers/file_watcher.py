@@ -0,0 +1,80 @@
+import os
+from typing import Iterable, List, Optional
+
+from access_guard.authz.models.enums import PolicyChange
+from access_guard.authz.watchers.policy_watcher import ThreadedPolicyWatcher, decode_change
+
+# the log is started over once it grows past this many bytes
+ROTATE_AT = 1 << 20
+
+
+class FileChangeWatcher(ThreadedPolicyWatcher):
+    """
+    Notifications through a log file shared by the processes of one host, or over a shared volume.
+
+    notify appends the change as a line (O_APPEND writes of one line are atomic); watchers stat the
+    file every poll_interval seconds and read the lines appended since. Needs nothing but a
+    writable path, at the cost of up to poll_interval of latency and one stat per poll. A notifier
+    finding the log past ROTATE_AT replaces it with a fresh one, which watchers read from the start.
+    """
+
+    def __init__(self, path: str, poll_interval: float = 0.2):
+        super().__init__(receive_timeout=poll_interval)
+        self.path = path
+        self._inode: Optional[int] = None
+        self._offset = 0
+
+    def _open(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # only changes notified from now on are received
+        try:
+            stat = os.stat(self.path)
+            self._inode, self._offset = stat.st_ino, stat.st_size
+        except FileNotFoundError:
+            self._inode, self._offset = None, 0
+
+    def _receive(self, timeout: float) -> Iterable[PolicyChange]:
+        if self._stopping.wait(timeout):
+            return ()
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return ()
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            self._inode, self._offset = stat.st_ino, 0
+        if stat.st_size == self._offset:
+            return ()
+        return self._read_appended()
+
+    def _read_appended(self) -> List[PolicyChange]:
+        try:
+            with open(self.path, "rb") as file:
+                file.seek(self._offset)
+                data = file.read()
+        except FileNotFoundError:
+            return []
+        # a line being written is picked up by the next poll
+        complete = data.rfind(b"\n") + 1
+        self._offset += complete
+        return [decode_change(line) for line in data[:complete].splitlines() if line.strip()]
+
+    def _publish(self, change: PolicyChange) -> None:
+        line = f"{change.value}\n".encode()
+        try:
+            rotate = os.stat(self.path).st_size >= ROTATE_AT
+        except FileNotFoundError:
+            rotate = False
+        if rotate:
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp_path, "wb") as file:
+                file.write(line)
+            os.replace(temp_path, self.path)
+            return
+
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
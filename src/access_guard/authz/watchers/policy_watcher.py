@@ -0,0 +1,134 @@
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Iterable, List, Optional, Union
+
+from access_guard.authz.models.enums import PolicyChange
+
+logger = logging.getLogger(__name__)
+
+ChangeCallback = Callable[[PolicyChange], None]
+
+
+def decode_change(payload: Union[str, bytes]) -> PolicyChange:
+    """
+    Read a notification payload. Anything unknown asks for a full reload, the safe choice.
+    """
+    if isinstance(payload, bytes):
+        payload = payload.decode("utf-8", "replace")
+    try:
+        return PolicyChange(payload.strip())
+    except ValueError:
+        return PolicyChange.FULL
+
+
+class PolicyWatcher(ABC):
+    """
+    Transport of policy change notifications between the processes enforcing the same policies,
+    the counterpart of casbin's Watcher. Whoever changes the policies calls notify; every
+    subscriber, including the notifier's own enforcers, receives the change.
+    """
+
+    @abstractmethod
+    def subscribe(self, on_change: ChangeCallback) -> None:
+        """
+        Call on_change with every change notified from now on, from the watcher's thread.
+        """
+
+    @abstractmethod
+    def unsubscribe(self, on_change: ChangeCallback) -> None:
+        ...
+
+    @abstractmethod
+    def notify(self, change: PolicyChange = PolicyChange.DELTA) -> None:
+        """
+        Tell every watcher of the policies that they changed.
+        """
+
+    @abstractmethod
+    def close(self) -> None:
+        """
+        Stop receiving and release the transport.
+        """
+
+
+class ThreadedPolicyWatcher(PolicyWatcher):
+    """
+    A watcher receiving from a blocking transport on a daemon thread, running while it has
+    subscribers.
+
+    Transports implement _receive, waiting at most timeout seconds and returning the changes
+    received meanwhile, and _publish; _open and _close_transport set up and release their
+    connection. A Postgres transport would LISTEN in _open, NOTIFY the change value in _publish
+    and, in _receive, select() on the connection, poll() it and decode its notifies. A Redis one
+    would subscribe in _open, PUBLISH in _publish and decode pubsub.get_message(timeout=timeout).
+    Payloads are PolicyChange values, see decode_change.
+    """
+
+    def __init__(self, receive_timeout: float = 1.0):
+        self.receive_timeout = receive_timeout
+        self._subscribers: List[ChangeCallback] = []
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, on_change: ChangeCallback) -> None:
+        with self._lock:
+            self._subscribers.append(on_change)
+            if self._thread is None:
+                self._stopping.clear()
+                self._open()
+                self._thread = threading.Thread(
+                    target=self._run, name=f"access-guard-{type(self).__name__}", daemon=True
+                )
+                self._thread.start()
+
+    def unsubscribe(self, on_change: ChangeCallback) -> None:
+        with self._lock:
+            if on_change in self._subscribers:
+                self._subscribers.remove(on_change)
+            if self._subscribers:
+                return
+        self.close()
+
+    def notify(self, change: PolicyChange = PolicyChange.DELTA) -> None:
+        self._publish(change)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._subscribers.clear()
+            self._stopping.set()
+            if thread is None:
+                return
+        if thread is not threading.current_thread():
+            thread.join(timeout)
+        self._close_transport()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                changes = self._receive(self.receive_timeout)
+            except Exception as e:
+                if self._stopping.is_set():
+                    return
+                logger.warning(f"{type(self).__name__} could not receive policy changes: {e}")
+                self._stopping.wait(self.receive_timeout)
+                continue
+            for change in changes:
+                for on_change in list(self._subscribers):
+                    on_change(change)
+
+    def _open(self) -> None:
+        pass
+
+    def _close_transport(self) -> None:
+        pass
+
+    @abstractmethod
+    def _receive(self, timeout: float) -> Iterable[PolicyChange]:
+        ...
+
+    @abstractmethod
+    def _publish(self, change: PolicyChange) -> None:
+        ...
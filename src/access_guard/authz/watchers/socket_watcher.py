@@ -0,0 +1,82 @@
+import logging
+import os
+import socket
+import uuid
+from typing import Iterable, Optional
+
+from access_guard.authz.models.enums import PolicyChange
+from access_guard.authz.watchers.policy_watcher import ThreadedPolicyWatcher, decode_change
+
+logger = logging.getLogger(__name__)
+
+SOCKET_SUFFIX = ".sock"
+_MAX_PAYLOAD = 64
+
+
+class UnixSocketWatcher(ThreadedPolicyWatcher):
+    """
+    Notifications as datagrams between the processes of one host.
+
+    Every started watcher binds a UNIX datagram socket in directory; notify sends the change to
+    each socket there and removes the ones left behind by processes that died. Notifications are
+    delivered as they are sent, nothing is polled. Socket paths are limited to about 100 bytes,
+    so keep directory short (e.g. /run/access-guard). POSIX only.
+    """
+
+    def __init__(self, directory: str, receive_timeout: float = 1.0):
+        if not hasattr(socket, "AF_UNIX"):
+            raise RuntimeError("UnixSocketWatcher requires UNIX domain sockets")
+        super().__init__(receive_timeout=receive_timeout)
+        self.directory = directory
+        self._socket: Optional[socket.socket] = None
+        self._path: Optional[str] = None
+
+    def _open(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self._path = os.path.join(self.directory, f"{os.getpid()}-{uuid.uuid4().hex[:8]}{SOCKET_SUFFIX}")
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.bind(self._path)
+        self._socket.settimeout(self.receive_timeout)
+
+    def _receive(self, timeout: float) -> Iterable[PolicyChange]:
+        try:
+            payload = self._socket.recv(_MAX_PAYLOAD)
+        except socket.timeout:
+            return ()
+        return (decode_change(payload),)
+
+    def _publish(self, change: PolicyChange) -> None:
+        payload = change.value.encode()
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sender:
+            # a full queue already holds notifications the watcher has yet to apply
+            sender.setblocking(False)
+            try:
+                names = os.listdir(self.directory)
+            except FileNotFoundError:
+                # no watcher started yet, nobody to notify
+                return
+            for name in names:
+                if not name.endswith(SOCKET_SUFFIX):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    sender.sendto(payload, path)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    self._remove_stale(path)
+                except BlockingIOError:
+                    logger.debug(f"Policy change queue of {path} is full, skipping it")
+
+    @staticmethod
+    def _remove_stale(path: str) -> None:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+    def _close_transport(self) -> None:
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+        if self._path is not None:
+            self._remove_stale(self._path)
+            self._path = None
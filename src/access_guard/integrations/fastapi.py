@@ -0,0 +1,200 @@
+"""
+FastAPI dependencies checking permissions with a PermissionsEnforcer.
+
+Requires the fastapi extra: pip install "access-guard[fastapi]".
+"""
+import logging
+from string import Formatter
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+try:
+    from fastapi import Depends, FastAPI, HTTPException, Request, status
+    from fastapi.params import Depends as DependsParam
+    from fastapi.routing import APIRoute
+except ImportError as e:  # pragma: no cover - depends on the installed extras
+    raise ImportError(
+        "access_guard.integrations.fastapi requires FastAPI, install access-guard[fastapi]"
+    ) from e
+
+from access_guard.authz.exceptions import BatchPermissionDeniedError
+from access_guard.authz.models.entities import User
+from access_guard.authz.permissions_enforcer import PermissionsEnforcer
+
+logger = logging.getLogger(__name__)
+
+Actions = Union[str, List[str]]
+Permission = Tuple[str, Actions]
+EnforcerSource = Union[PermissionsEnforcer, Callable[[Request], PermissionsEnforcer]]
+UserDependency = Callable[..., Union[User, Awaitable[User]]]
+
+_STATE_KEY = "access_guard_decisions"
+# marks the dependencies built by AccessGuard.require, for init_app
+_PERMISSIONS_ATTRIBUTE = "__access_guard_permissions__"
+
+
+class ResourceTemplate:
+    """
+    A resource with "{name}" placeholders filled from a request's path parameters, e.g.
+    "/apps/{app_id}/documents/{document_id}". Parsed once, when the route is declared.
+    """
+    __slots__ = ("template", "parts", "fields")
+
+    def __init__(self, template: str):
+        parts = []
+        for literal, field, format_spec, conversion in Formatter().parse(template):
+            if field is not None and (not field.isidentifier() or format_spec or conversion):
+                raise ValueError(f"Invalid placeholder {{{field}}} in resource template {template!r}")
+            parts.append((literal, field))
+        self.template = template
+        self.parts: Tuple[Tuple[str, Optional[str]], ...] = tuple(parts)
+        self.fields = frozenset(field for _, field in parts if field is not None)
+
+    def render(self, values: Mapping[str, Any]) -> str:
+        if not self.fields:
+            return self.template
+        return "".join(literal if field is None else f"{literal}{values[field]}" for literal, field in self.parts)
+
+    def __repr__(self) -> str:
+        return f"ResourceTemplate({self.template!r})"
+
+
+class RequestDecisions:
+    """
+    The permission checks of one request, for its resolved user. Every decision is memoized for
+    the rest of the request, so dependencies checking the same permission do not repeat it.
+    """
+
+    def __init__(self, enforcer: PermissionsEnforcer, user: User):
+        self.enforcer = enforcer
+        self.user = user
+        self._decisions: Dict[Tuple[str, Union[str, Tuple[str, ...]]], bool] = {}
+
+    def allowed(self, resource: str, actions: Actions) -> bool:
+        return self.allowed_batch([(resource, actions)])[0]
+
+    def allowed_batch(self, checks: Iterable[Permission]) -> List[bool]:
+        """
+        Decide every (resource, actions) pair, in one enforcer batch for those not decided yet.
+        """
+        keys = [(resource, _actions_key(actions)) for resource, actions in checks]
+        decisions = self._decisions
+        missing = list(dict.fromkeys(key for key in keys if key not in decisions))
+        if missing:
+            results = self.enforcer.has_permissions_batch(
+                self.user, [(resource, _actions_value(actions)) for resource, actions in missing]
+            )
+            decisions.update(zip(missing, results))
+        return [decisions[key] for key in keys]
+
+    def require(self, resource: str, actions: Actions) -> None:
+        self.require_batch([(resource, actions)])
+
+    def require_batch(self, checks: Iterable[Permission]) -> None:
+        """
+        Raise a 403 HTTPException unless every (resource, actions) pair is allowed.
+        """
+        checks = list(checks)
+        denied = [
+            (resource, ", ".join(actions) if isinstance(actions, list) else actions)
+            for (resource, actions), allowed in zip(checks, self.allowed_batch(checks))
+            if not allowed
+        ]
+        if denied:
+            logger.debug(BatchPermissionDeniedError(str(self.user.id), denied).message)
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permission denied")
+
+
+class AccessGuard:
+    """
+    Permission dependencies for a FastAPI app.
+
+    get_user is a dependency resolving the current User (it may itself depend on the request,
+    headers or other dependencies); it runs once per request. The enforcer is either an instance
+    or a callable taking the request, e.g. to pick an enforcer of an EnforcerRegistry per tenant.
+
+    Checks run inline on the event loop: they only read in-memory policies. Do not combine with
+    lazy_user_slices, whose first check of a user queries the loaders.
+    """
+
+    def __init__(self, enforcer: EnforcerSource, get_user: UserDependency):
+        self._enforcer = enforcer
+        state_key = f"{_STATE_KEY}_{id(self)}"
+
+        async def decisions(request: Request, user: User = Depends(get_user)) -> RequestDecisions:
+            existing = getattr(request.state, state_key, None)
+            if existing is not None:
+                return existing
+            created = RequestDecisions(self._enforcer_for(request), user)
+            setattr(request.state, state_key, created)
+            return created
+
+        # a dependency giving the request's RequestDecisions: Depends(guard.decisions)
+        self.decisions = decisions
+
+    def _enforcer_for(self, request: Request) -> PermissionsEnforcer:
+        if isinstance(self._enforcer, PermissionsEnforcer):
+            return self._enforcer
+        return self._enforcer(request)
+
+    def require(self, *permissions: Permission) -> DependsParam:
+        """
+        A dependency allowing the request only when every (resource template, actions) pair is
+        allowed, checked in one batch; it raises a 403 HTTPException otherwise. Templates are
+        filled from the path parameters:
+
+            @app.get("/apps/{app_id}/documents/{document_id}", dependencies=[
+                guard.require(("/apps/{app_id}", "read"), ("/apps/{app_id}/documents/{document_id}", "read"))
+            ])
+
+        Used as a parameter default instead, it gives the RequestDecisions.
+        """
+        if not permissions:
+            raise ValueError("At least one (resource, actions) permission is required")
+        templates = tuple((ResourceTemplate(resource), actions) for resource, actions in permissions)
+
+        async def require_permissions(
+                request: Request,
+                decisions: RequestDecisions = Depends(self.decisions)
+        ) -> RequestDecisions:
+            path_params = request.path_params
+            decisions.require_batch([(template.render(path_params), actions) for template, actions in templates])
+            return decisions
+
+        setattr(require_permissions, _PERMISSIONS_ATTRIBUTE, templates)
+        return Depends(require_permissions)
+
+    def init_app(self, app: FastAPI) -> None:
+        """
+        Check at startup that every resource template of the app's routes only uses path
+        parameters of its route. Call it once all routers are included.
+        """
+        errors = []
+        for route in app.routes:
+            if not isinstance(route, APIRoute):
+                continue
+            params = set(route.param_convertors)
+            for templates in _route_permissions(route):
+                for template, _ in templates:
+                    unknown = template.fields - params
+                    if unknown:
+                        errors.append(f"{route.path}: {template.template} uses {', '.join(sorted(unknown))}")
+        if errors:
+            raise ValueError("Resource templates with unknown path parameters: " + "; ".join(errors))
+
+
+def _route_permissions(route: APIRoute) -> Iterable[Sequence[Tuple[ResourceTemplate, Actions]]]:
+    pending = list(route.dependant.dependencies)
+    while pending:
+        dependant = pending.pop()
+        templates = getattr(dependant.call, _PERMISSIONS_ATTRIBUTE, None)
+        if templates is not None:
+            yield templates
+        pending.extend(dependant.dependencies)
+
+
+def _actions_key(actions: Actions) -> Union[str, Tuple[str, ...]]:
+    return tuple(actions) if isinstance(actions, list) else actions
+
+
+def _actions_value(actions: Union[str, Tuple[str, ...]]) -> Actions:
+    return list(actions) if isinstance(actions, tuple) else actions
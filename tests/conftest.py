@@ -0,0 +1,171 @@
+import random
+from typing import List, Sequence
+
+import casbin
+import pytest
+from casbin import util
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from access_guard.authz.loaders.casbin_policy_provider import CasbinPolicyProvider
+from access_guard.authz.loaders.poicy_query_provider import PolicyQueryProvider
+from access_guard.authz.loaders.policy_ingest import ingest_policies
+from access_guard.authz.loaders.policy_loader_abc import PolicyLoaderABC
+from access_guard.authz.permissions_enforcer import DEFAULT_MODEL_PATH
+
+POLICY_COLUMNS = "ptype, subject, object, action, effect"
+
+SEGMENTS = ["a", "b", "c", "1"]
+USERS = [f"u{i}" for i in range(4)]
+ROLES = [f"r{i}" for i in range(5)]
+ACTIONS = ["read", "write", "*"]
+
+
+class StaticPolicyProvider(CasbinPolicyProvider):
+    def __init__(self, policies: List[Sequence[str]]):
+        self.policies = policies
+
+    def get_policies(self, filter: dict = None):
+        return self.policies
+
+
+class FlakyLoader(PolicyLoaderABC):
+    """
+    Loads a fixed list of policies, or raises while failing is set.
+    """
+
+    def __init__(self, policies: List[Sequence[str]] = (), failure_policy=None):
+        super().__init__()
+        self.policies = list(policies)
+        self.failure_policy = failure_policy
+        self.failing = False
+
+    def load_policy(self, model, filter: dict = None):
+        if self.failing:
+            raise RuntimeError("loader down")
+        ingest_policies(model, self.policies)
+
+    def save_policy(self, model):
+        return True
+
+    def add_policy(self, sec, ptype, rule):
+        return True
+
+    def remove_policy(self, sec, ptype, rule):
+        return True
+
+    def remove_filtered_policy(self, sec, ptype, field_index, *field_values):
+        return True
+
+
+class SQLiteQueryProvider(PolicyQueryProvider):
+    def get_all_policies_query(self):
+        return f"SELECT {POLICY_COLUMNS} FROM policies ORDER BY id", {}
+
+    def get_filtered_policies_query(self, filter: dict):
+        return self.get_all_policies_query()
+
+    def get_user_policies_query(self, user_id: str):
+        return f"SELECT {POLICY_COLUMNS} FROM policies WHERE subject = :subject ORDER BY id", {"subject": user_id}
+
+    def get_role_policies_query(self, role_id: str):
+        return self.get_user_policies_query(role_id)
+
+    def supports_policy_changes(self) -> bool:
+        return True
+
+    def get_policy_watermark_query(self, filter: dict = None):
+        return "SELECT MAX(version) FROM policy_changes", {}
+
+    def get_policy_changes_query(self, filter: dict, since):
+        return (
+            f"SELECT {POLICY_COLUMNS}, operation, version FROM policy_changes WHERE version > :since ORDER BY version",
+            {"since": since},
+        )
+
+
+class PolicyDatabase:
+    """
+    SQLite policies table with the change log delta sync reads.
+    """
+
+    def __init__(self):
+        self.engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        self._version = 0
+        with self.engine.begin() as connection:
+            connection.execute(text(f"CREATE TABLE policies (id INTEGER PRIMARY KEY, {POLICY_COLUMNS})"))
+            connection.execute(text(f"CREATE TABLE policy_changes ({POLICY_COLUMNS}, operation, version INTEGER)"))
+
+    def add(self, ptype: str, *fields: str) -> None:
+        row = self._row(ptype, fields)
+        with self.engine.begin() as connection:
+            connection.execute(text(f"INSERT INTO policies ({POLICY_COLUMNS}) VALUES (:p, :s, :o, :a, :e)"), row)
+            self._log(connection, row, "add")
+
+    def remove(self, ptype: str, *fields: str) -> None:
+        row = self._row(ptype, fields)
+        with self.engine.begin() as connection:
+            connection.execute(text(
+                "DELETE FROM policies WHERE id = (SELECT MIN(id) FROM policies WHERE ptype = :p AND subject = :s "
+                "AND object = :o AND COALESCE(action, '') = COALESCE(:a, '') AND COALESCE(effect, '') = COALESCE(:e, ''))"
+            ), row)
+            self._log(connection, row, "remove")
+
+    def _log(self, connection, row: dict, operation: str) -> None:
+        self._version += 1
+        connection.execute(
+            text("INSERT INTO policy_changes VALUES (:p, :s, :o, :a, :e, :operation, :version)"),
+            dict(row, operation=operation, version=self._version),
+        )
+
+    @staticmethod
+    def _row(ptype: str, fields: Sequence[str]) -> dict:
+        fields = list(fields) + [None] * (4 - len(fields))
+        return dict(zip(("p", "s", "o", "a", "e"), (ptype, *fields)))
+
+
+@pytest.fixture
+def policy_db() -> PolicyDatabase:
+    return PolicyDatabase()
+
+
+def random_pattern(rand: random.Random) -> str:
+    parts = [""]
+    for _ in range(rand.randint(1, 3)):
+        x = rand.random()
+        parts.append(rand.choice(SEGMENTS) if x < .6 else "{id}" if x < .8 else "")
+    if rand.random() < .35:
+        parts.append("*")
+    return "/".join(parts)
+
+
+def random_resource(rand: random.Random) -> str:
+    return "/" + "/".join(rand.choice(SEGMENTS + ["", "x"]) for _ in range(rand.randint(0, 4)))
+
+
+def random_policies(rand: random.Random) -> List[List[str]]:
+    policies = [
+        ["p", rand.choice(ROLES + USERS), random_pattern(rand), rand.choice(ACTIONS),
+         "deny" if rand.random() < .2 else "allow"]
+        for _ in range(rand.randint(5, 60))
+    ]
+    policies += [["g", rand.choice(USERS + ROLES), rand.choice(ROLES)] for _ in range(rand.randint(0, 12))]
+    return policies
+
+
+def random_requests(rand: random.Random, count: int):
+    return [(rand.choice(USERS + ROLES), random_resource(rand), rand.choice(ACTIONS)) for _ in range(count)]
+
+
+def casbin_enforcer(policies: List[Sequence[str]]) -> casbin.Enforcer:
+    """
+    A plain casbin enforcer on the shipped model, the reference the compiled engine must match.
+    """
+    enforcer = casbin.Enforcer(str(DEFAULT_MODEL_PATH))
+    enforcer.add_function("key_match3", util.key_match3)
+    for policy in policies:
+        if policy[0] == "p":
+            enforcer.add_policy(*policy[1:])
+        else:
+            enforcer.add_grouping_policy(*policy[1:])
+    return enforcer
@@ -0,0 +1,84 @@
+import random
+
+import pytest
+
+from access_guard.authz.engine.compiled_engine import CompiledPolicyEngine
+from access_guard.authz.loaders.policy_code_loader import PolicyCodeLoader
+from access_guard.authz.loaders.policy_ingest import ingest_policies
+from access_guard.authz.models.entities import User
+from access_guard.authz.models.permissions_enforcer_params import PermissionsEnforcerParams
+from access_guard.authz.permissions_enforcer import PermissionsEnforcer, new_model
+from tests.conftest import (
+    StaticPolicyProvider,
+    casbin_enforcer,
+    random_pattern,
+    random_policies,
+    random_requests,
+)
+
+
+def compile_policies(policies) -> CompiledPolicyEngine:
+    model = new_model()
+    ingest_policies(model, policies)
+    return CompiledPolicyEngine.compile(model)
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_engine_decides_like_casbin(seed):
+    rand = random.Random(seed)
+    policies = random_policies(rand)
+    engine = compile_policies(policies)
+    reference = casbin_enforcer(policies)
+
+    for subject, resource, action in random_requests(rand, 200):
+        assert engine.enforce(subject, resource, action) == reference.enforce(subject, resource, action), (
+            subject, resource, action)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_batch_checks_decide_like_casbin(seed):
+    rand = random.Random(seed)
+    policies = random_policies(rand)
+    enforcer = PermissionsEnforcer(PermissionsEnforcerParams(), [PolicyCodeLoader(StaticPolicyProvider(policies))])
+    reference = casbin_enforcer(policies)
+
+    requests = random_requests(rand, 60)
+    for subject in {subject for subject, _, _ in requests}:
+        # large enough for the pattern set path, see BULK_MATCH_MIN_CHECKS
+        checks = [(resource, action) for _, resource, action in requests]
+        expected = [reference.enforce(subject, resource, action) for resource, action in checks]
+        assert enforcer.has_permissions_batch(User(id=subject), checks) == expected
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_apply_delta_matches_a_fresh_compile(seed):
+    rand = random.Random(seed)
+    policies = random_policies(rand)
+    engine = compile_policies(policies)
+
+    removed = rand.sample(policies, min(len(policies), rand.randint(0, 8)))
+    added = random_policies(rand)[:rand.randint(0, 8)]
+    remaining = list(policies)
+    for policy in removed:
+        remaining.remove(policy)
+    delta_engine = engine.apply_delta(added, removed)
+    fresh = compile_policies(remaining + added)
+
+    for subject, resource, action in random_requests(rand, 200):
+        assert delta_engine.enforce(subject, resource, action) == fresh.enforce(subject, resource, action)
+        assert set(delta_engine.get_subject_roles(subject)) == set(fresh.get_subject_roles(subject))
+
+
+def test_role_chains_stop_at_the_casbin_hierarchy_limit():
+    chain = [["g", f"level{i}", f"level{i + 1}"] for i in range(12)]
+    policies = chain + [["p", f"level{i}", f"/docs/{i}", "read", "allow"] for i in range(13)]
+    engine = compile_policies(policies)
+    reference = casbin_enforcer(policies)
+
+    for i in range(13):
+        assert engine.enforce("level0", f"/docs/{i}", "read") == reference.enforce("level0", f"/docs/{i}", "read")
+
+
+def test_malformed_rules_are_not_compiled():
+    assert compile_policies([["p", "alice", "/docs"]]) is None
+    assert compile_policies([["p", "alice", random_pattern(random.Random(1)), "read", "allow"]]) is not None
@@ -0,0 +1,118 @@
+import pytest
+
+from access_guard.authz.loaders.policy_db_loader import PolicyDbLoader
+from access_guard.authz.models.entities import User
+from access_guard.authz.models.enums import LoaderFailurePolicy, LoaderStatus
+from access_guard.authz.models.permissions_enforcer_params import PermissionsEnforcerParams
+from access_guard.authz.permissions_enforcer import PermissionsEnforcer
+from tests.conftest import FlakyLoader, SQLiteQueryProvider
+
+ALICE = User(id="alice")
+
+
+def db_loader(policy_db, failure_policy=None) -> PolicyDbLoader:
+    loader = PolicyDbLoader(SQLiteQueryProvider(), policy_db.engine)
+    loader.failure_policy = failure_policy
+    return loader
+
+
+def fail_queries(loader: PolicyDbLoader, monkeypatch) -> None:
+    def failing(*args, **kwargs):
+        raise RuntimeError("database down")
+
+    monkeypatch.setattr(loader, "_run_load_policy", failing)
+
+
+@pytest.mark.parametrize("use_compiled_engine", [True, False])
+def test_sync_applies_added_and_removed_rules(policy_db, use_compiled_engine):
+    policy_db.add("p", "editor", "/docs/*", "read", "allow")
+    policy_db.add("g", "alice", "editor")
+    enforcer = PermissionsEnforcer(
+        PermissionsEnforcerParams(use_compiled_engine=use_compiled_engine), [db_loader(policy_db)])
+    assert enforcer.has_permission(ALICE, "/docs/1", "read")
+
+    policy_db.add("p", "editor", "/docs/*", "write", "allow")
+    policy_db.remove("g", "alice", "editor")
+    policy_db.add("g", "alice", "viewer")
+    policy_db.add("p", "viewer", "/docs/*", "read", "allow")
+    generation = enforcer.policy_generation
+    assert enforcer.sync_policies()
+    assert enforcer.policy_generation == generation + 1
+    assert enforcer.has_permission(ALICE, "/docs/1", "read")
+    assert not enforcer.has_permission(ALICE, "/docs/1", "write")
+    assert not enforcer.sync_policies()
+
+
+def test_sync_after_a_failed_full_load_reloads_everything(policy_db):
+    policy_db.add("p", "alice", "/docs", "read", "allow")
+    other = FlakyLoader()
+    enforcer = PermissionsEnforcer(PermissionsEnforcerParams(), [db_loader(policy_db), other])
+
+    policy_db.add("p", "alice", "/reports", "read", "allow")
+    other.failing = True
+    with pytest.raises(RuntimeError):
+        enforcer.refresh_policies()
+    assert not enforcer.has_permission(ALICE, "/reports", "read")
+
+    other.failing = False
+    assert enforcer.sync_policies()
+    assert enforcer.has_permission(ALICE, "/reports", "read")
+
+
+def test_sync_after_a_failed_query_reloads_everything(policy_db, monkeypatch):
+    policy_db.add("p", "alice", "/docs", "read", "allow")
+    loader = db_loader(policy_db)
+    enforcer = PermissionsEnforcer(PermissionsEnforcerParams(), [loader])
+
+    policy_db.add("p", "alice", "/reports", "read", "allow")
+    with monkeypatch.context() as patch:
+        fail_queries(loader, patch)
+        with pytest.raises(RuntimeError):
+            enforcer.refresh_policies()
+
+    assert enforcer.sync_policies()
+    assert enforcer.has_permission(ALICE, "/reports", "read")
+
+
+@pytest.mark.parametrize("failure_policy", [LoaderFailurePolicy.SKIP, LoaderFailurePolicy.KEEP_PREVIOUS])
+def test_sync_after_a_loader_was_left_out_reloads_it(policy_db, monkeypatch, failure_policy):
+    policy_db.add("p", "alice", "/docs/*", "read", "allow")
+    loader = db_loader(policy_db, failure_policy)
+    enforcer = PermissionsEnforcer(PermissionsEnforcerParams(), [loader, FlakyLoader([("p", "bob", "/x", "read", "allow")])])
+
+    policy_db.add("p", "alice", "/reports", "read", "allow")
+    with monkeypatch.context() as patch:
+        fail_queries(loader, patch)
+        enforcer.refresh_policies()
+    statuses = [timing.status for timing in enforcer.get_loader_timings()]
+    assert statuses[0] in (LoaderStatus.SKIPPED, LoaderStatus.KEPT_PREVIOUS)
+
+    policy_db.add("p", "alice", "/audit", "read", "allow")
+    assert enforcer.sync_policies()
+    assert enforcer.has_permission(ALICE, "/docs/1", "read")
+    assert enforcer.has_permission(ALICE, "/reports", "read")
+    assert enforcer.has_permission(ALICE, "/audit", "read")
+    assert [timing.status for timing in enforcer.get_loader_timings()] == [LoaderStatus.LOADED] * 2
+
+
+def test_loader_skipped_on_the_initial_load_comes_back_on_sync(policy_db, monkeypatch):
+    policy_db.add("p", "alice", "/docs/*", "read", "allow")
+    loader = db_loader(policy_db, LoaderFailurePolicy.SKIP)
+    with monkeypatch.context() as patch:
+        fail_queries(loader, patch)
+        enforcer = PermissionsEnforcer(PermissionsEnforcerParams(), [loader])
+    assert not enforcer.has_permission(ALICE, "/docs/1", "read")
+
+    enforcer.sync_policies()
+    assert enforcer.has_permission(ALICE, "/docs/1", "read")
+
+
+def test_padded_fields_match_like_casbin(policy_db):
+    policy_db.add("p", "editor ", " /docs/* ", " read", "allow ")
+    policy_db.add("g", " alice", "editor ")
+    enforcer = PermissionsEnforcer(PermissionsEnforcerParams(), [db_loader(policy_db)])
+    assert enforcer.has_permission(ALICE, "/docs/1", "read")
+
+    policy_db.remove("p", "editor ", " /docs/* ", " read", "allow ")
+    assert enforcer.sync_policies()
+    assert not enforcer.has_permission(ALICE, "/docs/1", "read")
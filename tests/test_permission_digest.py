@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+from access_guard.authz.engine.permission_digest import decode_permission_digest, encode_permission_digest
+from access_guard.authz.exceptions import InvalidPermissionDigestError
+from access_guard.authz.loaders.policy_code_loader import PolicyCodeLoader
+from access_guard.authz.models.entities import User
+from access_guard.authz.models.permissions_enforcer_params import PermissionsEnforcerParams
+from access_guard.authz.permissions_enforcer import PermissionsEnforcer
+from tests.conftest import USERS, StaticPolicyProvider, random_policies, random_resource
+
+KEY = b"k" * 32
+
+
+def digest_token(**kwargs) -> str:
+    return encode_permission_digest(
+        "alice", ["editor"], [["/t/docs/*", "read", "allow"], ["/t/docs/secret", "read", "deny"]], KEY,
+        resource_prefix="/t", now=1000, **kwargs
+    )
+
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("use_compiled_engine", [True, False])
+def test_digest_decides_like_the_enforcer(seed, use_compiled_engine):
+    rand = random.Random(seed)
+    enforcer = PermissionsEnforcer(
+        PermissionsEnforcerParams(use_compiled_engine=use_compiled_engine),
+        [PolicyCodeLoader(StaticPolicyProvider(random_policies(rand)))]
+    )
+    for user in map(lambda subject: User(id=subject), USERS):
+        digest = decode_permission_digest(enforcer.export_permission_digest(user, KEY), KEY)
+        assert set(digest.roles) == set(enforcer.get_effective_roles(user))
+        for _ in range(50):
+            resource, action = random_resource(rand), rand.choice(["read", "write", "*", ["read", "write"]])
+            assert digest.has_permission(resource, action) == enforcer.has_permission(user, resource, action)
+
+
+def test_digest_applies_its_resource_prefix():
+    digest = decode_permission_digest(digest_token(ttl=60), KEY, now=1030)
+    assert digest.has_permission("/docs/1", "read")
+    assert not digest.has_permission("/docs/secret", "read")
+    assert not digest.has_permission("/docs/1", "write")
+
+
+def test_digest_accepts_any_of_the_rotated_keys():
+    assert decode_permission_digest(digest_token(), [b"old" * 8, KEY]).subject == "alice"
+
+
+def test_expired_digest_is_rejected():
+    token = digest_token(ttl=60)
+    decode_permission_digest(token, KEY, now=1059)
+    with pytest.raises(InvalidPermissionDigestError, match="expired"):
+        decode_permission_digest(token, KEY, now=1060)
+
+
+def test_digest_without_ttl_never_expires():
+    assert decode_permission_digest(digest_token(), KEY, now=10 ** 10).expires_at is None
+
+
+@pytest.mark.parametrize("tamper", [
+    lambda token: token[:-2] + ("A" if token[-2] != "A" else "B") + token[-1],
+    lambda token: token.split(".")[0] + "." + token.split(".")[1][:-2] + "AA." + token.split(".")[2],
+    lambda token: "ag2" + token[3:],
+    lambda token: token.replace(".", "", 1),
+])
+def test_tampered_digest_is_rejected(tamper):
+    with pytest.raises(InvalidPermissionDigestError):
+        decode_permission_digest(tamper(digest_token()), KEY)
+
+
+def test_digest_signed_with_another_key_is_rejected():
+    with pytest.raises(InvalidPermissionDigestError, match="signature"):
+        decode_permission_digest(digest_token(), b"another key")
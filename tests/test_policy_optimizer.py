@@ -0,0 +1,84 @@
+import random
+
+import pytest
+
+from access_guard.authz.loaders.policy_code_loader import PolicyCodeLoader
+from access_guard.authz.models.entities import User
+from access_guard.authz.models.permissions_enforcer_params import PermissionsEnforcerParams
+from access_guard.authz.permissions_enforcer import PermissionsEnforcer
+from tests.conftest import ROLES, USERS, StaticPolicyProvider, casbin_enforcer, random_policies, random_requests
+
+
+def build(policies, **params) -> PermissionsEnforcer:
+    return PermissionsEnforcer(PermissionsEnforcerParams(**params), [PolicyCodeLoader(StaticPolicyProvider(policies))])
+
+
+def with_aliases_and_duplicates(rand: random.Random):
+    policies = random_policies(rand)
+    policies += [list(policy) for policy in rand.sample(policies, min(5, len(policies)))]
+    for i in range(3):
+        alias = f"alias{i}"
+        policies.append(["g", rand.choice(USERS + ROLES), alias])
+        if rand.random() < .7:
+            policies.append(["g", alias, rand.choice(ROLES)])
+    return policies
+
+
+@pytest.mark.parametrize("seed", range(30))
+@pytest.mark.parametrize("flatten_role_aliases", [False, True])
+def test_optimized_policies_decide_like_casbin(seed, flatten_role_aliases):
+    rand = random.Random(seed)
+    policies = with_aliases_and_duplicates(rand)
+    reference = casbin_enforcer(policies)
+    enforcer = build(policies, optimize_policies=True, flatten_role_aliases=flatten_role_aliases)
+    flattened = set(enforcer.get_optimization_report().flattened_roles)
+
+    for subject, resource, action in random_requests(rand, 200):
+        if subject in flattened:
+            continue
+        assert enforcer.has_permission(User(id=subject), resource, action) == reference.enforce(subject, resource, action)
+
+
+def test_duplicate_and_covered_rules_are_dropped():
+    enforcer = build([
+        ["p", "editor", "/docs/*", "read", "allow"],
+        ["p", "editor", "/docs/*", "read", "allow"],
+        ["p", "editor", "/docs/{id}", "read", "allow"],
+        ["p", "editor", "/docs/1", "*", "deny"],
+        ["p", "editor", "/docs/1", "write", "allow"],
+    ], optimize_policies=True)
+    report = enforcer.get_optimization_report()
+    assert (report.duplicates, report.subsumed, report.shadowed) == (1, 1, 1)
+    assert report.rules_after == 2
+
+
+def test_aliases_are_flattened_to_their_parent():
+    enforcer = build([
+        ["g", "alice", "staff"],
+        ["g", "staff", "editor"],
+        ["p", "editor", "/docs/*", "read", "allow"],
+    ], optimize_policies=True, flatten_role_aliases=True)
+    assert enforcer.get_optimization_report().flattened_roles == ("staff",)
+    assert enforcer.get_effective_roles(User(id="alice")) == ["editor"]
+    assert enforcer.has_permission(User(id="alice"), "/docs/1", "read")
+
+
+@pytest.mark.parametrize("length", [8, 9, 10, 12])
+@pytest.mark.parametrize("use_compiled_engine", [True, False])
+def test_flattening_keeps_the_hierarchy_limit(length, use_compiled_engine):
+    chain = ["alice"] + [f"alias{i}" for i in range(length)]
+    policies = [["g", member, role] for member, role in zip(chain, chain[1:])]
+    policies.append(["p", chain[-1], "/docs", "read", "allow"])
+    expected = casbin_enforcer(policies).enforce("alice", "/docs", "read")
+
+    enforcer = build(policies, use_compiled_engine=use_compiled_engine, optimize_policies=True, flatten_role_aliases=True)
+    assert enforcer.has_permission(User(id="alice"), "/docs", "read") == expected
+
+
+def test_nothing_is_flattened_in_a_role_cycle():
+    enforcer = build([
+        ["g", "alice", "a"], ["g", "a", "b"], ["g", "b", "alice"],
+        ["p", "b", "/docs", "read", "allow"],
+    ], optimize_policies=True, flatten_role_aliases=True)
+    assert enforcer.get_optimization_report().flattened_roles == ()
+    assert enforcer.has_permission(User(id="alice"), "/docs", "read")
@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from access_guard.authz.exceptions import InvalidPolicySnapshotError
+from access_guard.authz.loaders.policy_code_loader import PolicyCodeLoader
+from access_guard.authz.loaders.policy_ingest import ingest_policies
+from access_guard.authz.models.entities import User
+from access_guard.authz.models.permissions_enforcer_params import PermissionsEnforcerParams
+from access_guard.authz.permissions_enforcer import PermissionsEnforcer, new_model
+from access_guard.authz.store.shared_policy_store import SharedPolicyStore
+from access_guard.authz.store.snapshot_file import (
+    decode_policy_snapshot,
+    encode_policy_snapshot,
+    model_fingerprint,
+    read_policy_snapshot,
+    write_policy_snapshot,
+)
+from tests.conftest import FlakyLoader, StaticPolicyProvider, random_policies
+
+ALICE = User(id="alice")
+
+
+def loaded_model(policies):
+    model = new_model()
+    ingest_policies(model, policies)
+    return model
+
+
+def test_snapshot_round_trip(tmp_path):
+    model = loaded_model(random_policies(random.Random(1)) + [["p", "ünïcode", "/dócs/*", "read", "allow"]])
+    path = tmp_path / "policies.snap"
+    write_policy_snapshot(str(path), model, "/tenant")
+
+    snapshot_file = read_policy_snapshot(str(path))
+    assert snapshot_file.model_fingerprint == model_fingerprint(model)
+    assert snapshot_file.resource_prefix == "/tenant"
+    restored = new_model()
+    assert snapshot_file.install(restored) == sum(len(model[sec][sec].policy) for sec in ("p", "g"))
+    for sec in ("p", "g"):
+        assert list(map(list, restored[sec][sec].policy)) == list(map(list, model[sec][sec].policy))
+
+
+@pytest.mark.parametrize("corrupt", [
+    lambda data: data[:len(data) // 2],
+    lambda data: data[:-1] + bytes([data[-1] ^ 0xFF]),
+    lambda data: b"XXXX" + data[4:],
+    lambda data: b"",
+])
+def test_corrupt_snapshots_are_rejected(corrupt):
+    data = encode_policy_snapshot(loaded_model([["p", "alice", "/docs", "read", "allow"]]))
+    with pytest.raises(InvalidPolicySnapshotError):
+        decode_policy_snapshot(corrupt(data))
+
+
+def test_warm_start_serves_the_snapshot_when_loaders_fail(tmp_path):
+    path = str(tmp_path / "policies.snap")
+    policies = [("p", "alice", "/docs", "read", "allow")]
+    PermissionsEnforcer(PermissionsEnforcerParams(snapshot_path=path), [PolicyCodeLoader(StaticPolicyProvider(policies))])
+
+    loader = FlakyLoader()
+    loader.failing = True
+    enforcer = PermissionsEnforcer(PermissionsEnforcerParams(snapshot_path=path), [loader])
+    assert enforcer.has_permission(ALICE, "/docs", "read")
+
+
+def test_follower_loads_itself_when_the_shared_file_is_corrupt(tmp_path):
+    leader = SharedPolicyStore(str(tmp_path))
+    assert leader.try_acquire_leadership()
+    with open(leader.data_path, "wb") as file:
+        file.write(b"not a policy snapshot" * 8)
+    loader = FlakyLoader([("p", "alice", "/docs", "read", "allow")])
+    params = PermissionsEnforcerParams(shared_store_dir=str(tmp_path), shared_store_attach_timeout=1)
+
+    enforcer = PermissionsEnforcer(params, [loader])
+    try:
+        assert enforcer.has_permission(ALICE, "/docs", "read")
+        # the corrupt file is not read again until the leader replaces it
+        loader.failing = True
+        enforcer.refresh_policies()
+        write_policy_snapshot(leader.data_path, loaded_model([["p", "alice", "/reports", "read", "allow"]]))
+        assert enforcer.sync_policies()
+        assert enforcer.has_permission(ALICE, "/reports", "read")
+    finally:
+        enforcer.close()
+        leader.release_leadership()
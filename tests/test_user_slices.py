@@ -0,0 +1,50 @@
+import random
+
+import pytest
+
+from access_guard.authz.loaders.policy_code_loader import PolicyCodeLoader
+from access_guard.authz.loaders.policy_db_loader import PolicyDbLoader
+from access_guard.authz.models.entities import User
+from access_guard.authz.models.permissions_enforcer_params import PermissionsEnforcerParams
+from access_guard.authz.permissions_enforcer import PermissionsEnforcer
+from tests.conftest import ROLES, USERS, SQLiteQueryProvider, StaticPolicyProvider, random_policies, random_requests
+
+BASE_POLICIES = [("p", f"service{i}", f"/services/{i}", "read", "allow") for i in range(200)] + [
+    ("p", "platform", "/health", "read", "allow"),
+    ("g", "r1", "platform"),
+]
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("use_compiled_engine", [True, False])
+def test_slices_decide_like_a_full_load(policy_db, seed, use_compiled_engine):
+    rand = random.Random(seed)
+    for policy in random_policies(rand):
+        policy_db.add(*policy)
+
+    def loaders():
+        return [PolicyDbLoader(SQLiteQueryProvider(), policy_db.engine), PolicyCodeLoader(StaticPolicyProvider(BASE_POLICIES))]
+
+    full = PermissionsEnforcer(PermissionsEnforcerParams(use_compiled_engine=use_compiled_engine), loaders())
+    lazy = PermissionsEnforcer(
+        PermissionsEnforcerParams(use_compiled_engine=use_compiled_engine, lazy_user_slices=True), loaders())
+
+    for subject in USERS + ROLES:
+        user = User(id=subject)
+        assert set(lazy.get_effective_roles(user)) == set(full.get_effective_roles(user))
+        assert sorted(map(tuple, lazy.get_effective_permissions(user))) == sorted(
+            map(tuple, full.get_effective_permissions(user)))
+    for subject, resource, action in random_requests(rand, 200) + [("r1", "/health", "read")]:
+        user = User(id=subject)
+        assert lazy.has_permission(user, resource, action) == full.has_permission(user, resource, action)
+
+
+def test_compiled_slices_only_count_their_own_rules(policy_db):
+    policy_db.add("p", "alice", "/docs/*", "read", "allow")
+    policy_db.add("g", "alice", "r1")
+    enforcer = PermissionsEnforcer(
+        PermissionsEnforcerParams(lazy_user_slices=True),
+        [PolicyDbLoader(SQLiteQueryProvider(), policy_db.engine), PolicyCodeLoader(StaticPolicyProvider(BASE_POLICIES))]
+    )
+    assert enforcer.has_permission(User(id="alice"), "/health", "read")
+    assert enforcer.get_user_slice_stats().size == 2
@@ -0,0 +1,57 @@
+import threading
+
+import pytest
+
+from access_guard.authz.models.enums import PolicyChange
+from access_guard.authz.watchers.change_coalescer import ChangeCoalescer
+from access_guard.authz.watchers.file_watcher import FileChangeWatcher
+from access_guard.authz.watchers.socket_watcher import UnixSocketWatcher
+
+
+class Received:
+    def __init__(self):
+        self.changes = []
+        self._event = threading.Event()
+
+    def __call__(self, change: PolicyChange) -> None:
+        self.changes.append(change)
+        self._event.set()
+
+    def wait(self) -> bool:
+        return self._event.wait(5)
+
+
+@pytest.fixture(params=["socket", "file"])
+def watcher(request, tmp_path):
+    if request.param == "socket":
+        watcher = UnixSocketWatcher(str(tmp_path / "sockets"), receive_timeout=0.05)
+    else:
+        watcher = FileChangeWatcher(str(tmp_path / "changes.log"), poll_interval=0.05)
+    yield watcher
+    watcher.close()
+
+
+def test_subscribers_receive_notifications(watcher):
+    received = Received()
+    watcher.subscribe(received)
+    watcher.notify(PolicyChange.FULL)
+    assert received.wait()
+    assert received.changes == [PolicyChange.FULL]
+
+
+def test_notifying_without_subscribers_is_a_no_op(tmp_path):
+    UnixSocketWatcher(str(tmp_path / "missing")).notify()
+    FileChangeWatcher(str(tmp_path / "changes.log")).notify()
+
+
+def test_coalescer_applies_a_burst_once_and_full_wins():
+    received = Received()
+    coalescer = ChangeCoalescer(received, debounce=0.05, max_delay=1.0)
+    coalescer.start()
+    try:
+        for change in (PolicyChange.DELTA, PolicyChange.FULL, PolicyChange.DELTA):
+            coalescer.submit(change)
+        assert received.wait()
+    finally:
+        coalescer.stop()
+    assert received.changes == [PolicyChange.FULL]